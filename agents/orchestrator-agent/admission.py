@@ -0,0 +1,176 @@
+"""
+Orchestration Admission Control
+Bounds how many orchestrations run at once and how many may wait:
+- Up to `concurrency` orchestrations run; the rest wait in per-client queues
+- Freed slots go to waiting clients round-robin, so one busy client cannot
+  starve the others
+- Full queues are rejected immediately (429 per client, 503 overall) with
+  a Retry-After estimate instead of piling up threads
+"""
+import math
+import os
+import threading
+import time
+from collections import OrderedDict, deque
+from contextlib import contextmanager
+from typing import Dict, Optional
+
+import metrics
+
+DEFAULT_CONCURRENCY = int(os.getenv("ORCHESTRATION_CONCURRENCY", "8"))
+DEFAULT_QUEUE_SIZE = int(os.getenv("ORCHESTRATION_QUEUE_SIZE", "64"))
+DEFAULT_PER_CLIENT_QUEUE = int(os.getenv("ORCHESTRATION_QUEUE_PER_CLIENT", "16"))
+DEFAULT_QUEUE_TIMEOUT = float(os.getenv("ORCHESTRATION_QUEUE_TIMEOUT", "30"))
+
+MAX_RETRY_AFTER = 60
+
+
+class AdmissionRejected(Exception):
+    """Raised when a request cannot be admitted; maps to an HTTP status with Retry-After"""
+
+    def __init__(self, status: int, reason: str, retry_after: int):
+        super().__init__(reason)
+        self.status = status
+        self.reason = reason
+        self.retry_after = retry_after
+
+
+class _Ticket:
+    __slots__ = ("client_id", "event", "granted")
+
+    def __init__(self, client_id: str):
+        self.client_id = client_id
+        self.event = threading.Event()
+        self.granted = False
+
+
+class AdmissionController:
+    """Concurrency limit with bounded, per-client fair queuing (thread-safe)"""
+
+    def __init__(
+        self,
+        concurrency: int = DEFAULT_CONCURRENCY,
+        queue_size: int = DEFAULT_QUEUE_SIZE,
+        per_client_queue: int = DEFAULT_PER_CLIENT_QUEUE,
+        queue_timeout: float = DEFAULT_QUEUE_TIMEOUT
+    ):
+        self.concurrency = concurrency
+        self.queue_size = queue_size
+        self.per_client_queue = per_client_queue
+        self.queue_timeout = queue_timeout
+        self._lock = threading.Lock()
+        self._in_flight = 0
+        self._queued = 0
+        # Waiting clients in round-robin order, each with its FIFO of tickets
+        self._queues: "OrderedDict[str, deque]" = OrderedDict()
+        # Moving average of orchestration duration, for Retry-After
+        self._service_time = 1.0
+
+    @property
+    def enabled(self) -> bool:
+        return self.concurrency > 0
+
+    def _retry_after(self) -> int:
+        backlog = self._queued + self._in_flight
+        estimate = self._service_time * backlog / max(1, self.concurrency)
+        return max(1, min(MAX_RETRY_AFTER, math.ceil(estimate)))
+
+    def _update_gauges(self):
+        metrics.ADMISSION_QUEUE_DEPTH.set(self._queued)
+        metrics.ADMISSION_IN_FLIGHT.set(self._in_flight)
+
+    def _reject(self, status: int, reason: str) -> AdmissionRejected:
+        metrics.ADMISSION_REJECTIONS.inc(reason)
+        return AdmissionRejected(status, reason, self._retry_after())
+
+    def acquire(self, client_id: str, timeout: Optional[float] = None) -> float:
+        """
+        Wait for a slot; returns the seconds spent queued.
+
+        Raises AdmissionRejected when the client's queue (429) or the whole
+        queue (503) is full, or no slot frees up within `timeout` (503).
+        """
+        timeout = self.queue_timeout if timeout is None else timeout
+        with self._lock:
+            if self._in_flight < self.concurrency and not self._queued:
+                self._in_flight += 1
+                self._update_gauges()
+                metrics.ADMISSION_WAIT.observe(0.0)
+                return 0.0
+
+            queue = self._queues.get(client_id)
+            if queue is not None and len(queue) >= self.per_client_queue:
+                raise self._reject(429, "client_queue_full")
+            if self._queued >= self.queue_size:
+                raise self._reject(503, "queue_full")
+
+            ticket = _Ticket(client_id)
+            if queue is None:
+                queue = self._queues[client_id] = deque()
+            queue.append(ticket)
+            self._queued += 1
+            self._update_gauges()
+
+        started = time.perf_counter()
+        ticket.event.wait(timeout)
+        waited = time.perf_counter() - started
+        metrics.ADMISSION_WAIT.observe(waited)
+
+        with self._lock:
+            if ticket.granted:
+                return waited
+            # Timed out: withdraw the ticket
+            queue = self._queues.get(client_id)
+            if queue is not None:
+                queue.remove(ticket)
+                if not queue:
+                    del self._queues[client_id]
+            self._queued -= 1
+            self._update_gauges()
+            raise self._reject(503, "queue_timeout")
+
+    def release(self, service_time: Optional[float] = None):
+        """Free a slot, handing it straight to the next client in round-robin order"""
+        with self._lock:
+            if service_time is not None:
+                self._service_time = 0.8 * self._service_time + 0.2 * service_time
+
+            if self._queues:
+                client_id, queue = next(iter(self._queues.items()))
+                ticket = queue.popleft()
+                if queue:
+                    self._queues.move_to_end(client_id)
+                else:
+                    del self._queues[client_id]
+                self._queued -= 1
+                ticket.granted = True
+                ticket.event.set()
+            else:
+                self._in_flight -= 1
+            self._update_gauges()
+
+    @contextmanager
+    def admit(self, client_id: str, timeout: Optional[float] = None):
+        """`with controller.admit(client): ...` yields the seconds spent queued"""
+        if not self.enabled:
+            yield 0.0
+            return
+
+        waited = self.acquire(client_id, timeout)
+        started = time.perf_counter()
+        try:
+            yield waited
+        finally:
+            self.release(time.perf_counter() - started)
+
+    def snapshot(self) -> Dict:
+        with self._lock:
+            return {
+                "enabled": self.enabled,
+                "concurrency": self.concurrency,
+                "in_flight": self._in_flight,
+                "queued": self._queued,
+                "queued_clients": len(self._queues),
+                "queue_size": self.queue_size,
+                "per_client_queue": self.per_client_queue
+            }
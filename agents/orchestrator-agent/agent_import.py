@@ -0,0 +1,94 @@
+"""
+Bulk Agent Import
+Reads agent rows from JSONL or CSV and validates them for
+AgentManager.register_agents_bulk:
+- Rows are parsed lazily, one line at a time
+- A line that cannot be parsed becomes a RowError in place of its row,
+  so the import reports it and carries on
+- CSV cells are strings; empty cells are treated as absent and the
+  numeric columns are converted to integers
+"""
+import csv
+import json
+from typing import Any, Dict, Iterable, Iterator, Union
+
+from agent_record import AgentRecord
+
+FORMATS = ("jsonl", "csv")
+NUMERIC_FIELDS = ("reputation_score", "total_successful_txs", "total_failed_txs")
+STATUSES = ("active", "inactive", "maintenance")
+MAX_AGENT_ID_LENGTH = 128
+
+
+class RowError(ValueError):
+    """A row that could not be parsed or failed validation"""
+
+    def __init__(self, message: str, agent_id: str = None):
+        super().__init__(message)
+        self.agent_id = agent_id
+
+
+def detect_format(filename: str = None, content_type: str = None) -> str:
+    """'csv' for .csv files or text/csv bodies, otherwise 'jsonl'"""
+    if (filename or "").lower().endswith(".csv") or "csv" in (content_type or "").lower():
+        return "csv"
+    return "jsonl"
+
+
+def _jsonl_rows(lines: Iterable[str]) -> Iterator[Union[Dict[str, Any], RowError]]:
+    for line in lines:
+        line = line.strip()
+        if not line:
+            continue
+        try:
+            row = json.loads(line)
+        except ValueError as e:
+            yield RowError(f"Invalid JSON: {e}")
+            continue
+        yield row if isinstance(row, dict) else RowError("Row is not a JSON object")
+
+
+def _csv_rows(lines: Iterable[str]) -> Iterator[Union[Dict[str, Any], RowError]]:
+    for cells in csv.DictReader(lines):
+        if None in cells:
+            yield RowError("More cells than columns")
+            continue
+        row = {key.strip(): value.strip() for key, value in cells.items() if value is not None and value.strip()}
+        try:
+            for field in NUMERIC_FIELDS:
+                if field in row:
+                    row[field] = int(row[field])
+        except ValueError:
+            yield RowError(f"{field} is not an integer: {row[field]!r}", row.get("agent_id"))
+            continue
+        yield row
+
+
+def iter_agent_rows(lines: Iterable[str], fmt: str = "jsonl") -> Iterator[Union[Dict[str, Any], RowError]]:
+    """Agent dicts from JSONL or CSV lines; unparsable lines yield a RowError"""
+    if fmt not in FORMATS:
+        raise ValueError(f"Unknown format '{fmt}' (expected one of {', '.join(FORMATS)})")
+    return _csv_rows(lines) if fmt == "csv" else _jsonl_rows(lines)
+
+
+def agent_from_row(row: Union[Dict[str, Any], AgentRecord]) -> AgentRecord:
+    """Validated AgentRecord for one import row; raises RowError"""
+    if not isinstance(row, AgentRecord) and "agent_id" not in row:
+        raise RowError("agent_id is required")
+    record = row if isinstance(row, AgentRecord) else AgentRecord.from_dict(row)
+
+    if not isinstance(record.agent_id, str) or not record.agent_id.strip():
+        raise RowError("agent_id is required")
+    if len(record.agent_id) > MAX_AGENT_ID_LENGTH:
+        raise RowError(f"agent_id is longer than {MAX_AGENT_ID_LENGTH} characters")
+    if not isinstance(record.service_type, str) or not record.service_type:
+        raise RowError("service_type is required")
+    if not isinstance(record.api_url, str) or not record.api_url.startswith(("http://", "https://")):
+        raise RowError("api_url must be an http(s) URL")
+    for field in NUMERIC_FIELDS:
+        value = getattr(record, field)
+        if not isinstance(value, int) or isinstance(value, bool) or value < 0:
+            raise RowError(f"{field} must be a non-negative integer")
+    if record.status is not None and record.status not in STATUSES:
+        raise RowError(f"status must be one of {', '.join(STATUSES)}")
+    return record
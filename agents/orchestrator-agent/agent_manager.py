@@ -1,201 +1,534 @@
 """
 Professional Agent Registry Manager
 Manages agent registration, updates, and queries
+
+The registry lives in agent_registry.json, or in the shared SQLite store
+when ORCHESTRATOR_SHARED_STORE is set (multi-worker serving), so that every
+worker process reads and updates one registry.
+
+Agents are AgentRecord objects throughout; dicts are only produced for the
+JSON file and API responses. The JSON registry is kept in memory and
+reloaded only when the file changes on disk; its records are frozen, so
+callers share them read-only and only the locked update functions below
+change them (keeping the registry file and stats in step).
+
+Registry statistics are maintained incrementally (registry_stats) and
+checked against a full recompute every REGISTRY_STATS_VERIFY_INTERVAL.
 """
+import base64
+import heapq
 import json
 import os
+import threading
+import time
 from datetime import datetime
-from typing import List, Dict, Optional
+from typing import Any, Iterable, List, Dict, Optional, Tuple, Union
+
+from agent_import import RowError, agent_from_row
+from agent_record import AgentRecord, freeze
+import metrics
+from registry_stats import RegistryStats
+from shared_store import get_shared_store
 
 REGISTRY_FILE = "agent_registry.json"
 
+# Seconds between full recomputes that check the incremental stats (0 disables)
+REGISTRY_STATS_VERIFY_INTERVAL = float(os.getenv("REGISTRY_STATS_VERIFY_INTERVAL", "600"))
+
+AGENT_SORTS = ("reputation", "recent")
+
+
+def encode_cursor(sort: str, key: Tuple) -> str:
+    """Opaque pagination cursor: the sort order and the last agent's sort key"""
+    return base64.urlsafe_b64encode(json.dumps([sort, *key]).encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str, sort: str) -> Tuple:
+    """Sort key from a cursor; ValueError if it is malformed or from another sort order"""
+    try:
+        decoded = json.loads(base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)))
+    except Exception:
+        raise ValueError("Malformed cursor")
+    if not isinstance(decoded, list) or not decoded or decoded[0] != sort:
+        raise ValueError(f"Cursor does not belong to sort '{sort}'")
+    key = tuple(decoded[1:])
+    # recent: (position,); reputation: (score, agent_id)
+    types = (int,) if sort == "recent" else ((int, float), str)
+    if len(key) != len(types) or any(
+        isinstance(value, bool) or not isinstance(value, expected) for value, expected in zip(key, types)
+    ):
+        raise ValueError("Malformed cursor")
+    return key
+
+
 class AgentManager:
     def __init__(self):
-        self.registry_path = os.path.join(os.path.dirname(__file__), REGISTRY_FILE)
-        self._ensure_registry_exists()
+        self.registry_path = os.getenv("AGENT_REGISTRY_PATH") or os.path.join(os.path.dirname(__file__), REGISTRY_FILE)
+        self.store = get_shared_store()
+        
+        # In-memory JSON registry: records, id and list-position indexes, the
+        # file's metadata block, and the (mtime, size) of the file they were
+        # loaded from
+        self._lock = threading.RLock()
+        self._records: Optional[List[AgentRecord]] = None
+        self._by_id: Dict[str, AgentRecord] = {}
+        self._positions: Dict[str, int] = {}
+        self._metadata: Dict = {}
+        self._loaded_stamp = None
+        self._stats = RegistryStats()
+        
+        # Shared store: (registry version, stats snapshot) of the last read
+        self._store_stats: Optional[Tuple[int, Dict]] = None
+        self._stats_verifier: Optional[threading.Thread] = None
+        
+        if self.store is not None:
+            self._import_registry_file()
+        else:
+            self._ensure_registry_exists()
+    
+    def _import_registry_file(self):
+        """Seed an empty shared store from the JSON registry (agents already present are kept)"""
+        if self.store.agent_count() or not os.path.exists(self.registry_path):
+            return
+        imported = self.store.insert_agents(self._load_registry()[0])
+        if imported:
+            print(f"📥 Imported {imported} agent(s) from {self.registry_path} into the shared store")
     
     def _ensure_registry_exists(self):
         """Ensure registry file exists"""
         if not os.path.exists(self.registry_path):
-            default_registry = {
-                "agents": [],
-                "metadata": {
-                    "version": "1.0.0",
-                    "last_updated": datetime.utcnow().isoformat() + "Z",
-                    "total_agents": 0
-                }
-            }
-            self._save_registry(default_registry)
-    
-    def _load_registry(self) -> Dict:
-        """Load registry from file"""
+            self._metadata = {"version": "1.0.0"}
+            self._save_registry([])
+    
+    def _file_stamp(self):
+        try:
+            stat = os.stat(self.registry_path)
+            return (stat.st_mtime_ns, stat.st_size)
+        except OSError:
+            return None
+    
+    def _load_registry(self) -> Tuple[List[AgentRecord], Dict]:
+        """Load registry records and metadata from file"""
         try:
             with open(self.registry_path, 'r') as f:
-                return json.load(f)
+                registry = json.load(f)
+            return [freeze(AgentRecord.from_dict(a)) for a in registry.get("agents", [])], registry.get("metadata", {})
         except Exception as e:
             print(f"Error loading registry: {e}")
-            return {"agents": [], "metadata": {}}
+            return [], {}
     
-    def _save_registry(self, registry: Dict):
-        """Save registry to file"""
+    def _save_registry(self, records: List[AgentRecord]):
+        """Save registry to file (written to a temporary file, then renamed over it)"""
         try:
-            registry["metadata"]["last_updated"] = datetime.utcnow().isoformat() + "Z"
-            registry["metadata"]["total_agents"] = len(registry.get("agents", []))
+            self._metadata["last_updated"] = datetime.utcnow().isoformat() + "Z"
+            self._metadata["total_agents"] = len(records)
+            registry = {"agents": [r.to_dict() for r in records], "metadata": self._metadata}
             
-            with open(self.registry_path, 'w') as f:
+            tmp_path = f"{self.registry_path}.{os.getpid()}.tmp"
+            with open(tmp_path, 'w') as f:
                 json.dump(registry, f, indent=2)
+            os.replace(tmp_path, self.registry_path)
+            self._loaded_stamp = self._file_stamp()
         except Exception as e:
             print(f"Error saving registry: {e}")
     
-    def get_all_agents(self) -> List[Dict]:
+    def _registry(self) -> List[AgentRecord]:
+        """In-memory records, (re)loaded when the file was changed by someone else"""
+        stamp = self._file_stamp()
+        with self._lock:
+            if self._records is None or stamp != self._loaded_stamp:
+                records, metadata = self._load_registry()
+                self._records = records
+                self._by_id = {r.agent_id: r for r in records}
+                self._positions = {r.agent_id: i for i, r in enumerate(records)}
+                self._stats = RegistryStats.from_agents(records)
+                self._metadata = metadata
+                self._loaded_stamp = stamp
+            return self._records
+    
+    def get_all_agents(self) -> List[AgentRecord]:
         """Get all registered agents"""
-        registry = self._load_registry()
-        return registry.get("agents", [])
+        if self.store is not None:
+            return self.store.all_agents()
+        return self._registry()
     
-    def get_agent_by_id(self, agent_id: str) -> Optional[Dict]:
+    def get_agent_by_id(self, agent_id: str) -> Optional[AgentRecord]:
         """Get specific agent by ID"""
-        agents = self.get_all_agents()
-        for agent in agents:
-            if agent.get("agent_id") == agent_id:
-                return agent
-        return None
+        if self.store is not None:
+            return self.store.get_agent(agent_id)
+        with self._lock:
+            self._registry()
+            return self._by_id.get(agent_id)
     
-    def get_agents_by_service_type(self, service_type: str) -> List[Dict]:
+    def get_agents_by_service_type(self, service_type: str) -> List[AgentRecord]:
         """Get agents filtered by service type"""
+        if self.store is not None:
+            return self.store.agents_by_service_type(service_type)
         agents = self.get_all_agents()
-        return [a for a in agents if a.get("service_type") == service_type]
+        return [a for a in agents if a.service_type == service_type]
     
-    def register_agent(self, agent_data: Dict) -> bool:
+    def register_agent(self, agent_data: Union[Dict, AgentRecord]) -> bool:
         """Register a new agent"""
         try:
-            registry = self._load_registry()
+            # The registry keeps its own copy, not the caller's object
+            record = agent_data.copy() if isinstance(agent_data, AgentRecord) else AgentRecord.from_dict(agent_data)
             
             # Check if agent already exists
-            existing = self.get_agent_by_id(agent_data.get("agent_id"))
+            existing = self.get_agent_by_id(record.agent_id)
             if existing:
-                print(f"Agent {agent_data.get('agent_id')} already exists")
+                print(f"Agent {record.agent_id} already exists")
                 return False
             
             # Add timestamp if not provided
-            if "registered_at" not in agent_data:
-                agent_data["registered_at"] = datetime.utcnow().isoformat() + "Z"
+            if record.registered_at is None:
+                record.registered_at = datetime.utcnow().isoformat() + "Z"
             
-            # Set defaults
-            if "reputation_score" not in agent_data:
-                agent_data["reputation_score"] = 100
-            if "total_successful_txs" not in agent_data:
-                agent_data["total_successful_txs"] = 0
-            if "total_failed_txs" not in agent_data:
-                agent_data["total_failed_txs"] = 0
-            if "status" not in agent_data:
-                agent_data["status"] = "active"
+            # Set defaults (scores and counters default in AgentRecord)
+            if record.status is None:
+                record.status = "active"
             
-            registry["agents"].append(agent_data)
-            self._save_registry(registry)
+            if self.store is not None:
+                # Insert-if-absent, so a concurrent registration elsewhere still wins cleanly
+                if not self.store.insert_agents([record]):
+                    print(f"Agent {record.agent_id} already exists")
+                    return False
+            else:
+                with self._lock:
+                    records = self._registry()
+                    if record.agent_id in self._by_id:
+                        print(f"Agent {record.agent_id} already exists")
+                        return False
+                    # Copy-on-write: readers holding the old list are unaffected
+                    freeze(record)
+                    self._records = records + [record]
+                    self._by_id[record.agent_id] = record
+                    self._positions[record.agent_id] = len(records)
+                    self._stats.add(record)
+                    self._save_registry(self._records)
             
-            print(f"✅ Agent {agent_data.get('agent_id')} registered successfully")
+            print(f"✅ Agent {record.agent_id} registered successfully")
             return True
-            
+        
         except Exception as e:
             print(f"Error registering agent: {e}")
             return False
     
+    def register_agents_bulk(self, rows: Iterable[Union[Dict, AgentRecord, RowError]]) -> Dict[str, Any]:
+        """
+        Register many agents with one registry commit.
+        
+        Rows are validated and deduplicated in a single pass (RowErrors from
+        agent_import.iter_agent_rows count as invalid rows). Returns counts
+        per outcome and one {"row", "agent_id", "status"[, "error"]} entry
+        per row, status being registered, duplicate (earlier row with the
+        same id), exists (already registered) or invalid.
+        """
+        now = datetime.utcnow().isoformat() + "Z"
+        outcomes = []
+        accepted: List[AgentRecord] = []
+        accepted_rows = []
+        seen = set()
+        for number, row in enumerate(rows, 1):
+            outcome = {"row": number, "agent_id": None}
+            outcomes.append(outcome)
+            try:
+                if isinstance(row, RowError):
+                    raise row
+                record = agent_from_row(row)
+            except RowError as e:
+                agent_id = row.get("agent_id") if isinstance(row, dict) else e.agent_id
+                outcome["agent_id"] = agent_id if isinstance(agent_id, str) else None
+                outcome["status"] = "invalid"
+                outcome["error"] = str(e)
+                continue
+            
+            outcome["agent_id"] = record.agent_id
+            if record.agent_id in seen:
+                outcome["status"] = "duplicate"
+                continue
+            seen.add(record.agent_id)
+            
+            if record.registered_at is None:
+                record.registered_at = now
+            if record.status is None:
+                record.status = "active"
+            accepted.append(record)
+            accepted_rows.append(outcome)
+        
+        if self.store is not None:
+            added = self.store.add_agents(accepted)
+        else:
+            with self._lock:
+                records = self._registry()
+                added = [record.agent_id not in self._by_id for record in accepted]
+                new_records = [freeze(record.copy()) for record, new in zip(accepted, added) if new]
+                if new_records:
+                    self._records = records + new_records
+                    self._by_id.update((record.agent_id, record) for record in new_records)
+                    self._positions.update((record.agent_id, len(records) + i) for i, record in enumerate(new_records))
+                    for record in new_records:
+                        self._stats.add(record)
+                    self._save_registry(self._records)
+        
+        for outcome, new in zip(accepted_rows, added):
+            outcome["status"] = "registered" if new else "exists"
+        
+        counts = {status: 0 for status in ("registered", "duplicate", "exists", "invalid")}
+        for outcome in outcomes:
+            counts[outcome["status"]] += 1
+        print(f"✅ Bulk registration: {counts['registered']}/{len(outcomes)} agent(s) registered "
+              f"({counts['exists']} existing, {counts['duplicate']} duplicate, {counts['invalid']} invalid)")
+        return {"total": len(outcomes), **counts, "rows": outcomes}
+    
+    @staticmethod
+    def _apply_reputation(agent: AgentRecord, success: bool, now: str) -> AgentRecord:
+        """Updated frozen copy of `agent`; the record itself is left untouched"""
+        agent = agent.copy()
+        if success:
+            agent.reputation_score += 1
+            agent.total_successful_txs += 1
+        else:
+            # Decrease reputation for failures
+            agent.reputation_score = max(0, agent.reputation_score - 5)
+            agent.total_failed_txs += 1
+        agent.last_updated = now
+        return freeze(agent)
+    
+    def _replace_records(self, records: List[AgentRecord], updated: Dict[str, AgentRecord]) -> List[AgentRecord]:
+        """Swap in updated records (copy-on-write, so readers holding the old list are unaffected)"""
+        # Only called with the registry lock held
+        records = list(records)
+        for agent_id, record in updated.items():
+            records[self._positions[agent_id]] = record
+            self._by_id[agent_id] = record
+        self._records = records
+        return records
+    
     def update_agent_reputation(self, agent_id: str, success: bool) -> bool:
         """Update agent reputation after transaction"""
         try:
-            registry = self._load_registry()
-            agents = registry.get("agents", [])
+            if self.store is not None:
+                score = self.store.update_reputations([(agent_id, success)], datetime.utcnow().isoformat() + "Z")[0]
+                if score is None:
+                    print(f"❌ Agent {agent_id} not found")
+                    return False
+                print(f"✅ Updated reputation for {agent_id}: {score}")
+                return True
             
-            for agent in agents:
-                if agent.get("agent_id") == agent_id:
-                    if success:
-                        agent["reputation_score"] = agent.get("reputation_score", 100) + 1
-                        agent["total_successful_txs"] = agent.get("total_successful_txs", 0) + 1
-                    else:
-                        # Decrease reputation for failures
-                        current_rep = agent.get("reputation_score", 100)
-                        agent["reputation_score"] = max(0, current_rep - 5)
-                        agent["total_failed_txs"] = agent.get("total_failed_txs", 0) + 1
-                    
-                    agent["last_updated"] = datetime.utcnow().isoformat() + "Z"
-                    self._save_registry(registry)
-                    
-                    print(f"✅ Updated reputation for {agent_id}: {agent['reputation_score']}")
-                    return True
-            
-            print(f"❌ Agent {agent_id} not found")
-            return False
+            with self._lock:
+                records = self._registry()
+                agent = self._by_id.get(agent_id)
+                if agent is None:
+                    print(f"❌ Agent {agent_id} not found")
+                    return False
+                
+                self._stats.remove(agent)
+                agent = self._apply_reputation(agent, success, datetime.utcnow().isoformat() + "Z")
+                self._stats.add(agent)
+                self._save_registry(self._replace_records(records, {agent_id: agent}))
             
+            print(f"✅ Updated reputation for {agent_id}: {agent.reputation_score}")
+            return True
+        
         except Exception as e:
             print(f"Error updating reputation: {e}")
             return False
     
+    def update_agent_reputations_bulk(self, updates: List[Tuple[str, bool]]) -> int:
+        """Apply many (agent_id, success) reputation updates in one registry commit"""
+        try:
+            if self.store is not None:
+                scores = self.store.update_reputations(updates, datetime.utcnow().isoformat() + "Z")
+                for (agent_id, _), score in zip(updates, scores):
+                    if score is None:
+                        print(f"❌ Agent {agent_id} not found")
+                applied = sum(score is not None for score in scores)
+                if applied:
+                    print(f"✅ Updated reputation for {applied} agent transaction(s)")
+                return applied
+            
+            now = datetime.utcnow().isoformat() + "Z"
+            applied = 0
+            with self._lock:
+                records = self._registry()
+                updated = {}
+                for agent_id, success in updates:
+                    # An agent updated earlier in this batch continues from its new record
+                    agent = updated.get(agent_id) or self._by_id.get(agent_id)
+                    if agent is None:
+                        print(f"❌ Agent {agent_id} not found")
+                        continue
+                    self._stats.remove(agent)
+                    updated[agent_id] = self._apply_reputation(agent, success, now)
+                    self._stats.add(updated[agent_id])
+                    applied += 1
+                
+                if applied:
+                    self._save_registry(self._replace_records(records, updated))
+            
+            if applied:
+                print(f"✅ Updated reputation for {applied} agent transaction(s)")
+            return applied
+        
+        except Exception as e:
+            print(f"Error updating reputations: {e}")
+            return 0
+    
     def update_agent_status(self, agent_id: str, status: str) -> bool:
         """Update agent status (active/inactive/maintenance)"""
         try:
-            registry = self._load_registry()
-            agents = registry.get("agents", [])
-            
-            for agent in agents:
-                if agent.get("agent_id") == agent_id:
-                    agent["status"] = status
-                    agent["last_updated"] = datetime.utcnow().isoformat() + "Z"
-                    self._save_registry(registry)
-                    
+            if self.store is not None:
+                updated = self.store.set_status(agent_id, status, datetime.utcnow().isoformat() + "Z")
+                if updated:
                     print(f"✅ Updated status for {agent_id}: {status}")
-                    return True
+                return updated
             
-            return False
+            with self._lock:
+                records = self._registry()
+                agent = self._by_id.get(agent_id)
+                if agent is None:
+                    return False
+                self._stats.remove(agent)
+                agent = agent.copy()
+                agent.status = status
+                agent.last_updated = datetime.utcnow().isoformat() + "Z"
+                freeze(agent)
+                self._stats.add(agent)
+                self._save_registry(self._replace_records(records, {agent_id: agent}))
             
+            print(f"✅ Updated status for {agent_id}: {status}")
+            return True
+        
         except Exception as e:
             print(f"Error updating status: {e}")
             return False
     
-    def get_best_agent(self, service_type: str) -> Optional[Dict]:
-        """Get best agent by reputation for a service type"""
-        agents = self.get_agents_by_service_type(service_type)
+    def registry_version(self) -> str:
+        """Changes whenever any agent is added or updated (usable as an ETag)"""
+        if self.store is not None:
+            return str(self.store.registry_version())
+        stamp = self._file_stamp()
+        return "%x-%x" % stamp if stamp else "0"
+    
+    def query_agents(
+        self,
+        service_type: Optional[str] = None,
+        status: Optional[str] = None,
+        min_reputation: Optional[int] = None,
+        sort: str = "reputation",
+        cursor: Optional[str] = None,
+        limit: int = 100
+    ) -> Tuple[List[AgentRecord], Optional[str], int]:
+        """
+        One page of agents matching the filters, sorted by reputation
+        (highest first) or recency (newest registration first).
         
-        # Filter only active agents
-        active_agents = [a for a in agents if a.get("status") == "active"]
+        Returns (agents, cursor for the next page or None, total matches).
+        Raises ValueError for an unknown sort or a bad cursor.
+        """
+        if sort not in AGENT_SORTS:
+            raise ValueError(f"Unknown sort '{sort}' (expected one of {', '.join(AGENT_SORTS)})")
+        after = decode_cursor(cursor, sort) if cursor else None
         
-        if not active_agents:
-            return None
+        if self.store is not None:
+            # One extra row tells whether there is a next page
+            page, total = self.store.query_agents(service_type, status, min_reputation, sort, after, limit + 1)
+        else:
+            records = self._registry()
+            def matches(a: AgentRecord) -> bool:
+                return ((service_type is None or a.service_type == service_type)
+                        and (status is None or a.status == status)
+                        and (min_reputation is None or a.reputation_score >= min_reputation))
+            
+            if sort == "recent":
+                # Registrations only ever append, so list positions are stable
+                start = len(records) - 1 if after is None else min(after[0], len(records)) - 1
+                total = sum(1 for a in records if matches(a))
+                page = []
+                for position in range(start, -1, -1):
+                    if len(page) > limit:
+                        break
+                    if matches(records[position]):
+                        page.append(((position,), records[position]))
+            else:
+                matching = [a for a in records if matches(a)]
+                total = len(matching)
+                if after is not None:
+                    score, agent_id = after
+                    matching = [a for a in matching if a.reputation_score < score
+                                or (a.reputation_score == score and a.agent_id > agent_id)]
+                # Partial selection, no full sort
+                page = [((a.reputation_score, a.agent_id), a) for a in heapq.nsmallest(
+                    limit + 1, matching, key=lambda a: (-a.reputation_score, a.agent_id)
+                )]
         
-        # Sort by reputation score (descending)
-        sorted_agents = sorted(
-            active_agents,
-            key=lambda x: x.get("reputation_score", 0),
-            reverse=True
-        )
+        next_cursor = encode_cursor(sort, page[limit - 1][0]) if len(page) > limit else None
+        return [agent for _, agent in page[:limit]], next_cursor, total
+    
+    def get_best_agent(self, service_type: str) -> Optional[AgentRecord]:
+        """Get best agent by reputation for a service type"""
+        agents = self.get_agents_by_service_type(service_type)
         
-        return sorted_agents[0] if sorted_agents else None
+        # Best active agent by reputation score
+        active_agents = (a for a in agents if a.status == "active")
+        return max(active_agents, key=lambda a: a.reputation_score, default=None)
     
     def get_registry_stats(self) -> Dict:
-        """Get registry statistics"""
-        agents = self.get_all_agents()
+        """
+        Get registry statistics: totals, reputation percentiles and a
+        breakdown per service type. Maintained on every registry change,
+        so reads do not depend on the number of agents.
+        """
+        self._ensure_stats_verifier()
+        if self.store is not None:
+            # Other workers update the store too; re-read only when it changed
+            version = self.store.registry_version()
+            cached = self._store_stats
+            if cached is None or cached[0] != version:
+                cached = self._store_stats = (version, self.store.registry_stats().snapshot())
+            return cached[1]
+        
+        with self._lock:
+            self._registry()
+            return self._stats.snapshot()
+    
+    def verify_stats(self) -> bool:
+        """Compare the maintained stats with a full recompute (and repair them); True if they had drifted"""
+        if self.store is not None:
+            drifted = self.store.verify_stats()
+        else:
+            with self._lock:
+                recomputed = RegistryStats.from_agents(self._registry())
+                drifted = recomputed != self._stats
+                if drifted:
+                    self._stats = recomputed
         
-        if not agents:
-            return {
-                "total_agents": 0,
-                "active_agents": 0,
-                "total_transactions": 0,
-                "average_reputation": 0
-            }
-        
-        active_agents = [a for a in agents if a.get("status") == "active"]
-        total_txs = sum(
-            a.get("total_successful_txs", 0) + a.get("total_failed_txs", 0)
-            for a in agents
-        )
-        avg_rep = sum(a.get("reputation_score", 0) for a in agents) / len(agents)
-        
-        return {
-            "total_agents": len(agents),
-            "active_agents": len(active_agents),
-            "total_transactions": total_txs,
-            "average_reputation": round(avg_rep, 2)
-        }
+        if drifted:
+            metrics.REGISTRY_STATS_DRIFT.inc()
+            print("⚠️ Registry stats had drifted from the agents; replaced by a full recompute")
+        return drifted
+    
+    def _ensure_stats_verifier(self):
+        """Start the periodic stats check on first use"""
+        if REGISTRY_STATS_VERIFY_INTERVAL <= 0 or self._stats_verifier is not None:
+            return
+        with self._lock:
+            if self._stats_verifier is not None:
+                return
+            self._stats_verifier = threading.Thread(
+                target=self._run_stats_verifier,
+                name="registry-stats-verifier",
+                daemon=True
+            )
+            self._stats_verifier.start()
+    
+    def _run_stats_verifier(self):
+        while True:
+            time.sleep(REGISTRY_STATS_VERIFY_INTERVAL)
+            try:
+                self.verify_stats()
+            except Exception as e:
+                print(f"⚠️ Registry stats check failed: {e}")
 
 # Global instance
 agent_manager = AgentManager()
-
@@ -0,0 +1,133 @@
+"""
+Compact Agent Records
+The registry, discovery and orchestration carry agents as AgentRecord
+objects instead of free-form dicts:
+- Fixed __slots__ (no per-agent __dict__), numeric fields as plain ints
+- service_type and status strings interned and shared by all agents,
+  wallet/owner sharing the pubkey string when they are equal
+- Fields the orchestrator does not use (name, pricing, capabilities, ...)
+  kept in one optional `extra` dict
+Dicts only appear at the JSON boundary: to_dict() for the registry file
+and API responses, from_dict() for registry files and API input.
+
+Records held by the in-memory registry are frozen (FrozenAgentRecord):
+callers share them without copying but cannot change them, so every
+change goes through AgentManager's locked update functions. copy() gives
+a mutable record.
+"""
+import sys
+from types import MappingProxyType
+from typing import Any, Dict, Optional
+
+# Serialised in this order; None means the field is absent
+FIELDS = (
+    "agent_id", "pubkey", "wallet", "name", "service_type", "api_url", "owner",
+    "reputation_score", "total_successful_txs", "total_failed_txs",
+    "status", "registered_at", "last_updated"
+)
+
+
+def _shared(value: Optional[str]) -> Optional[str]:
+    return sys.intern(value) if isinstance(value, str) else value
+
+
+class AgentRecord:
+    __slots__ = FIELDS + ("extra",)
+
+    def __init__(
+        self,
+        agent_id: str,
+        api_url: Optional[str] = None,
+        service_type: Optional[str] = None,
+        pubkey: Optional[str] = None,
+        wallet: Optional[str] = None,
+        owner: Optional[str] = None,
+        name: Optional[str] = None,
+        reputation_score: int = 100,
+        total_successful_txs: int = 0,
+        total_failed_txs: int = 0,
+        status: Optional[str] = None,
+        registered_at: Optional[str] = None,
+        last_updated: Optional[str] = None,
+        extra: Optional[Dict[str, Any]] = None
+    ):
+        self.agent_id = agent_id
+        self.api_url = api_url
+        self.service_type = _shared(service_type)
+        self.pubkey = pubkey
+        # The same key is often repeated as wallet and owner; keep one string
+        self.wallet = pubkey if wallet == pubkey else wallet
+        self.owner = pubkey if owner == pubkey else (self.wallet if owner == wallet else owner)
+        self.name = name
+        self.reputation_score = reputation_score
+        self.total_successful_txs = total_successful_txs
+        self.total_failed_txs = total_failed_txs
+        self.status = _shared(status)
+        self.registered_at = registered_at
+        self.last_updated = last_updated
+        self.extra = extra or None
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "AgentRecord":
+        fields = {}
+        extra = {}
+        for key, value in data.items():
+            if key in _FIELD_SET:
+                fields[key] = value
+            else:
+                extra[key] = value
+        for key, default in (("reputation_score", 100), ("total_successful_txs", 0), ("total_failed_txs", 0)):
+            if fields.get(key) is None:
+                fields[key] = default
+        return cls(extra=extra, **fields)
+
+    def to_dict(self) -> Dict[str, Any]:
+        data = {}
+        for field in FIELDS:
+            value = getattr(self, field)
+            if value is not None:
+                data[field] = value
+        if self.extra:
+            data.update(self.extra)
+        return data
+
+    def copy(self) -> "AgentRecord":
+        """Mutable copy of this record"""
+        record = AgentRecord.__new__(AgentRecord)
+        for field in FIELDS:
+            setattr(record, field, getattr(self, field))
+        record.extra = dict(self.extra) if self.extra else None
+        return record
+
+    @property
+    def seller_key(self) -> Optional[str]:
+        """The key validations are recorded against"""
+        return self.pubkey or self.wallet
+
+    def __repr__(self) -> str:
+        return f"<AgentRecord {self.agent_id} {self.service_type} rep={self.reputation_score}>"
+
+
+_FIELD_SET = frozenset(FIELDS)
+
+
+class FrozenAgentRecord(AgentRecord):
+    """Read-only registry record; see freeze() (changes go through copy())"""
+
+    __slots__ = ()
+
+    def __setattr__(self, name: str, value: Any):
+        raise AttributeError(f"Registry agent records are read-only (setting '{name}'); update them through AgentManager")
+
+    def __delattr__(self, name: str):
+        raise AttributeError(f"Registry agent records are read-only (deleting '{name}')")
+
+
+def freeze(record: AgentRecord) -> FrozenAgentRecord:
+    """Make `record` read-only in place (its extra fields too)"""
+    if type(record) is not FrozenAgentRecord:
+        if isinstance(record.extra, dict):
+            record.extra = MappingProxyType(record.extra)
+        record.__class__ = FrozenAgentRecord
+    return record
+
@@ -4,25 +4,178 @@ Flask API Server for X-Gov Orchestrator Agent
 Exposes REST API for Web UI to trigger orchestration with REAL x402 payments
 """
 
-from flask import Flask, request, jsonify
+from flask import Flask, Response, request, jsonify, g
 from flask_cors import CORS
 import asyncio
+import hmac
+import json
+import os
 import sys
-from main import orchestrate_task
+import time
+import metrics
+import profiler
+import traffic_trace
+import workers
+from admission import AdmissionController, AdmissionRejected
+from service_payload import ServicePayload, close_payloads
+from rpc_pool import get_rpc_pool
+from local_planner import local_planner
+from receipt_ledger import parse_duration, receipt_ledger
+
+# Pre-forked workers must share one registry and cache store; this has to be
+# configured before main / agent_manager are imported
+ORCHESTRATOR_WORKERS = int(os.getenv('ORCHESTRATOR_WORKERS', '1'))
+if ORCHESTRATOR_WORKERS > 1:
+    os.environ.setdefault(
+        'ORCHESTRATOR_SHARED_STORE',
+        os.path.join(os.path.dirname(os.path.abspath(__file__)), 'orchestrator_store.db')
+    )
+
+from main import orchestrate_task, startup_state, start_background_startup, SOLANA_RPC_URLS
 
 app = Flask(__name__)
 CORS(app)  # Enable CORS for Web UI
 
+# Debug endpoints are only served when a token is configured
+DEBUG_PROFILE_TOKEN = os.getenv('DEBUG_PROFILE_TOKEN')
+
+# Optional traffic recording for offline replay (ORCHESTRATION_TRACE_PATH)
+trace_recorder = traffic_trace.recorder_from_env()
+
+# Bounded, per-client fair queue in front of orchestrations
+admission_controller = AdmissionController()
+
+# /api/agents page size (default and maximum)
+AGENTS_PAGE_LIMIT = int(os.getenv('AGENTS_PAGE_LIMIT', '100'))
+AGENTS_PAGE_MAX = int(os.getenv('AGENTS_PAGE_MAX', '1000'))
+
+# /api/receipts page size (default and maximum)
+RECEIPTS_PAGE_LIMIT = int(os.getenv('RECEIPTS_PAGE_LIMIT', '100'))
+RECEIPTS_PAGE_MAX = int(os.getenv('RECEIPTS_PAGE_MAX', '1000'))
+
+@app.before_request
+def start_request_timer():
+    g.request_start = time.perf_counter()
+
+@app.after_request
+def record_request_metrics(response):
+    start = g.get('request_start')
+    if start is not None:
+        endpoint = request.url_rule.rule if request.url_rule else 'unmatched'
+        metrics.HTTP_DURATION.observe(time.perf_counter() - start, endpoint)
+        metrics.HTTP_REQUESTS.inc(endpoint, str(response.status_code))
+    return response
+
 @app.route('/health', methods=['GET'])
 def health():
-    """Health check endpoint"""
+    """
+    Health check endpoint
+    
+    Liveness is implied by any response; readiness is reported separately
+    and only becomes true once the startup phase has loaded the wallet and
+    LLM client. Wallet funding runs in the background and does not gate it.
+    `rpc_endpoints` shows each pooled Solana RPC endpoint's smoothed
+    latency, cooldown and request outcomes; `planner` the local planner's
+    hit ratio and the LLM planning time it saved.
+    With ORCHESTRATOR_WORKERS > 1 each answer comes from one worker process.
+    """
+    worker_index, worker_count = workers.current_worker()
     return jsonify({
         'status': 'healthy',
+        'live': True,
+        'ready': startup_state['ready'],
+        'startup': startup_state,
+        'admission': admission_controller.snapshot(),
+        'rpc_endpoints': get_rpc_pool(SOLANA_RPC_URLS).snapshot(),
+        'planner': local_planner.snapshot(),
+        'worker': {'index': worker_index, 'count': worker_count, 'pid': os.getpid()},
         'service': 'X-Gov Orchestrator Agent',
         'mode': 'PRODUCTION (Real LLM + Real x402)',
         'version': '1.0.0'
     })
 
+@app.route('/health/ready', methods=['GET'])
+def readiness():
+    """Readiness probe: 503 until the startup phase has completed"""
+    ready = startup_state['ready']
+    return jsonify({
+        'ready': ready,
+        'startup': startup_state
+    }), (200 if ready else 503)
+
+@app.route('/metrics', methods=['GET'])
+def prometheus_metrics():
+    """Per-stage latency histograms and counters in Prometheus text format"""
+    return Response(metrics.render(), content_type='text/plain; version=0.0.4; charset=utf-8')
+
+def run_orchestration(user_task, deadline_ms=None, stream_payload=False):
+    """Run one orchestration on a fresh event loop; returns (results, stage timings, slow profile id)"""
+    # Profile this request only when slow-orchestration profiling is on
+    sampler = profiler.start_request_profile() if profiler.slow_profiling_enabled() else None
+    started = time.perf_counter()
+    
+    async def run():
+        timings = metrics.collect_stage_timings()
+        return await orchestrate_task(user_task, deadline_ms=deadline_ms, stream_payload=stream_payload) or {}, timings
+    
+    # Execute REAL orchestration with x402 payments
+    loop = asyncio.new_event_loop()
+    asyncio.set_event_loop(loop)
+    try:
+        results, timings = loop.run_until_complete(run())
+    finally:
+        loop.close()
+        profile_id = None
+        if sampler is not None:
+            elapsed_ms = (time.perf_counter() - started) * 1000
+            profile_id = profiler.finish_request_profile(sampler, elapsed_ms, user_task[:60])
+    
+    return results, timings, profile_id
+
+def _result_entry(result, first_success):
+    """A subtask result without its payload; the promoted one points at the top-level "data" instead"""
+    entry = {key: value for key, value in result.items() if key != 'service_data'}
+    if result is first_success:
+        entry['service_data_in'] = 'data'
+    return entry
+
+def _response_results(results, first_success):
+    """Results for a buffered response: every payload appears exactly once"""
+    return {
+        name: _result_entry(result, first_success) if result is first_success else result
+        for name, result in results.items()
+    }
+
+def _stream_response(envelope, results, first_success):
+    """
+    Yield the response JSON with each subtask's spooled payload copied in
+    chunk by chunk (never parsed or held whole), the top-level "data" last
+    """
+    yield json.dumps(envelope)[:-1].encode() + b', "results": {'
+    for i, (name, result) in enumerate(results.items()):
+        head = (b', ' if i else b'') + json.dumps(name).encode() + b': '
+        payload = result.get('service_data')
+        if result is not first_success and not isinstance(payload, ServicePayload):
+            # Not spooled (e.g. an error result): written as is
+            yield head + json.dumps(result).encode()
+            continue
+        entry = json.dumps(_result_entry(result, first_success)).encode()
+        if result is first_success:
+            yield head + entry
+            continue
+        yield head + entry[:-1] + b', "service_data": '
+        yield from payload.chunks()
+        yield b'}'
+    yield b'}'
+    if first_success is not None:
+        yield b', "data": '
+        payload = first_success.get('service_data')
+        if isinstance(payload, ServicePayload):
+            yield from payload.chunks()
+        else:
+            yield json.dumps(payload).encode()
+    yield b'}'
+
 @app.route('/api/orchestrate', methods=['POST'])
 def orchestrate():
     """
@@ -30,9 +183,26 @@ def orchestrate():
     
     Request:
     {
-        "task": "User task description"
+        "task": "User task description",
+        "deadlineMs": 15000,         (optional time budget for the whole orchestration)
+        "stream": true               (optional: stream service data through in chunks)
     }
     
+    When the deadline is hit, whatever finished is returned with
+    "deadlineExceeded": true (504 if nothing succeeded).
+    
+    Requests wait for one of ORCHESTRATION_CONCURRENCY slots in a fair
+    per-client queue (client = X-Client-Id header, else remote address).
+    When the client's queue is full the answer is 429, when the whole queue
+    is full or the wait times out it is 503, both with Retry-After.
+    
+    Service data over SERVICE_RESPONSE_MAX_BYTES fails the subtask. Each
+    payload appears once: the first successful subtask's as "data" (its
+    entry in "results" says "service_data_in": "data"), the others as their
+    "service_data". With "stream" the payloads are spooled unparsed and the
+    response is sent chunked, payloads last, so memory stays bounded
+    whatever their size.
+    
     Response:
     {
         "success": true,
@@ -44,11 +214,13 @@ def orchestrate():
                 "payment_tx": "5K7mNpQ8xYz... (REAL Solana signature)",
                 "validation_tx": "ValidationTx_... (REAL Solana signature)",
                 "amount_paid_sol": 0.005,
-                "service_data": {...}
+                "service_data_in": "data"
             }
-        }
+        },
+        "data": {...}
     }
     """
+    results = None
     try:
         data = request.get_json()
         
@@ -59,45 +231,104 @@ def orchestrate():
             }), 400
         
         user_task = data['task']
+        deadline_ms = data.get('deadlineMs')
+        if deadline_ms is not None:
+            if isinstance(deadline_ms, bool) or not isinstance(deadline_ms, (int, float)) or deadline_ms <= 0:
+                return jsonify({
+                    'success': False,
+                    'error': '"deadlineMs" must be a positive number of milliseconds'
+                }), 400
+        stream_payload = bool(data.get('stream', False))
         
         print(f"\n{'='*80}")
         print(f"📥 API REQUEST: Orchestrate Task")
         print(f"   Task: {user_task[:100]}...")
         print(f"{'='*80}\n")
         
-        # Execute REAL orchestration with x402 payments
-        loop = asyncio.new_event_loop()
-        asyncio.set_event_loop(loop)
-        results = loop.run_until_complete(orchestrate_task(user_task))
-        loop.close()
+        received_at = time.time()
+        started = time.perf_counter()
+        
+        # Wait for a worker slot (fair across clients); queueing time counts
+        # against the caller's deadline
+        client_id = request.headers.get('X-Client-Id') or request.remote_addr or 'anonymous'
+        queue_timeout = deadline_ms / 1000 if deadline_ms else None
+        if queue_timeout is not None:
+            queue_timeout = min(queue_timeout, admission_controller.queue_timeout)
+        try:
+            with admission_controller.admit(client_id, queue_timeout) as waited:
+                if deadline_ms:
+                    deadline_ms = max(1.0, deadline_ms - waited * 1000)
+                results, timings, profile_id = run_orchestration(user_task, deadline_ms, stream_payload)
+        except AdmissionRejected as rejected:
+            print(f"🚦 Orchestration rejected ({rejected.reason}) for client {client_id}")
+            return jsonify({
+                'success': False,
+                'error': 'Too many requests from this client' if rejected.status == 429 else 'Orchestrator is at capacity',
+                'reason': rejected.reason,
+                'retryAfter': rejected.retry_after
+            }), rejected.status, {'Retry-After': str(rejected.retry_after)}
+        
+        deadline_exceeded = any(r.get('deadline_exceeded', False) for r in results.values())
         
-        # Check if at least one task succeeded
-        success = any(r.get('success', False) for r in results.values())
+        stage_timings = [
+            {'stage': stage, 'service_type': service_type, 'agent': agent, 'ms': round(seconds * 1000, 3)}
+            for stage, service_type, agent, seconds in timings
+        ]
         
         # Get first successful task for simple response
         first_success = next((r for r in results.values() if r.get('success')), None)
         
         if first_success:
-            return jsonify({
+            envelope, status = {
                 'success': True,
                 'agent': first_success.get('agent'),
                 'reputation': first_success.get('reputation'),
                 'paymentTx': first_success.get('payment_tx'),
                 'validationTx': first_success.get('validation_tx'),
-                'data': first_success.get('service_data'),
-                'results': results
-            })
+                'deadlineExceeded': deadline_exceeded,
+                'stageTimings': stage_timings,
+                'profileId': profile_id
+            }, 200
         else:
-            return jsonify({
+            envelope, status = {
                 'success': False,
-                'error': 'All tasks failed',
-                'results': results
-            }), 500
+                'error': 'Deadline exceeded' if deadline_exceeded else 'All tasks failed',
+                'deadlineExceeded': deadline_exceeded,
+                'stageTimings': stage_timings,
+                'profileId': profile_id
+            }, 504 if deadline_exceeded else 500
+        
+        if stream_payload:
+            response = Response(_stream_response(envelope, results, first_success), content_type='application/json')
+            response.call_on_close(lambda: close_payloads(results))
+            response_bytes = sum(r.get('service_data_bytes') or 0 for r in results.values())
+        else:
+            body = dict(envelope, results=_response_results(results, first_success))
+            if first_success:
+                body['data'] = first_success.get('service_data')
+            response = jsonify(body)
+            response_bytes = response.content_length or 0
+        
+        if trace_recorder is not None and trace_recorder.should_record():
+            trace_recorder.record(traffic_trace.build_trace(
+                user_task,
+                results,
+                stage_timings,
+                status,
+                elapsed_ms=(time.perf_counter() - started) * 1000,
+                response_bytes=response_bytes,
+                received_at=received_at
+            ))
+        
+        return response, status
             
     except Exception as e:
         import traceback
         print(f"\n🚨 API ERROR:")
         traceback.print_exc()
+        # No response will stream them, so release any spooled payloads now
+        if results:
+            close_payloads(results)
         
         return jsonify({
             'success': False,
@@ -108,23 +339,84 @@ def orchestrate():
 @app.route('/api/agents', methods=['GET'])
 def list_agents():
     """
-    List all registered agents from Professional Agent Registry
+    List registered agents from Professional Agent Registry
+    
+    Query parameters: service_type, status, min_reputation (filters),
+    sort=reputation|recent, limit, cursor (the previous page's next_cursor).
+    Responses carry the registry version as ETag; a poll with a matching
+    If-None-Match gets 304 Not Modified without touching the agents.
     """
     try:
         from agent_manager import agent_manager
         
-        # Get all agents from professional registry
-        all_agents = agent_manager.get_all_agents()
+        etag = agent_manager.registry_version()
+        if etag in request.if_none_match:
+            response = Response(status=304)
+            response.set_etag(etag)
+            return response
+        
+        try:
+            min_reputation = request.args.get('min_reputation')
+            min_reputation = int(min_reputation) if min_reputation is not None else None
+            limit = min(max(1, int(request.args.get('limit', AGENTS_PAGE_LIMIT))), AGENTS_PAGE_MAX)
+            agents, next_cursor, total = agent_manager.query_agents(
+                service_type=request.args.get('service_type'),
+                status=request.args.get('status'),
+                min_reputation=min_reputation,
+                sort=request.args.get('sort', 'reputation'),
+                cursor=request.args.get('cursor'),
+                limit=limit
+            )
+        except ValueError as e:
+            return jsonify({'success': False, 'error': str(e)}), 400
         
         # Get registry stats
         stats = agent_manager.get_registry_stats()
         
-        return jsonify({
+        response = jsonify({
             'success': True,
-            'total': len(all_agents),
-            'agents': all_agents,
+            'total': total,
+            'agents': [agent.to_dict() for agent in agents],
+            'next_cursor': next_cursor,
             'stats': stats
         })
+        response.set_etag(etag)
+        response.headers['Cache-Control'] = 'no-cache'
+        return response
+        
+    except Exception as e:
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 500
+
+@app.route('/api/agents/bulk', methods=['POST'])
+def register_agents_bulk():
+    """
+    Register many agents in one registry commit
+    
+    Body: JSONL (one agent object per line), CSV with a header row
+    (Content-Type text/csv or ?format=csv), or a JSON array of agents.
+    Returns counts per outcome and the outcome of every row.
+    """
+    try:
+        import io
+        from agent_import import detect_format, iter_agent_rows
+        from agent_manager import agent_manager
+        
+        if request.mimetype == 'application/json':
+            rows = request.get_json(silent=True)
+            if not isinstance(rows, list):
+                return jsonify({'success': False, 'error': 'Expected a JSON array of agents'}), 400
+        else:
+            fmt = request.args.get('format') or detect_format(content_type=request.mimetype)
+            try:
+                rows = iter_agent_rows(io.TextIOWrapper(request.stream, encoding='utf-8', newline=''), fmt)
+            except ValueError as e:
+                return jsonify({'success': False, 'error': str(e)}), 400
+        
+        report = agent_manager.register_agents_bulk(rows)
+        return jsonify({'success': True, **report})
         
     except Exception as e:
         return jsonify({
@@ -153,6 +445,155 @@ def get_agent_stats():
             'error': str(e)
         }), 500
 
+def _receipt_window(default_window: str = None):
+    """(since, until) from ?since/?until (unix seconds) or ?window (e.g. 24h, ending at until or now)"""
+    until = request.args.get('until')
+    until = float(until) if until is not None else None
+    since = request.args.get('since')
+    if since is not None:
+        return float(since), until
+    window = request.args.get('window', default_window)
+    if window is None:
+        return None, until
+    end = until if until is not None else time.time()
+    return end - parse_duration(window), end
+
+@app.route('/api/receipts', methods=['GET'])
+def list_receipts():
+    """
+    Payment and validation receipts from the local ledger, newest first
+    
+    Query parameters: agent_id, service_type, kind=payment|validation,
+    since/until (unix seconds) or window (e.g. 1h), limit, cursor (the
+    previous page's next_cursor, with the same filters and window).
+    Receipts are served from what the ledger has written, which trails
+    the latest payments by up to RECEIPT_FLUSH_INTERVAL.
+    """
+    try:
+        try:
+            since, until = _receipt_window()
+            limit = min(max(1, int(request.args.get('limit', RECEIPTS_PAGE_LIMIT))), RECEIPTS_PAGE_MAX)
+            receipts, next_cursor = receipt_ledger.receipts(
+                agent_id=request.args.get('agent_id'),
+                service_type=request.args.get('service_type'),
+                kind=request.args.get('kind'),
+                since=since,
+                until=until,
+                cursor=request.args.get('cursor'),
+                limit=limit
+            )
+        except ValueError as e:
+            return jsonify({'success': False, 'error': str(e)}), 400
+        
+        return jsonify({
+            'success': True,
+            'receipts': receipts,
+            'next_cursor': next_cursor
+        })
+        
+    except Exception as e:
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 500
+
+@app.route('/api/receipts/stats', methods=['GET'])
+def get_receipt_stats():
+    """
+    Spend, success rate and latency from the receipt ledger
+    
+    Query parameters: window (default 24h) or since/until (unix seconds),
+    group_by=agent|service_type|kind, bucket (time series bucket, e.g. 1h,
+    a multiple of 1m, at most RECEIPT_MAX_BUCKETS per window), and
+    agent_id, service_type, kind filters.
+    """
+    try:
+        try:
+            since, until = _receipt_window(default_window='24h')
+            bucket = request.args.get('bucket')
+            stats = receipt_ledger.aggregate(
+                since,
+                until if until is not None else time.time(),
+                group_by=request.args.get('group_by'),
+                bucket_seconds=int(parse_duration(bucket)) if bucket else None,
+                agent_id=request.args.get('agent_id'),
+                service_type=request.args.get('service_type'),
+                kind=request.args.get('kind')
+            )
+        except ValueError as e:
+            return jsonify({'success': False, 'error': str(e)}), 400
+        
+        return jsonify({'success': True, **stats})
+        
+    except Exception as e:
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 500
+
+def _debug_authorized() -> bool:
+    """Debug endpoints require DEBUG_PROFILE_TOKEN and a matching X-Debug-Token header"""
+    if not DEBUG_PROFILE_TOKEN:
+        return False
+    return hmac.compare_digest(request.headers.get('X-Debug-Token', ''), DEBUG_PROFILE_TOKEN)
+
+def _collapsed_response(collapsed: str, filename: str) -> Response:
+    return Response(
+        collapsed,
+        content_type='text/plain; charset=utf-8',
+        headers={'Content-Disposition': f'attachment; filename="{filename}"'}
+    )
+
+@app.route('/debug/profile', methods=['GET'])
+def debug_profile():
+    """
+    Capture a time-boxed sampling profile of the whole process
+    
+    Query: seconds (default 10, max 60), interval_ms (default 5)
+    Returns collapsed stacks (one `frame;frame;frame count` line per stack),
+    ready for flamegraph.pl or speedscope.
+    """
+    if not _debug_authorized():
+        return jsonify({'success': False, 'error': 'Not found'}), 404
+    
+    try:
+        seconds = float(request.args.get('seconds', 10))
+        interval = float(request.args.get('interval_ms', 5)) / 1000
+    except ValueError:
+        return jsonify({'success': False, 'error': 'Invalid seconds/interval_ms'}), 400
+    
+    print(f"🔬 Capturing {seconds}s profile...")
+    sampler = profiler.capture(seconds, interval=max(interval, 0.001))
+    if sampler is None:
+        return jsonify({'success': False, 'error': 'A profile capture is already running'}), 409
+    
+    print(f"✅ Profile captured: {sampler.sample_count} samples")
+    return _collapsed_response(sampler.collapsed(), f"profile-{int(sampler.started_at)}.folded")
+
+@app.route('/debug/profile/slow', methods=['GET'])
+def list_slow_profiles():
+    """List profiles kept for orchestrations above PROFILE_SLOW_ORCHESTRATION_MS"""
+    if not _debug_authorized():
+        return jsonify({'success': False, 'error': 'Not found'}), 404
+    
+    return jsonify({
+        'success': True,
+        'threshold_ms': profiler.SLOW_ORCHESTRATION_MS,
+        'profiles': profiler.list_slow_profiles()
+    })
+
+@app.route('/debug/profile/slow/<profile_id>', methods=['GET'])
+def get_slow_profile(profile_id):
+    """Download one slow-orchestration profile as collapsed stacks"""
+    if not _debug_authorized():
+        return jsonify({'success': False, 'error': 'Not found'}), 404
+    
+    profile = profiler.get_slow_profile(profile_id)
+    if profile is None:
+        return jsonify({'success': False, 'error': 'Profile not found'}), 404
+    
+    return _collapsed_response(profile['collapsed'], f"{profile_id}.folded")
+
 if __name__ == '__main__':
     print("""
 ╔══════════════════════════════════════════════════════════════╗
@@ -165,20 +606,39 @@ if __name__ == '__main__':
 ║  - Real blockchain verification                              ║
 ║                                                              ║
 ║  Endpoints:                                                  ║
-║    GET  /health              - Health check                  ║
+║    GET  /health              - Liveness + readiness          ║
+║    GET  /health/ready        - Readiness probe               ║
+║    GET  /metrics             - Prometheus metrics            ║
 ║    POST /api/orchestrate     - Execute orchestration         ║
 ║    GET  /api/agents          - List all agents               ║
+║    POST /api/agents/bulk     - Bulk register agents          ║
+║    GET  /api/receipts/stats  - Spend and success analytics   ║
 ║                                                              ║
-║  Port: 5000                                                  ║
+║  Port: 5001 (ORCHESTRATOR_PORT)                              ║
+║  Workers: 1 (ORCHESTRATOR_WORKERS)                           ║
 ║  Web UI: http://localhost:3000                               ║
 ║                                                              ║
 ╚══════════════════════════════════════════════════════════════╝
     """)
     
+    port = int(os.getenv('ORCHESTRATOR_PORT', '5001'))
+    
+    if ORCHESTRATOR_WORKERS > 1:
+        # Pre-fork: each worker runs its own startup (threads don't survive fork)
+        print(f"🗄️ Shared store: {os.environ['ORCHESTRATOR_SHARED_STORE']}")
+        workers.serve_prefork(
+            app, '0.0.0.0', port, ORCHESTRATOR_WORKERS,
+            on_worker_start=lambda index: start_background_startup()
+        )
+        sys.exit(0)
+    
+    # Load wallet/LLM client and fund the wallet without delaying port binding
+    start_background_startup()
+    
     # Run without debug mode to avoid termios issues when running in background
     app.run(
         host='0.0.0.0',
-        port=5001,
+        port=port,
         debug=False,
         threaded=True,
         use_reloader=False
@@ -0,0 +1,85 @@
+#!/usr/bin/env python3
+"""
+Import-Time Regression Check
+Uses `python -X importtime` in fresh interpreters to cap the import cost of
+the lightweight orchestrator modules and to make sure none of them pull in
+the heavy payment/RPC/LLM dependencies. Exits non-zero on regression.
+"""
+import argparse
+import os
+import subprocess
+import sys
+
+ORCHESTRATOR_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Cumulative import time caps in milliseconds (best of N runs)
+IMPORT_CAPS_MS = {
+    "agent_manager": 50,
+    "api_server": 400,
+}
+
+# Modules that must only be imported on first use in the payment/RPC/LLM paths
+DEFERRED_MODULES = ("solana", "solders", "openai", "httpx")
+
+
+def measure(module: str):
+    """Import module in a fresh interpreter; return (cumulative_ms, imported names)"""
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        cwd=ORCHESTRATOR_DIR,
+        capture_output=True,
+        text=True
+    )
+    if proc.returncode != 0:
+        raise RuntimeError(f"Importing {module} failed:\n{proc.stderr}")
+
+    cumulative_us = None
+    imported = set()
+    for line in proc.stderr.splitlines():
+        if not line.startswith("import time:") or "|" not in line:
+            continue
+        parts = line.split("|")
+        name = parts[2].strip()
+        imported.add(name)
+        if name == module and parts[1].strip().isdigit():
+            cumulative_us = int(parts[1].strip())
+
+    if cumulative_us is None:
+        raise RuntimeError(f"No importtime entry found for {module}")
+    return cumulative_us / 1000, imported
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--runs", type=int, default=5, help="Fresh interpreters per module (best is kept)")
+    args = parser.parse_args()
+
+    failures = []
+    for module, cap_ms in IMPORT_CAPS_MS.items():
+        best_ms = None
+        imported = set()
+        for _ in range(args.runs):
+            elapsed_ms, imported = measure(module)
+            best_ms = elapsed_ms if best_ms is None else min(best_ms, elapsed_ms)
+
+        leaked = sorted(
+            name for name in imported
+            if name.split(".")[0] in DEFERRED_MODULES
+        )
+        status = "✅" if best_ms <= cap_ms and not leaked else "❌"
+        print(f"{status} {module}: {best_ms:.1f}ms (cap {cap_ms}ms)")
+
+        if best_ms > cap_ms:
+            failures.append(f"{module} import took {best_ms:.1f}ms > {cap_ms}ms")
+        if leaked:
+            failures.append(f"{module} eagerly imports: {', '.join(leaked[:5])}")
+
+    if failures:
+        print("\n🚨 Import-time regression:")
+        for failure in failures:
+            print(f"   - {failure}")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,456 @@
+#!/usr/bin/env python3
+"""
+Offline End-to-End Orchestrator Benchmark
+Drives orchestrate_task (direct mode) or /api/orchestrate (api mode) against
+local stand-ins for Solana RPC, x402 service agents and the LLM, then reports
+orchestrations/sec, per-stage p50/p95/p99 and RPC calls per orchestration.
+
+With --workers N (api mode) the API runs as a separate pre-forked
+api_server.py process with N workers sharing one SQLite store.
+
+Examples:
+    python benchmarks/e2e_benchmark.py --orchestrations 200 --concurrency 8
+    python benchmarks/e2e_benchmark.py --mode api --workers 4 --wallets 4 --concurrency 32
+    python benchmarks/e2e_benchmark.py --mode api --rpc-latency-ms 20 --output after.json --compare before.json
+    python benchmarks/e2e_benchmark.py --rpc-latency-ms 5 20 80 --concurrency 16
+"""
+import argparse
+import contextlib
+import functools
+import io
+import json
+import os
+import socket
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import urllib.request
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Sequence, Union
+
+ORCHESTRATOR_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ORCHESTRATOR_DIR)
+
+from benchmarks.stubs import StubSolanaRPC, StubServiceAgent, FakeLLM
+
+SERVICE_TYPES = ["data_scraper", "text_analyst", "image_processor", "code_executor"]
+
+
+# ----------------------------------------------------
+# Stand-in wiring (shared with the replay tool)
+# ----------------------------------------------------
+
+class StandIns:
+    """Starts the stubs and points the orchestrator's configuration at them"""
+
+    def __init__(
+        self,
+        rpc_latency_ms: Union[float, Sequence[float]] = 2.0,
+        rpc_error_rate: float = 0.0,
+        agent_latency_ms: float = 10.0,
+        agent_error_rate: float = 0.0,
+        agent_slow_rate: float = 0.0,
+        agent_slow_ms: float = 0.0,
+        agents_per_type: int = 1,
+        payload_bytes: int = 1024,
+        llm_latency_ms: float = 50.0,
+        llm_error_rate: float = 0.0,
+        subtasks: int = 1,
+        jitter_ms: float = 0.0,
+        wallets: int = 1,
+        payer_lock_ms: float = 0.0,
+        local_planner: bool = False
+    ):
+        self.workdir = tempfile.TemporaryDirectory(prefix="xgov-bench-")
+        self.wallets = wallets
+        self.local_planner = local_planner
+        # One stub RPC endpoint per latency; the orchestrator pools them all
+        if isinstance(rpc_latency_ms, (int, float)):
+            rpc_latency_ms = [rpc_latency_ms]
+        self.rpcs = [StubSolanaRPC(
+            latency_ms=latency_ms,
+            error_rate=rpc_error_rate,
+            jitter_ms=jitter_ms,
+            payer_lock_ms=payer_lock_ms
+        ).start() for latency_ms in rpc_latency_ms]
+        self.agents: List[StubServiceAgent] = []
+        for service_type in SERVICE_TYPES:
+            for n in range(agents_per_type):
+                self.agents.append(StubServiceAgent(
+                    agent_id=f"Stub_{service_type}_{n}",
+                    service_type=service_type,
+                    payload_bytes=payload_bytes,
+                    latency_ms=agent_latency_ms,
+                    jitter_ms=jitter_ms,
+                    error_rate=agent_error_rate,
+                    slow_rate=agent_slow_rate,
+                    slow_ms=agent_slow_ms
+                ).start())
+        plan = [
+            {"name": f"Subtask {i + 1}", "service_type": SERVICE_TYPES[i % len(SERVICE_TYPES)], "budget_usd": 5.0}
+            for i in range(subtasks)
+        ]
+        self.llm = FakeLLM(plan=plan, latency_ms=llm_latency_ms, error_rate=llm_error_rate, jitter_ms=jitter_ms).start()
+
+    @property
+    def rpc(self) -> StubSolanaRPC:
+        return self.rpcs[0]
+
+    def configure_environment(self):
+        """Must run before importing main / agent_manager"""
+        registry_path = os.path.join(self.workdir.name, "agent_registry.json")
+        with open(registry_path, "w") as f:
+            json.dump({
+                "agents": [
+                    agent.registry_entry(reputation_score=150 - i)
+                    for i, agent in enumerate(self.agents)
+                ],
+                "metadata": {"version": "1.0.0"}
+            }, f)
+
+        os.environ.update({
+            "SOLANA_RPC_URL": self.rpc.url,
+            "SOLANA_RPC_URLS": ",".join(rpc.url for rpc in self.rpcs),
+            "OPENAI_API_KEY": "sk-offline-benchmark",
+            "OPENAI_BASE_URL": self.llm.base_url,
+            "AGENT_REGISTRY_PATH": registry_path,
+            "ORCHESTRATOR_WALLET_PATH": os.path.join(self.workdir.name, "wallet.json"),
+            "CONFIRMATION_POLL_INTERVAL": "0.01",
+            "VALIDATION_FLUSH_INTERVAL": "0.5",
+            "RECEIPT_LEDGER_DIR": os.path.join(self.workdir.name, "receipts"),
+            # Off by default so the fake LLM's --subtasks plan is what runs
+            "LOCAL_PLANNER": "true" if self.local_planner else "false",
+        })
+
+        if self.wallets > 1:
+            from solders.keypair import Keypair
+
+            wallet_dir = os.path.join(self.workdir.name, "wallets")
+            os.makedirs(wallet_dir)
+            for i in range(self.wallets):
+                with open(os.path.join(wallet_dir, f"wallet_{i}.json"), "w") as f:
+                    json.dump({"secret_key": list(bytes(Keypair()))}, f)
+            os.environ["ORCHESTRATOR_WALLET_DIR"] = wallet_dir
+
+    def rpc_calls(self) -> Dict[str, int]:
+        total = {}
+        for rpc in self.rpcs:
+            for method, count in rpc.calls.items():
+                total[method] = total.get(method, 0) + count
+        return total
+
+    def stop(self):
+        for server in self.rpcs + self.agents + [self.llm]:
+            server.stop()
+        self.workdir.cleanup()
+
+
+def free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def start_api_server(port: int = None) -> str:
+    """Serve api_server.app in-process on a threaded WSGI server"""
+    import logging
+    from werkzeug.serving import make_server
+    import api_server
+
+    logging.getLogger("werkzeug").setLevel(logging.WARNING)
+
+    port = port or free_port()
+    server = make_server("127.0.0.1", port, api_server.app, threaded=True)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return f"http://127.0.0.1:{port}"
+
+
+def start_api_workers(workers: int, store_path: str, verbose: bool = False, timeout: float = 60.0):
+    """Run api_server.py pre-forked with `workers` processes; returns (base url, process)"""
+    port = free_port()
+    env = dict(
+        os.environ,
+        ORCHESTRATOR_WORKERS=str(workers),
+        ORCHESTRATOR_PORT=str(port),
+        ORCHESTRATOR_SHARED_STORE=store_path
+    )
+    output = None if verbose else subprocess.DEVNULL
+    process = subprocess.Popen(
+        [sys.executable, "api_server.py"],
+        cwd=ORCHESTRATOR_DIR, env=env, stdout=output, stderr=output
+    )
+    base_url = f"http://127.0.0.1:{port}"
+
+    # Every worker answers readiness on its own; wait until enough
+    # consecutive probes (landing on any worker) say ready
+    deadline = time.monotonic() + timeout
+    ready_streak = 0
+    while ready_streak < workers * 4:
+        if process.poll() is not None:
+            raise RuntimeError(f"api_server.py exited with status {process.returncode}")
+        if time.monotonic() > deadline:
+            process.terminate()
+            raise RuntimeError("Workers did not become ready in time")
+        try:
+            with urllib.request.urlopen(f"{base_url}/health/ready", timeout=2) as resp:
+                ready_streak = ready_streak + 1 if resp.status == 200 else 0
+        except Exception:
+            ready_streak = 0
+            time.sleep(0.1)
+    return base_url, process
+
+
+def post_json(url: str, payload: Dict, timeout: float = 120.0):
+    request = urllib.request.Request(
+        url,
+        data=json.dumps(payload).encode(),
+        headers={"Content-Type": "application/json"},
+        method="POST"
+    )
+    try:
+        with urllib.request.urlopen(request, timeout=timeout) as resp:
+            return resp.status, json.loads(resp.read())
+    except urllib.error.HTTPError as e:
+        body = e.read()
+        try:
+            return e.code, json.loads(body)
+        except ValueError:
+            return e.code, {"error": body.decode(errors="replace")}
+
+
+# ----------------------------------------------------
+# Statistics
+# ----------------------------------------------------
+
+def percentile(values: List[float], pct: float) -> float:
+    """Nearest-rank percentile"""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    rank = max(0, min(len(ordered) - 1, int(round(pct / 100 * len(ordered) + 0.5)) - 1))
+    return ordered[rank]
+
+
+def summarize_stages(timings: List[Dict]) -> Dict[str, Dict]:
+    by_stage: Dict[str, List[float]] = {}
+    for timing in timings:
+        by_stage.setdefault(timing["stage"], []).append(timing["ms"])
+    return {
+        stage: {
+            "count": len(values),
+            "mean_ms": round(statistics.mean(values), 3),
+            "p50_ms": round(percentile(values, 50), 3),
+            "p95_ms": round(percentile(values, 95), 3),
+            "p99_ms": round(percentile(values, 99), 3)
+        }
+        for stage, values in sorted(by_stage.items())
+    }
+
+
+def git_commit() -> str:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            cwd=ORCHESTRATOR_DIR, capture_output=True, text=True
+        ).stdout.strip()
+    except Exception:
+        return "unknown"
+
+
+# ----------------------------------------------------
+# Drivers
+# ----------------------------------------------------
+
+def run_direct(task: str, n: int, concurrency: int, deadline_ms: float = None) -> List[Dict]:
+    """Each orchestration runs on its own event loop, like api_server does"""
+    import asyncio
+    import main
+    import metrics
+
+    async def one():
+        timings = metrics.collect_stage_timings()
+        start = time.perf_counter()
+        results = await main.orchestrate_task(task, deadline_ms=deadline_ms) or {}
+        return {
+            "latency_ms": (time.perf_counter() - start) * 1000,
+            "success": any(r.get("success") for r in results.values()),
+            "timings": [
+                {"stage": stage, "ms": seconds * 1000}
+                for stage, _, _, seconds in timings
+            ]
+        }
+
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        return list(pool.map(lambda _: asyncio.run(one()), range(n)))
+
+
+def run_api(task: str, n: int, concurrency: int, deadline_ms: float = None, base_url: str = None) -> List[Dict]:
+    base_url = base_url or start_api_server()
+
+    def one(_):
+        start = time.perf_counter()
+        payload = {"task": task}
+        if deadline_ms:
+            payload["deadlineMs"] = deadline_ms
+        status, body = post_json(f"{base_url}/api/orchestrate", payload)
+        return {
+            "latency_ms": (time.perf_counter() - start) * 1000,
+            "success": status == 200 and body.get("success", False),
+            "status": status,
+            "timings": body.get("stageTimings") or []
+        }
+
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        return list(pool.map(one, range(n)))
+
+
+def compare(current: Dict, baseline_path: str):
+    with open(baseline_path) as f:
+        baseline = json.load(f)
+
+    def delta(new, old):
+        return f"{new:.3f} vs {old:.3f} ({(new - old) / old * 100:+.1f}%)" if old else f"{new:.3f}"
+
+    print(f"\n🔍 Compared with {baseline_path} (commit {baseline.get('commit')}):")
+    print(f"   orchestrations/sec: {delta(current['orchestrations_per_sec'], baseline['orchestrations_per_sec'])}")
+    print(f"   rpc calls/orch:     {delta(current['rpc_calls_per_orchestration']['total'], baseline['rpc_calls_per_orchestration']['total'])}")
+    for stage, stats in current["stages"].items():
+        old = baseline["stages"].get(stage)
+        if old:
+            print(f"   {stage:<14} p95 ms: {delta(stats['p95_ms'], old['p95_ms'])}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--mode", choices=["direct", "api"], default="direct")
+    parser.add_argument("--orchestrations", type=int, default=50)
+    parser.add_argument("--concurrency", type=int, default=4)
+    parser.add_argument("--warmup", type=int, default=2)
+    parser.add_argument("--subtasks", type=int, default=1, help="Subtasks in the fake LLM plan")
+    parser.add_argument("--agents-per-type", type=int, default=1)
+    parser.add_argument("--payload-bytes", type=int, default=1024)
+    parser.add_argument("--rpc-latency-ms", type=float, nargs="+", default=[2.0], help="One stub RPC endpoint per value")
+    parser.add_argument("--rpc-error-rate", type=float, default=0.0)
+    parser.add_argument("--agent-latency-ms", type=float, default=10.0)
+    parser.add_argument("--agent-error-rate", type=float, default=0.0)
+    parser.add_argument("--agent-slow-rate", type=float, default=0.0, help="Fraction of agent requests hitting the tail")
+    parser.add_argument("--agent-slow-ms", type=float, default=0.0, help="Extra latency of tail agent requests")
+    parser.add_argument("--llm-latency-ms", type=float, default=50.0)
+    parser.add_argument("--llm-error-rate", type=float, default=0.0)
+    parser.add_argument("--jitter-ms", type=float, default=0.0)
+    parser.add_argument("--wallets", type=int, default=1, help="Orchestrator pool wallets")
+    parser.add_argument("--payer-lock-ms", type=float, default=0.0, help="Per-fee-payer serialization time in the stub RPC")
+    parser.add_argument("--local-planner", action="store_true", help="Plan matching requests locally instead of via the fake LLM")
+    parser.add_argument("--workers", type=int, default=1, help="API worker processes (api mode; >1 runs a pre-forked server)")
+    parser.add_argument("--deadline-ms", type=float, help="Time budget passed with each orchestration")
+    parser.add_argument("--task", default="Fetch the latest SOL price and analyze market sentiment")
+    parser.add_argument("--output", help="Write results as JSON to this file")
+    parser.add_argument("--compare", help="Baseline results JSON to compare against")
+    parser.add_argument("--verbose", action="store_true", help="Show orchestrator output")
+    args = parser.parse_args()
+    if args.workers > 1 and args.mode != "api":
+        parser.error("--workers needs --mode api")
+
+    stand_ins = StandIns(
+        rpc_latency_ms=args.rpc_latency_ms,
+        rpc_error_rate=args.rpc_error_rate,
+        agent_latency_ms=args.agent_latency_ms,
+        agent_error_rate=args.agent_error_rate,
+        agent_slow_rate=args.agent_slow_rate,
+        agent_slow_ms=args.agent_slow_ms,
+        agents_per_type=args.agents_per_type,
+        payload_bytes=args.payload_bytes,
+        llm_latency_ms=args.llm_latency_ms,
+        llm_error_rate=args.llm_error_rate,
+        subtasks=args.subtasks,
+        jitter_ms=args.jitter_ms,
+        wallets=args.wallets,
+        payer_lock_ms=args.payer_lock_ms,
+        local_planner=args.local_planner
+    )
+    stand_ins.configure_environment()
+    driver = run_direct if args.mode == "direct" else run_api
+    server = None
+
+    print(f"🚀 Offline benchmark: mode={args.mode} orchestrations={args.orchestrations} "
+          f"concurrency={args.concurrency} workers={args.workers}")
+    quiet = contextlib.nullcontext() if args.verbose else contextlib.redirect_stdout(io.StringIO())
+    try:
+        if args.workers > 1:
+            store_path = os.path.join(stand_ins.workdir.name, "orchestrator_store.db")
+            base_url, server = start_api_workers(args.workers, store_path, args.verbose)
+            driver = functools.partial(run_api, base_url=base_url)
+        with quiet:
+            if args.warmup:
+                driver(args.task, args.warmup, 1)
+            rpc_before = stand_ins.rpc_calls()
+            start = time.perf_counter()
+            runs = driver(args.task, args.orchestrations, args.concurrency, args.deadline_ms)
+            duration = time.perf_counter() - start
+            rpc_after = stand_ins.rpc_calls()
+            if server is None:
+                import main
+                main.validation_queue.flush()
+    finally:
+        if server is not None:
+            server.terminate()
+            server.wait(timeout=10)
+        stand_ins.stop()
+
+    timings = [t for run in runs for t in run["timings"]]
+    latencies = [run["latency_ms"] for run in runs]
+    rpc_calls = {
+        method: round((rpc_after.get(method, 0) - rpc_before.get(method, 0)) / len(runs), 3)
+        for method in sorted(rpc_after)
+        if method not in ("http_requests", "batch_requests")
+    }
+    rpc_calls["total"] = round(sum(rpc_calls.values()), 3)
+    rpc_calls["http_requests"] = round(
+        (rpc_after.get("http_requests", 0) - rpc_before.get("http_requests", 0)) / len(runs), 3
+    )
+
+    results = {
+        "commit": git_commit(),
+        "timestamp": int(time.time()),
+        "config": vars(args),
+        "orchestrations": len(runs),
+        "success_rate": round(sum(1 for r in runs if r["success"]) / len(runs), 4),
+        "duration_s": round(duration, 3),
+        "orchestrations_per_sec": round(len(runs) / duration, 3),
+        "status_counts": dict(sorted(Counter(str(r["status"]) for r in runs if "status" in r).items())),
+        "latency_ms": {
+            "p50": round(percentile(latencies, 50), 3),
+            "p95": round(percentile(latencies, 95), 3),
+            "p99": round(percentile(latencies, 99), 3)
+        },
+        "stages": summarize_stages(timings),
+        "rpc_calls_per_orchestration": rpc_calls
+    }
+
+    print(f"\n📊 {results['orchestrations_per_sec']} orchestrations/sec, success rate {results['success_rate']:.0%}")
+    print(f"   Latency p50/p95/p99: {results['latency_ms']['p50']:.1f} / {results['latency_ms']['p95']:.1f} / {results['latency_ms']['p99']:.1f} ms")
+    print(f"   RPC calls per orchestration: {rpc_calls['total']} ({rpc_calls['http_requests']} HTTP requests)")
+    if len(stand_ins.rpcs) > 1:
+        shares = ", ".join(
+            f"{rpc.latency_ms:g}ms: {rpc.calls.get('http_requests', 0)}" for rpc in stand_ins.rpcs
+        )
+        print(f"   HTTP requests per RPC endpoint ({shares})")
+    print(f"\n   {'stage':<14} {'count':>6} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9}")
+    for stage, stats in results["stages"].items():
+        print(f"   {stage:<14} {stats['count']:>6} {stats['p50_ms']:>9.2f} {stats['p95_ms']:>9.2f} {stats['p99_ms']:>9.2f}")
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=2)
+        print(f"\n💾 Results written to {args.output}")
+
+    if args.compare:
+        compare(results, args.compare)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,47 @@
+#!/usr/bin/env python3
+"""
+Metrics Instrumentation Overhead Benchmark
+Measures the cost of one timing span (enter + exit + histogram observe)
+and of one labelled counter increment.
+"""
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import metrics
+
+
+def per_op_us(fn, iterations: int) -> float:
+    start = time.perf_counter()
+    fn(iterations)
+    return (time.perf_counter() - start) / iterations * 1e6
+
+
+def empty_loop(n):
+    for _ in range(n):
+        pass
+
+
+def spans(n):
+    span = metrics.span
+    for _ in range(n):
+        with span("probe", "data_scraper", "DataAnalystAgent"):
+            pass
+
+
+def counters(n):
+    inc = metrics.SUBTASKS.inc
+    for _ in range(n):
+        inc("data_scraper", "DataAnalystAgent", "success")
+
+
+if __name__ == "__main__":
+    iterations = int(sys.argv[1]) if len(sys.argv) > 1 else 500_000
+    baseline = per_op_us(empty_loop, iterations)
+    span_us = per_op_us(spans, iterations) - baseline
+    counter_us = per_op_us(counters, iterations) - baseline
+
+    print(f"📊 Span overhead:    {span_us:.3f}µs per span")
+    print(f"📊 Counter overhead: {counter_us:.3f}µs per increment")
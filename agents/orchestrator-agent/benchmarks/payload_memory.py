@@ -0,0 +1,99 @@
+#!/usr/bin/env python3
+"""
+Service Payload Memory Benchmark
+Measures the orchestrator's peak Python memory (tracemalloc) for one
+/api/orchestrate call as the service agent's payload grows, buffered vs.
+streamed ("stream": true). The client reads the response in 64KB chunks
+and discards them, so the peak is the server side's.
+
+Example:
+    python benchmarks/payload_memory.py --sizes-mb 1 8 32
+"""
+import argparse
+import contextlib
+import io
+import json
+import os
+import sys
+import time
+import tracemalloc
+import urllib.request
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.e2e_benchmark import StandIns, start_api_server
+
+
+def orchestrate(base_url: str, stream: bool) -> int:
+    """POST one orchestration and drain the response; returns the bytes received"""
+    request = urllib.request.Request(
+        f"{base_url}/api/orchestrate",
+        data=json.dumps({"task": "Fetch the latest SOL price", "stream": stream}).encode(),
+        headers={"Content-Type": "application/json"},
+        method="POST"
+    )
+    received = 0
+    with urllib.request.urlopen(request, timeout=300) as resp:
+        while True:
+            chunk = resp.read(64 * 1024)
+            if not chunk:
+                return received
+            received += len(chunk)
+
+
+def measure(base_url: str, stream: bool):
+    tracemalloc.reset_peak()
+    before, _ = tracemalloc.get_traced_memory()
+    started = time.perf_counter()
+    received = orchestrate(base_url, stream)
+    elapsed_ms = (time.perf_counter() - started) * 1000
+    _, peak = tracemalloc.get_traced_memory()
+    return peak - before, received, elapsed_ms
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes-mb", type=float, nargs="+", default=[1, 8, 32])
+    parser.add_argument("--output", help="Write results as JSON to this file")
+    args = parser.parse_args()
+
+    # Let every tested size through the cap
+    os.environ.setdefault("SERVICE_RESPONSE_MAX_BYTES", str(int(max(args.sizes_mb) * 2 * 1024 * 1024)))
+    stand_ins = StandIns(agents_per_type=1, payload_bytes=1024)
+    stand_ins.configure_environment()
+
+    rows = []
+    try:
+        with contextlib.redirect_stdout(io.StringIO()):
+            base_url = start_api_server()
+            orchestrate(base_url, stream=False)  # warm up imports and lazy clients
+            tracemalloc.start()
+            for size_mb in args.sizes_mb:
+                blob = "x" * int(size_mb * 1024 * 1024)
+                for agent in stand_ins.agents:
+                    agent.payload_body = json.dumps({"success": True, "data": {"blob": blob}}).encode()
+                del blob
+                for stream in (False, True):
+                    peak, received, elapsed_ms = measure(base_url, stream)
+                    rows.append({
+                        "payload_mb": size_mb,
+                        "mode": "stream" if stream else "buffered",
+                        "peak_mb": round(peak / 1024 / 1024, 2),
+                        "response_mb": round(received / 1024 / 1024, 2),
+                        "elapsed_ms": round(elapsed_ms, 1)
+                    })
+            tracemalloc.stop()
+    finally:
+        stand_ins.stop()
+
+    print(f"{'payload MB':>10} {'mode':>9} {'peak MB':>9} {'response MB':>12} {'ms':>8}")
+    for row in rows:
+        print(f"{row['payload_mb']:>10} {row['mode']:>9} {row['peak_mb']:>9} {row['response_mb']:>12} {row['elapsed_ms']:>8}")
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(rows, f, indent=2)
+        print(f"💾 Results written to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
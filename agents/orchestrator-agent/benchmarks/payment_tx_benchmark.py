@@ -0,0 +1,91 @@
+#!/usr/bin/env python3
+"""
+Payment Transaction Micro-Benchmark
+Transactions built and signed per second, without sending them, for:
+- legacy: the previous payment path, a solana.transaction.Transaction with
+  a transfer instruction, signed, then signed again and serialized by
+  Client.send_transaction
+- solders: the transfer compiled into a solders Message and signed once
+  per payment
+- template: payment_builder, patching a cached compiled message
+Each run cycles over a few recipients and fresh blockhashes and amounts,
+and the template bytes are checked against the solders transaction.
+
+Example:
+    python benchmarks/payment_tx_benchmark.py --transactions 20000 --recipients 8
+"""
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from solders.hash import Hash
+from solders.keypair import Keypair
+from solders.message import Message
+from solders.system_program import TransferParams, transfer
+from solders.transaction import Transaction as SoldersTransaction
+from solana.transaction import Transaction as LegacyTransaction
+
+from payment_builder import PaymentBuilder
+
+
+def legacy_path(payer: Keypair, recipient, lamports: int, blockhash: Hash) -> bytes:
+    tx = LegacyTransaction()
+    tx.add(transfer(TransferParams(from_pubkey=payer.pubkey(), to_pubkey=recipient, lamports=lamports)))
+    tx.recent_blockhash = blockhash
+    tx.fee_payer = payer.pubkey()
+    tx.sign(payer)
+    # Client.send_transaction(tx, payer) signed again before serializing
+    tx.sign(payer)
+    return tx.serialize()
+
+
+def solders_path(payer: Keypair, recipient, lamports: int, blockhash: Hash) -> bytes:
+    message = Message.new_with_blockhash(
+        [transfer(TransferParams(from_pubkey=payer.pubkey(), to_pubkey=recipient, lamports=lamports))],
+        payer.pubkey(),
+        blockhash
+    )
+    return bytes(SoldersTransaction([payer], message, blockhash))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--transactions", type=int, default=20000)
+    parser.add_argument("--recipients", type=int, default=8)
+    args = parser.parse_args()
+
+    payer = Keypair()
+    recipients = [Keypair().pubkey() for _ in range(args.recipients)]
+    blockhashes = [Hash.new_unique() for _ in range(64)]
+    builder = PaymentBuilder()
+    inputs = [
+        (recipients[i % len(recipients)], 5_000_000 + i, blockhashes[i % len(blockhashes)])
+        for i in range(args.transactions)
+    ]
+
+    for recipient, lamports, blockhash in inputs[:len(recipients) * 4]:
+        expected = solders_path(payer, recipient, lamports, blockhash)
+        assert builder.build(payer, recipient, lamports, blockhash)[0] == expected
+        assert legacy_path(payer, recipient, lamports, blockhash) == expected
+
+    paths = {
+        "legacy": lambda recipient, lamports, blockhash: legacy_path(payer, recipient, lamports, blockhash),
+        "solders": lambda recipient, lamports, blockhash: solders_path(payer, recipient, lamports, blockhash),
+        "template": lambda recipient, lamports, blockhash: builder.build(payer, recipient, lamports, blockhash)[0]
+    }
+    print(f"🔏 {args.transactions} transfers over {args.recipients} recipient(s), bytes identical across paths")
+    baseline = None
+    for name, build in paths.items():
+        start = time.perf_counter()
+        for recipient, lamports, blockhash in inputs:
+            build(recipient, lamports, blockhash)
+        rate = args.transactions / (time.perf_counter() - start)
+        baseline = baseline or rate
+        print(f"   {name:<9} {rate:>10,.0f} tx/s  {1e6 / rate:>7.1f} µs/tx  {rate / baseline:>5.1f}x")
+
+
+if __name__ == "__main__":
+    main()
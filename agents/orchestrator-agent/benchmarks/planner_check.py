@@ -0,0 +1,101 @@
+#!/usr/bin/env python3
+"""
+Local Planner Check
+Runs the local template planner over a set of requests and reports its
+hit ratio (requests planned without the LLM), planning time per request,
+the plans by service type, and the LLM planning time the hits would save.
+
+Requests come from recorded orchestration traces (--traces, written with
+ORCHESTRATION_TRACE_PATH), whose decomposition stage timings also give
+the LLM time per plan; otherwise from a built-in sample of requests with
+--llm-ms as the LLM time.
+
+Examples:
+    python benchmarks/planner_check.py
+    python benchmarks/planner_check.py --traces traces.jsonl --show-misses
+"""
+import argparse
+import os
+import statistics
+import sys
+import time
+from collections import Counter
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from local_planner import LocalPlanner
+from traffic_trace import load_traces
+
+SAMPLE_REQUESTS = [
+    "Fetch the latest SOL price and analyze market sentiment",
+    "Scrape crypto news headlines and summarize them",
+    "Get the SOL/USDC price",
+    "Give me a daily briefing on the Solana market",
+    "Market report for BONK",
+    "Resize this image to a 256px thumbnail",
+    "Run OCR on the screenshot and translate the text",
+    "Backtest a trading strategy on SOL hourly candles",
+    "Compute a 20-day moving average of SOL prices",
+    "Collect tweets about Jupiter, classify their sentiment, then render a chart image",
+    "Execute this Python script and explain the output",
+    "Summarize the article at this link",
+    "Download token holder data, then calculate the concentration",
+    "Analyze sentiment of the latest Solana news",
+    "Write a limerick about validators",
+    "Book me a flight to Lisbon",
+    "What should I do about my portfolio?",
+    "Fetch SOL price, then email it to my team",
+    "Look up the price of JUP and compare it with last week",
+    "Crop the logo out of this picture",
+]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--traces", help="Orchestration trace JSONL to take requests (and LLM timings) from")
+    parser.add_argument("--llm-ms", type=float, default=1500.0, help="LLM planning time when traces give none")
+    parser.add_argument("--min-confidence", type=float, help="Override LOCAL_PLANNER_MIN_CONFIDENCE")
+    parser.add_argument("--repeat", type=int, default=200, help="Timing passes over the requests")
+    parser.add_argument("--show-misses", action="store_true", help="List the requests left to the LLM")
+    args = parser.parse_args()
+
+    llm_ms = [args.llm_ms]
+    if args.traces:
+        traces = load_traces(args.traces)
+        requests = [trace["task"] for trace in traces]
+        # Decomposition stages over ~5ms were LLM calls (cache hits are sub-millisecond)
+        timed = [ms for trace in traces for stage, _, _, ms in trace["stages"] if stage == "decomposition" and ms > 5]
+        llm_ms = timed or llm_ms
+    else:
+        requests = SAMPLE_REQUESTS
+
+    planner = LocalPlanner(min_confidence=args.min_confidence)
+    plans = [planner.plan(request) for request in requests]
+    hits = [plan for plan in plans if plan]
+
+    start = time.perf_counter()
+    for _ in range(args.repeat):
+        for request in requests:
+            planner.match(request)
+    per_request_us = (time.perf_counter() - start) / (args.repeat * len(requests)) * 1e6
+
+    service_types = Counter(subtask["service_type"] for plan in hits for subtask in plan)
+    subtasks = Counter(len(plan) for plan in hits)
+    average_llm_ms = statistics.mean(llm_ms)
+    print(f"🧭 {len(requests)} requests, {len(planner.templates)} templates, "
+          f"min confidence {planner.min_confidence}")
+    print(f"   hit ratio:        {len(hits) / len(requests):.1%} ({len(hits)} planned locally)")
+    print(f"   planning time:    {per_request_us:.1f} µs/request")
+    print(f"   subtasks/plan:    {dict(sorted(subtasks.items()))}")
+    print(f"   service types:    {dict(service_types.most_common())}")
+    print(f"   LLM time saved:   {len(hits) * average_llm_ms / 1000:.1f}s "
+          f"({average_llm_ms:.0f} ms per LLM plan{' from traces' if len(llm_ms) > 1 else ''})")
+    if args.show_misses:
+        for request, plan in zip(requests, plans):
+            if not plan:
+                _, confidence = planner.match(request)
+                print(f"   miss ({confidence:.2f}): {request}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,142 @@
+#!/usr/bin/env python3
+"""
+Receipt Ledger Benchmark
+Fills a temporary ledger with synthetic payment and validation receipts
+spread over --days (one segment per day) and --agents agents, then times
+aggregate() for the /api/receipts/stats queries:
+- total spend and success rate over the whole range and the last 24h
+- spend per agent, one agent's stats and an hourly series
+- a window with unaligned edges (partial minutes read from raw receipts)
+Every result is checked against the same aggregate computed by a full
+scan of the raw receipts. Also reports the write rate and bytes per
+receipt on disk.
+
+Example:
+    python benchmarks/receipt_ledger_benchmark.py --receipts 1000000 --days 30 --agents 200
+"""
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from receipt_ledger import ReceiptLedger
+
+SERVICE_TYPES = ("data_scraper", "text_analyst", "image_processor", "code_executor")
+
+
+def generate(count: int, since: float, days: int, agents: int, seed: int):
+    """Receipts in time order: (ts, kind, agent_id, service_type, success, lamports, latency_ms, ref)"""
+    rng = random.Random(seed)
+    step = days * 86400 / count
+    for i in range(count):
+        agent = rng.randrange(agents)
+        service_type = SERVICE_TYPES[agent % len(SERVICE_TYPES)]
+        ts = since + i * step + rng.random() * step
+        if rng.random() < 0.5:
+            yield (ts, "payment", f"agent-{agent}", service_type, int(rng.random() < 0.95),
+                   rng.randrange(1_000_000, 20_000_000), rng.uniform(20, 900), f"sig-{i}")
+        else:
+            yield (ts, "validation", f"agent-{agent}", service_type, int(rng.random() < 0.9),
+                   0, None, f"val-{i}")
+
+
+def brute_force(ledger: ReceiptLedger, since: float, until: float, agent_id: str = None):
+    """(payments, lamports, payment successes, validations, validation successes, latency sum) by full scan"""
+    totals = [0, 0, 0, 0, 0, 0.0]
+    where = " AND agent_id = ?" if agent_id else ""
+    for path in ledger._segments_between(since, until):
+        for kind, count, lamports, successes, latency_sum in ledger._connection(path).execute(
+            "SELECT kind, COUNT(*), SUM(lamports), SUM(success), TOTAL(latency_ms) FROM receipts "
+            f"NOT INDEXED WHERE ts >= ? AND ts < ?{where} GROUP BY kind",
+            [since, until] + ([agent_id] if agent_id else [])
+        ):
+            if kind == "payment":
+                totals[0] += count
+                totals[1] += lamports
+                totals[2] += successes
+                totals[5] += latency_sum
+            else:
+                totals[3] += count
+                totals[4] += successes
+    return totals
+
+
+def check(summary, expected, label: str):
+    payments, lamports, payment_successes, validations, validation_successes, latency_sum = expected
+    assert summary["payments"] == payments, label
+    assert summary["spent_lamports"] == lamports, label
+    assert summary["validations"] == validations, label
+    if payments:
+        assert summary["payment_success_rate"] == round(payment_successes / payments, 4), label
+        assert abs(summary["avg_latency_ms"] - round(latency_sum / payments, 2)) < 0.011, label
+    if validations:
+        assert summary["success_rate"] == round(validation_successes / validations, 4), label
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--receipts", type=int, default=1_000_000)
+    parser.add_argument("--days", type=int, default=30)
+    parser.add_argument("--agents", type=int, default=200)
+    parser.add_argument("--batch", type=int, default=5000, help="Receipts per write transaction")
+    parser.add_argument("--repeat", type=int, default=5, help="Timed runs per query")
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory(prefix="xgov-receipts-") as directory:
+        ledger = ReceiptLedger(directory, segment_seconds=86400, retention_days=0)
+        until = (int(time.time()) // 86400) * 86400
+        since = until - args.days * 86400
+
+        start = time.perf_counter()
+        batch, batch_segment = [], None
+        for receipt in generate(args.receipts, since, args.days, args.agents, args.seed):
+            segment = int(receipt[0] // 86400) * 86400
+            if batch and (segment != batch_segment or len(batch) >= args.batch):
+                ledger.write(batch_segment, batch)
+                batch = []
+            batch_segment = segment
+            batch.append(receipt)
+        if batch:
+            ledger.write(batch_segment, batch)
+        write_seconds = time.perf_counter() - start
+        size = sum(os.path.getsize(os.path.join(directory, name)) for name in os.listdir(directory))
+        print(f"🧾 {args.receipts:,} receipts, {args.agents} agents, {len(ledger.segments())} segments")
+        print(f"   write rate:       {args.receipts / write_seconds:,.0f} receipts/s")
+        print(f"   disk:             {size / 1e6:.1f} MB ({size / args.receipts:.0f} bytes/receipt incl. indexes and rollups)")
+
+        now = until - 1234.567
+        queries = [
+            ("total, all days", dict(since=since, until=until), None),
+            ("total, last 24h", dict(since=now - 86400, until=now), None),
+            ("group by agent, 7d", dict(since=until - 7 * 86400, until=until, group_by="agent"), None),
+            ("one agent, all days", dict(since=since, until=until, agent_id="agent-3"), "agent-3"),
+            ("hourly series, 24h", dict(since=until - 86400, until=until, bucket_seconds=3600), None),
+            ("unaligned edges, 3d", dict(since=since + 86400 * 5 + 37.25, until=since + 86400 * 8 - 91.5), None),
+        ]
+        for label, query, agent_id in queries:
+            timings = []
+            for _ in range(args.repeat):
+                query_start = time.perf_counter()
+                result = ledger.aggregate(**query)
+                timings.append((time.perf_counter() - query_start) * 1000)
+            check(result["total"], brute_force(ledger, query["since"], query["until"], agent_id), label)
+            if "groups" in result:
+                for group, summary in list(result["groups"].items())[:5]:
+                    check(summary, brute_force(ledger, query["since"], query["until"], group), f"{label} {group}")
+            if "series" in result:
+                for point in result["series"][:3]:
+                    check(point, brute_force(ledger, point["start"], point["start"] + 3600), f"{label} {point['start']}")
+
+            scan_start = time.perf_counter()
+            brute_force(ledger, query["since"], query["until"], agent_id)
+            scan_ms = (time.perf_counter() - scan_start) * 1000
+            print(f"   {label:<22} {min(timings):>8.2f} ms  (full scan {scan_ms:,.0f} ms)  ✓")
+
+
+if __name__ == "__main__":
+    main()
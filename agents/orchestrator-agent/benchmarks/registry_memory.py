@@ -0,0 +1,105 @@
+#!/usr/bin/env python3
+"""
+Registry Memory Benchmark
+Measures the Python memory (tracemalloc) held by N registered agents as
+free-form dicts (the previous representation) and as AgentRecord objects,
+plus the time of the orchestrator's hot registry operations on each:
+filter by service type, then pick the best active agent by reputation.
+
+Each representation is built and measured on its own, so both never sit
+in memory together.
+
+Example:
+    python benchmarks/registry_memory.py --agents 100000 1000000
+"""
+import argparse
+import gc
+import json
+import os
+import sys
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from agent_record import AgentRecord
+
+SERVICE_TYPES = ("data_scraping", "sentiment_analysis", "price_feed", "news_summary")
+
+
+def agent_dict(i: int) -> dict:
+    """One agent as registered via the API (registry file format)"""
+    # Distinct strings per agent, as after json.load
+    wallet = f"{i:08d}".join(["Wa11et", "Pubkey"]) * 2
+    return json.loads(json.dumps({
+        "agent_id": f"Agent_{i:07d}",
+        "pubkey": wallet,
+        "wallet": wallet,
+        "service_type": SERVICE_TYPES[i % len(SERVICE_TYPES)],
+        "api_url": f"http://agent-{i}.example:3001",
+        "owner": wallet,
+        "reputation_score": 100 + i % 50,
+        "total_successful_txs": i % 1000,
+        "total_failed_txs": i % 7,
+        "status": "active" if i % 10 else "inactive",
+        "registered_at": "2025-01-01T00:00:00Z"
+    }))
+
+
+def build(count: int, compact: bool) -> list:
+    if compact:
+        return [AgentRecord.from_dict(agent_dict(i)) for i in range(count)]
+    return [agent_dict(i) for i in range(count)]
+
+
+def select(agents: list, compact: bool) -> float:
+    """ms to pick the best active agent of each service type"""
+    started = time.perf_counter()
+    for service_type in SERVICE_TYPES:
+        if compact:
+            active = (a for a in agents if a.service_type == service_type and a.status == "active")
+            max(active, key=lambda a: a.reputation_score)
+        else:
+            active = (a for a in agents if a["service_type"] == service_type and a.get("status") == "active")
+            max(active, key=lambda a: a["reputation_score"])
+    return (time.perf_counter() - started) * 1000
+
+
+def measure(count: int, compact: bool) -> dict:
+    gc.collect()
+    tracemalloc.start()
+    agents = build(count, compact)
+    gc.collect()
+    held, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    select_ms = min(select(agents, compact) for _ in range(3))
+    del agents
+    gc.collect()
+    return {
+        "agents": count,
+        "representation": "AgentRecord" if compact else "dict",
+        "mb": round(held / 1024 / 1024, 1),
+        "bytes_per_agent": round(held / count),
+        "select_ms": round(select_ms, 1)
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--agents", type=int, nargs="+", default=[100_000, 1_000_000])
+    parser.add_argument("--output", help="Write results as JSON to this file")
+    args = parser.parse_args()
+
+    rows = [measure(count, compact) for count in args.agents for compact in (False, True)]
+
+    print(f"{'agents':>9} {'representation':>15} {'MB':>8} {'B/agent':>8} {'select ms':>10}")
+    for row in rows:
+        print(f"{row['agents']:>9} {row['representation']:>15} {row['mb']:>8} {row['bytes_per_agent']:>8} {row['select_ms']:>10}")
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(rows, f, indent=2)
+        print(f"💾 Results written to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
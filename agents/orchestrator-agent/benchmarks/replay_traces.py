@@ -0,0 +1,181 @@
+#!/usr/bin/env python3
+"""
+Orchestration Trace Replay
+Replays traces recorded with ORCHESTRATION_TRACE_PATH open-loop: requests are
+sent on the recorded schedule (optionally sped up or slowed down) whether or
+not earlier ones have completed, so queueing under real arrival patterns
+shows up in the latencies.
+
+By default an in-process api_server is wired to local stand-ins shaped by the
+traces: the fake LLM returns each request's recorded plan, and every recorded
+agent is stood up with its median observed latency and payload size.
+
+Examples:
+    python benchmarks/replay_traces.py traces.jsonl
+    python benchmarks/replay_traces.py traces.jsonl --rate-scale 4 --output replay.json
+"""
+import argparse
+import contextlib
+import io
+import json
+import os
+import statistics
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.e2e_benchmark import StandIns, start_api_server, post_json, percentile, summarize_stages, git_commit
+from benchmarks.stubs import StubServiceAgent
+from traffic_trace import load_traces
+
+
+def _median(values: List[float], default: float) -> float:
+    return statistics.median(values) if values else default
+
+
+def stand_ins_for(traces: List[Dict], rpc_latency_ms: float = 2.0) -> StandIns:
+    """Stand-ins whose plans, agents and latencies follow the recorded traffic"""
+    stage_ms: Dict[str, List[float]] = {}
+    agent_ms: Dict[str, List[float]] = {}
+    for trace in traces:
+        for stage, _, agent, ms in trace["stages"]:
+            stage_ms.setdefault(stage, []).append(ms)
+            # Probe and paid retry are one service round trip each
+            if agent and stage in ("probe", "paid_retry"):
+                agent_ms.setdefault(agent, []).append(ms)
+
+    # RPC stages bundle several calls plus client overhead, so RPC latency
+    # is configured rather than derived
+    stand_ins = StandIns(
+        rpc_latency_ms=rpc_latency_ms,
+        llm_latency_ms=_median(stage_ms.get("decomposition", []), 50.0),
+        agents_per_type=0
+    )
+
+    agents: Dict[str, Dict] = {}
+    plans: Dict[str, List[Dict]] = {}
+    for trace in traces:
+        plans[trace["task"]] = [
+            {"name": s["name"], "service_type": s["service_type"], "budget_usd": s.get("budget_usd") or 5.0}
+            for s in trace["subtasks"] if s.get("service_type")
+        ]
+        for subtask in trace["subtasks"]:
+            if subtask.get("agent"):
+                seen = agents.setdefault(subtask["agent"], {"service_type": subtask["service_type"], "sizes": []})
+                if subtask["data_bytes"]:
+                    seen["sizes"].append(subtask["data_bytes"])
+
+    for agent_id, seen in agents.items():
+        stand_ins.agents.append(StubServiceAgent(
+            agent_id=agent_id,
+            service_type=seen["service_type"],
+            payload_bytes=int(_median(seen["sizes"], 1024)),
+            latency_ms=_median(agent_ms.get(agent_id, []), 10.0)
+        ).start())
+
+    stand_ins.llm.plans = plans
+    return stand_ins
+
+
+def replay(traces: List[Dict], base_url: str, rate_scale: float, max_inflight: int) -> List[Dict]:
+    """Send each trace at its recorded offset / rate_scale, never waiting for responses"""
+    results: List[Dict] = []
+    lock = threading.Lock()
+
+    def send(trace: Dict, due: float):
+        sent = time.perf_counter()
+        status, body = post_json(f"{base_url}/api/orchestrate", {"task": trace["task"]})
+        done = time.perf_counter()
+        with lock:
+            results.append({
+                "latency_ms": (done - sent) * 1000,
+                "schedule_lag_ms": (sent - due) * 1000,
+                "recorded_ms": trace["elapsed_ms"],
+                "success": status == 200 and body.get("success", False),
+                "recorded_success": trace["status"] == 200,
+                "status": status,
+                "timings": body.get("stageTimings") or []
+            })
+
+    first_ts = traces[0]["ts"]
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=max_inflight) as pool:
+        for trace in traces:
+            due = start + (trace["ts"] - first_ts) / rate_scale
+            wait = due - time.perf_counter()
+            if wait > 0:
+                time.sleep(wait)
+            pool.submit(send, trace, due)
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("traces", help="JSONL file written via ORCHESTRATION_TRACE_PATH")
+    parser.add_argument("--rate-scale", type=float, default=1.0, help="Replay speed multiplier (2 = twice the recorded rate)")
+    parser.add_argument("--limit", type=int, help="Replay only the first N traces")
+    parser.add_argument("--max-inflight", type=int, default=256, help="Cap on concurrently outstanding requests")
+    parser.add_argument("--rpc-latency-ms", type=float, default=2.0, help="Stub Solana RPC latency")
+    parser.add_argument("--target", help="Replay against an already-running server instead of in-process stand-ins")
+    parser.add_argument("--output", help="Write results as JSON to this file")
+    parser.add_argument("--verbose", action="store_true", help="Show orchestrator output")
+    args = parser.parse_args()
+
+    traces = load_traces(args.traces)[:args.limit]
+    if not traces:
+        print("No traces to replay")
+        return 1
+
+    stand_ins = None
+    if args.target:
+        base_url = args.target.rstrip("/")
+    else:
+        stand_ins = stand_ins_for(traces, args.rpc_latency_ms)
+        stand_ins.configure_environment()
+        base_url = start_api_server()
+
+    span_s = (traces[-1]["ts"] - traces[0]["ts"]) / args.rate_scale
+    print(f"🎞️ Replaying {len(traces)} orchestrations over {span_s:.1f}s (rate x{args.rate_scale}) against {base_url}")
+    quiet = contextlib.nullcontext() if args.verbose else contextlib.redirect_stdout(io.StringIO())
+    try:
+        with quiet:
+            start = time.perf_counter()
+            runs = replay(traces, base_url, args.rate_scale, args.max_inflight)
+            duration = time.perf_counter() - start
+    finally:
+        if stand_ins is not None:
+            stand_ins.stop()
+
+    latencies = [r["latency_ms"] for r in runs]
+    recorded = [r["recorded_ms"] for r in runs]
+    lags = [r["schedule_lag_ms"] for r in runs]
+    report = {
+        "commit": git_commit(),
+        "config": {"traces": args.traces, "count": len(traces), "rate_scale": args.rate_scale, "target": args.target},
+        "duration_s": round(duration, 3),
+        "offered_rps": round(len(traces) / span_s, 3) if span_s else None,
+        "success_rate": round(sum(r["success"] for r in runs) / len(runs), 4),
+        "recorded_success_rate": round(sum(r["recorded_success"] for r in runs) / len(runs), 4),
+        "latency_ms": {f"p{p}": round(percentile(latencies, p), 3) for p in (50, 95, 99)},
+        "recorded_latency_ms": {f"p{p}": round(percentile(recorded, p), 3) for p in (50, 95, 99)},
+        "max_schedule_lag_ms": round(max(lags), 3),
+        "stages": summarize_stages([t for r in runs for t in r["timings"]])
+    }
+
+    print(f"   success rate:    {report['success_rate']:.1%} (recorded {report['recorded_success_rate']:.1%})")
+    print(f"   latency ms:      {report['latency_ms']}")
+    print(f"   recorded ms:     {report['recorded_latency_ms']}")
+    print(f"   max send lag ms: {report['max_schedule_lag_ms']}")
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+        print(f"💾 Results written to {args.output}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
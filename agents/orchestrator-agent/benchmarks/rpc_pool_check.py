@@ -0,0 +1,144 @@
+#!/usr/bin/env python3
+"""
+RPC Pool Check
+Runs the RPC pool against local stub Solana RPC endpoints with different
+latencies and reports, per phase, how its HTTP requests were spread over
+the endpoints:
+1. Routing: sequential reads settle on the fastest endpoint, with the
+   batch window on or off (a lone caller does not wait for it)
+2. Rate limits: the fastest endpoint answers 429 above its limit, the pool
+   cools it down and moves the overflow to the next fastest
+3. Failover: the fastest endpoint fails every request, calls still succeed
+4. Batching: concurrent reads (balance, blockhash, status polls) with the
+   batch window on and off, against a single solana-py Client baseline
+5. Refused batches: the fastest endpoint answers batches with a rate-limit
+   error object, then every endpoint refuses batches; calls still succeed
+
+Example:
+    python benchmarks/rpc_pool_check.py --latencies-ms 5 20 60 --calls 300 --threads 16
+"""
+import argparse
+import os
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, List
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from solana.rpc.api import Client
+from solders.keypair import Keypair
+from solders.signature import Signature
+
+from benchmarks.stubs import StubSolanaRPC
+from rpc_pool import RPCPool
+
+
+def http_requests(stubs: List[StubSolanaRPC]) -> List[int]:
+    return [stub.calls.get("http_requests", 0) for stub in stubs]
+
+
+def report(name: str, stubs: List[StubSolanaRPC], before: List[int], calls: int, seconds: float, errors: int = 0):
+    after = http_requests(stubs)
+    spread = ", ".join(f"{stub.latency_ms:g}ms: {a - b}" for stub, a, b in zip(stubs, after, before))
+    print(f"   {name:<22} {calls / seconds:>8.0f} calls/s  {sum(after) - sum(before):>5} HTTP requests ({spread})"
+          + (f"  {errors} errors" if errors else ""))
+
+
+def run_calls(call: Callable, calls: int, threads: int) -> int:
+    """Run `calls` calls on `threads` threads; returns the number that raised"""
+    def one(i):
+        try:
+            call(i)
+            return 0
+        except Exception:
+            return 1
+
+    if threads <= 1:
+        return sum(one(i) for i in range(calls))
+    with ThreadPoolExecutor(max_workers=threads) as executor:
+        return sum(executor.map(one, range(calls)))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--latencies-ms", type=float, nargs="+", default=[5.0, 20.0, 60.0])
+    parser.add_argument("--calls", type=int, default=300)
+    parser.add_argument("--threads", type=int, default=16)
+    parser.add_argument("--rate-limit-rps", type=float, default=50.0, help="Limit on the fastest endpoint in phase 2")
+    args = parser.parse_args()
+
+    stubs = [StubSolanaRPC(latency_ms=latency).start() for latency in args.latencies_ms]
+    urls = [stub.url for stub in stubs]
+    pubkey = Keypair().pubkey()
+    signature = Signature.default()
+    read_calls = [
+        lambda client, i: client.get_balance(pubkey),
+        lambda client, i: client.get_latest_blockhash(),
+        lambda client, i: client.get_signature_statuses([signature])
+    ]
+
+    def reads(client):
+        return lambda i: read_calls[i % len(read_calls)](client, i)
+
+    print(f"🔗 {len(stubs)} stub RPC endpoints at {', '.join(f'{l:g}ms' for l in args.latencies_ms)}")
+    try:
+        print("\n1. Routing (sequential reads)")
+        for window_ms in (0, 2):
+            client = RPCPool(urls, batch_window_ms=window_ms).client()
+            before, start = http_requests(stubs), time.perf_counter()
+            errors = run_calls(reads(client), args.calls, 1)
+            report(f"routing, window {window_ms}ms", stubs, before, args.calls, time.perf_counter() - start, errors)
+
+        print(f"\n2. Rate limits (fastest endpoint limited to {args.rate_limit_rps:g} req/s)")
+        stubs[0].rate_limit_rps = args.rate_limit_rps
+        client = RPCPool(urls, batch_window_ms=0).client()
+        before, start = http_requests(stubs), time.perf_counter()
+        errors = run_calls(reads(client), args.calls, args.threads)
+        report("rate-limit routing", stubs, before, args.calls, time.perf_counter() - start, errors)
+        stubs[0].rate_limit_rps = 0.0
+
+        print("\n3. Failover (fastest endpoint fails every request)")
+        stubs[0].error_rate = 1.0
+        client = RPCPool(urls, batch_window_ms=0).client()
+        before, start = http_requests(stubs), time.perf_counter()
+        errors = run_calls(reads(client), args.calls, 1)
+        report("failover", stubs, before, args.calls, time.perf_counter() - start, errors)
+        stubs[0].error_rate = 0.0
+
+        print(f"\n4. Batching ({args.threads} threads of concurrent reads)")
+        single = Client(urls[0])
+        before, start = http_requests(stubs), time.perf_counter()
+        errors = run_calls(reads(single), args.calls, args.threads)
+        report("solana-py Client", stubs, before, args.calls, time.perf_counter() - start, errors)
+        for window_ms in (0, 2):
+            pool = RPCPool(urls, batch_window_ms=window_ms)
+            client = pool.client()
+            run_calls(reads(client), len(urls) * 3, 1)  # measure every endpoint first
+            before, start = http_requests(stubs), time.perf_counter()
+            errors = run_calls(reads(client), args.calls, args.threads)
+            report(f"pool, window {window_ms}ms", stubs, before, args.calls, time.perf_counter() - start, errors)
+
+        print("\n5. Refused batches")
+        refusals = [
+            ("fastest rate-limits", stubs[:1], {"code": -32005, "message": "Too many requests"}),
+            ("all refuse batches", stubs, {"code": -32600, "message": "Batch requests are not allowed"})
+        ]
+        for name, refusing, error in refusals:
+            for stub in refusing:
+                stub.batch_error = error
+            pool = RPCPool(urls, batch_window_ms=2)
+            client = pool.client()
+            run_calls(reads(client), len(urls) * 3, 1)
+            before, start = http_requests(stubs), time.perf_counter()
+            errors = run_calls(reads(client), args.calls, args.threads)
+            report(name, stubs, before, args.calls, time.perf_counter() - start, errors)
+            for stub in refusing:
+                stub.batch_error = None
+    finally:
+        for stub in stubs:
+            stub.stop()
+
+
+if __name__ == "__main__":
+    main()
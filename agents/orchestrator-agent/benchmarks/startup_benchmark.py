@@ -0,0 +1,110 @@
+#!/usr/bin/env python3
+"""
+Startup Benchmark for the Orchestrator API Server
+Measures time-to-first-request (and time-to-ready) with the network unavailable:
+- Solana RPC points at a blackholed address
+- No OpenAI API key is configured
+"""
+import argparse
+import json
+import os
+import socket
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import urllib.request
+
+ORCHESTRATOR_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+API_SERVER = os.path.join(ORCHESTRATOR_DIR, "api_server.py")
+
+# Non-routable address: connections hang until the client times out
+UNREACHABLE_RPC_URL = "http://10.255.255.1:8899"
+
+
+def free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def poll(url: str, deadline: float, expect_status: int = 200):
+    """Poll url until it returns expect_status; return elapsed time or None"""
+    while time.perf_counter() < deadline:
+        try:
+            with urllib.request.urlopen(url, timeout=0.5) as resp:
+                if resp.status == expect_status:
+                    return resp
+        except Exception:
+            pass
+        time.sleep(0.005)
+    return None
+
+
+def run_once(timeout: float) -> dict:
+    port = free_port()
+    env = dict(os.environ)
+    env.pop("OPENAI_API_KEY", None)
+    env["SOLANA_RPC_URL"] = UNREACHABLE_RPC_URL
+    env["ORCHESTRATOR_PORT"] = str(port)
+
+    with tempfile.TemporaryDirectory() as workdir:
+        start = time.perf_counter()
+        proc = subprocess.Popen(
+            [sys.executable, API_SERVER],
+            cwd=workdir,
+            env=env,
+            stdout=subprocess.DEVNULL,
+            stderr=subprocess.DEVNULL
+        )
+        try:
+            deadline = start + timeout
+            first = poll(f"http://127.0.0.1:{port}/health", deadline)
+            first_request_s = time.perf_counter() - start if first else None
+
+            ready = poll(f"http://127.0.0.1:{port}/health/ready", deadline)
+            ready_s = time.perf_counter() - start if ready else None
+        finally:
+            proc.terminate()
+            proc.wait(timeout=10)
+
+    return {
+        "first_request_s": round(first_request_s, 4) if first_request_s is not None else None,
+        "ready_s": round(ready_s, 4) if ready_s is not None else None
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--timeout", type=float, default=60.0, help="Give up on a run after this many seconds")
+    parser.add_argument("--output", help="Write results as JSON to this file")
+    args = parser.parse_args()
+
+    print(f"🚀 Startup benchmark: {args.runs} run(s), Solana RPC unreachable, no OpenAI key")
+    runs = []
+    for i in range(args.runs):
+        result = run_once(args.timeout)
+        runs.append(result)
+        print(f"   Run {i + 1}: first request {result['first_request_s']}s, ready {result['ready_s']}s")
+
+    first = [r["first_request_s"] for r in runs if r["first_request_s"] is not None]
+    ready = [r["ready_s"] for r in runs if r["ready_s"] is not None]
+    summary = {
+        "runs": runs,
+        "first_request_median_s": round(statistics.median(first), 4) if first else None,
+        "ready_median_s": round(statistics.median(ready), 4) if ready else None
+    }
+
+    print(f"\n📊 Time to first request (median): {summary['first_request_median_s']}s")
+    print(f"📊 Time to ready (median): {summary['ready_median_s']}s")
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(summary, f, indent=2)
+        print(f"💾 Results written to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
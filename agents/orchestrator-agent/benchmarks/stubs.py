@@ -0,0 +1,423 @@
+"""
+Local Stand-ins for Offline Benchmarks
+In-process HTTP servers replacing the orchestrator's external dependencies:
+- StubSolanaRPC: JSON-RPC subset used by the orchestrator (incl. batch requests)
+- StubServiceAgent: x402-speaking service agent (402 terms, then paid data)
+- FakeLLM: OpenAI-compatible chat completions returning a fixed (or per-prompt) plan
+Each supports configurable latency, tail-latency and error injection.
+"""
+import base64
+import hashlib
+import json
+import random
+import socket
+import threading
+import time
+from collections import Counter
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, List, Optional
+from urllib.parse import urlparse, parse_qs
+
+from solders.keypair import Keypair
+from solders.signature import Signature
+from solders.hash import Hash
+
+
+class _QuietHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def setup(self):
+        super().setup()
+        # Headers and body are written separately on both sides; avoid
+        # Nagle/delayed-ACK stalls on keep-alive connections
+        self.connection.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+
+    def handle_one_request(self):
+        if hasattr(socket, "TCP_QUICKACK"):
+            self.connection.setsockopt(socket.IPPROTO_TCP, socket.TCP_QUICKACK, 1)
+        try:
+            super().handle_one_request()
+        except (BrokenPipeError, ConnectionResetError):
+            # The client gave up (e.g. a cancelled hedged probe)
+            self.close_connection = True
+
+    def log_message(self, format, *args):
+        pass
+
+    def _send_json(self, status: int, payload, headers: Optional[Dict[str, str]] = None):
+        # Pre-encoded bodies are sent as-is (large stand-in payloads)
+        body = payload if isinstance(payload, bytes) else json.dumps(payload).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        for key, value in (headers or {}).items():
+            self.send_header(key, value)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _read_json(self):
+        length = int(self.headers.get("Content-Length") or 0)
+        return json.loads(self.rfile.read(length) or b"null")
+
+
+class _StubServer:
+    """Runs a ThreadingHTTPServer on a free localhost port in a daemon thread"""
+
+    handler_class = _QuietHandler
+
+    def __init__(
+        self,
+        latency_ms: float = 0.0,
+        jitter_ms: float = 0.0,
+        error_rate: float = 0.0,
+        slow_rate: float = 0.0,
+        slow_ms: float = 0.0,
+        seed: int = None
+    ):
+        self.latency_ms = latency_ms
+        self.jitter_ms = jitter_ms
+        self.error_rate = error_rate
+        # Tail latency: a `slow_rate` fraction of requests take `slow_ms` longer
+        self.slow_rate = slow_rate
+        self.slow_ms = slow_ms
+        self._random = random.Random(seed)
+        self._random_lock = threading.Lock()
+        self.calls: Counter = Counter()
+        self._calls_lock = threading.Lock()
+        self._server: Optional[ThreadingHTTPServer] = None
+
+    @property
+    def url(self) -> str:
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def start(self) -> "_StubServer":
+        stub = self
+
+        class Handler(self.handler_class):
+            pass
+
+        Handler.stub = stub
+        self._server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self._server.daemon_threads = True
+        threading.Thread(target=self._server.serve_forever, daemon=True).start()
+        return self
+
+    def stop(self):
+        if self._server is not None:
+            self._server.shutdown()
+            self._server.server_close()
+
+    def count(self, name: str, n: int = 1):
+        with self._calls_lock:
+            self.calls[name] += n
+
+    def delay(self):
+        with self._random_lock:
+            jitter = self._random.uniform(-self.jitter_ms, self.jitter_ms) if self.jitter_ms else 0.0
+            if self.slow_rate and self._random.random() < self.slow_rate:
+                jitter += self.slow_ms
+        delay = max(0.0, self.latency_ms + jitter) / 1000
+        if delay:
+            time.sleep(delay)
+
+    def should_fail(self) -> bool:
+        if not self.error_rate:
+            return False
+        with self._random_lock:
+            return self._random.random() < self.error_rate
+
+
+# ----------------------------------------------------
+# Solana JSON-RPC stand-in
+# ----------------------------------------------------
+
+class _RPCHandler(_QuietHandler):
+    def do_POST(self):
+        stub: StubSolanaRPC = self.stub
+        request = self._read_json()
+        stub.delay()
+        stub.count("http_requests")
+
+        if stub.should_fail():
+            self._send_json(503, {"error": "injected failure"})
+            return
+        if stub.rate_limited():
+            self._send_json(429, {"error": "rate limited"}, {"Retry-After": "1"})
+            return
+
+        if isinstance(request, list):
+            stub.count("batch_requests")
+            if stub.batch_error is not None:
+                # Providers answer refused batches with one error object
+                self._send_json(200, {"jsonrpc": "2.0", "id": None, "error": stub.batch_error})
+                return
+            self._send_json(200, [stub.handle(call) for call in request])
+        else:
+            self._send_json(200, stub.handle(request))
+
+
+class StubSolanaRPC(_StubServer):
+    handler_class = _RPCHandler
+
+    def __init__(
+        self,
+        balance_lamports: int = 100 * 1_000_000_000,
+        program_accounts: int = 0,
+        rate_limit_rps: float = 0.0,
+        payer_lock_ms: float = 0.0,
+        **kwargs
+    ):
+        super().__init__(**kwargs)
+        self.balance_lamports = balance_lamports
+        # Models write-lock contention: transactions from the same fee payer
+        # are processed one at a time, each holding it for payer_lock_ms
+        self.payer_lock_ms = payer_lock_ms
+        self._payer_locks: Dict[bytes, threading.Lock] = {}
+        self.program_accounts = [
+            {
+                "pubkey": str(Keypair().pubkey()),
+                "account": {
+                    "lamports": 1_000_000,
+                    "data": [base64.b64encode(bytes(64)).decode(), "base64"],
+                    "owner": "Fg6PaFpoGXkPABqLTSsAPoV2K1tTq2tL2R1fV9EFSGjM",
+                    "executable": False,
+                    "rentEpoch": 0,
+                    "space": 64
+                }
+            }
+            for _ in range(program_accounts)
+        ]
+        self.rate_limit_rps = rate_limit_rps
+        # JSON-RPC error returned for every batch request instead of answers
+        self.batch_error: Optional[Dict] = None
+        self._window_start = time.monotonic()
+        self._window_count = 0
+        self._slot = 1
+        self.sent_transactions: List[str] = []
+
+    def rate_limited(self) -> bool:
+        if not self.rate_limit_rps:
+            return False
+        with self._calls_lock:
+            now = time.monotonic()
+            if now - self._window_start >= 1.0:
+                self._window_start, self._window_count = now, 0
+            self._window_count += 1
+            return self._window_count > self.rate_limit_rps
+
+    def _hold_payer(self, payer: bytes):
+        with self._calls_lock:
+            lock = self._payer_locks.setdefault(payer, threading.Lock())
+        with lock:
+            time.sleep(self.payer_lock_ms / 1000)
+
+    def _context(self):
+        return {"slot": self._slot}
+
+    def handle(self, call: Dict) -> Dict:
+        method = call.get("method")
+        params = call.get("params") or []
+        self.count(method)
+        response = {"jsonrpc": "2.0", "id": call.get("id")}
+
+        if method == "getBalance":
+            response["result"] = {"context": self._context(), "value": self.balance_lamports}
+        elif method == "getLatestBlockhash":
+            self._slot += 1
+            blockhash = Hash(hashlib.sha256(str(self._slot).encode()).digest())
+            response["result"] = {
+                "context": self._context(),
+                "value": {"blockhash": str(blockhash), "lastValidBlockHeight": self._slot + 150}
+            }
+        elif method == "sendTransaction":
+            raw = base64.b64decode(params[0]) if params else b""
+            # Wire format: compact-u16 signature count, then 64-byte signatures
+            signature = Signature(raw[1:65]) if len(raw) >= 65 else Signature.default()
+            if self.payer_lock_ms and len(raw) >= 1 + 64 * raw[0] + 4 + 32:
+                # Legacy message: 3-byte header, key count, fee payer first
+                offset = 1 + 64 * raw[0] + 4
+                self._hold_payer(raw[offset:offset + 32])
+            with self._calls_lock:
+                self.sent_transactions.append(str(signature))
+            response["result"] = str(signature)
+        elif method == "getMultipleAccounts":
+            response["result"] = {
+                "context": self._context(),
+                "value": [
+                    {
+                        "lamports": self.balance_lamports,
+                        "data": ["", "base64"],
+                        "owner": "11111111111111111111111111111111",
+                        "executable": False,
+                        "rentEpoch": 0,
+                        "space": 0
+                    }
+                    for _ in (params[0] if params else [])
+                ]
+            }
+        elif method == "requestAirdrop":
+            response["result"] = str(Signature.default())
+        elif method == "getProgramAccounts":
+            response["result"] = self.program_accounts
+        elif method == "getSignatureStatuses":
+            signatures = params[0] if params else []
+            response["result"] = {
+                "context": self._context(),
+                "value": [
+                    {
+                        "slot": self._slot,
+                        "confirmations": None,
+                        "err": None,
+                        "status": {"Ok": None},
+                        "confirmationStatus": "confirmed"
+                    }
+                    for _ in signatures
+                ]
+            }
+        elif method == "getBlockHeight":
+            response["result"] = self._slot
+        else:
+            response["error"] = {"code": -32601, "message": f"Method not found: {method}"}
+
+        return response
+
+
+# ----------------------------------------------------
+# x402 service agent stand-in
+# ----------------------------------------------------
+
+class _AgentHandler(_QuietHandler):
+    def do_GET(self):
+        stub: StubServiceAgent = self.stub
+        parsed = urlparse(self.path)
+
+        if parsed.path == "/info":
+            stub.count("info")
+            self._send_json(200, stub.info())
+            return
+        if parsed.path != "/scrape":
+            self._send_json(404, {"error": "Not found"})
+            return
+
+        stub.delay()
+        if stub.should_fail():
+            stub.count("errors")
+            self._send_json(500, {"error": "injected failure"})
+            return
+
+        proof = self.headers.get("X-Payment-Proof") or parse_qs(parsed.query).get("payment", [None])[0]
+        if not proof:
+            stub.count("probes")
+            self._send_json(402, {
+                "error": "Payment Required",
+                "message": "This service requires x402 payment",
+                "payment_details": {
+                    "recipient": stub.recipient,
+                    "amount_lamports": stub.price_lamports,
+                    "amount_sol": stub.price_lamports / 1e9,
+                    "currency": "SOL",
+                    "network": "solana-localnet"
+                }
+            })
+            return
+
+        stub.count("paid_requests")
+        self._send_json(200, stub.payload_body)
+
+
+class StubServiceAgent(_StubServer):
+    handler_class = _AgentHandler
+
+    def __init__(
+        self,
+        agent_id: str = "StubAgent",
+        service_type: str = "data_scraper",
+        price_lamports: int = 5_000_000,
+        payload_bytes: int = 1024,
+        **kwargs
+    ):
+        super().__init__(**kwargs)
+        self.agent_id = agent_id
+        self.service_type = service_type
+        self.price_lamports = price_lamports
+        self.recipient = str(Keypair().pubkey())
+        self.payload = {
+            "success": True,
+            "agent": agent_id,
+            "data": {"query": "solana", "blob": "x" * payload_bytes}
+        }
+        self.payload_body = json.dumps(self.payload).encode()
+
+    def info(self) -> Dict:
+        return {
+            "agent_id": self.agent_id,
+            "service_type": self.service_type,
+            "wallet": self.recipient,
+            "pricing": {"per_request_sol": self.price_lamports / 1e9},
+            "status": "active"
+        }
+
+    def registry_entry(self, reputation_score: int = 100) -> Dict:
+        """Agent registry record pointing at this stand-in"""
+        return {
+            "agent_id": self.agent_id,
+            "pubkey": self.recipient,
+            "wallet": self.recipient,
+            "reputation_score": reputation_score,
+            "total_successful_txs": 0,
+            "total_failed_txs": 0,
+            "api_url": self.url,
+            "service_type": self.service_type,
+            "owner": self.recipient,
+            "status": "active"
+        }
+
+
+# ----------------------------------------------------
+# OpenAI-compatible LLM stand-in
+# ----------------------------------------------------
+
+class _LLMHandler(_QuietHandler):
+    def do_POST(self):
+        stub: FakeLLM = self.stub
+        request = self._read_json() or {}
+        stub.count("completions")
+        stub.delay()
+
+        if stub.should_fail():
+            self._send_json(500, {"error": {"message": "injected failure", "type": "server_error"}})
+            return
+
+        self._send_json(200, {
+            "id": "chatcmpl-stub",
+            "object": "chat.completion",
+            "created": int(time.time()),
+            "model": "gpt-4o-mini",
+            "choices": [{
+                "index": 0,
+                "message": {"role": "assistant", "content": json.dumps({"sub_tasks": stub.plan_for(request)})},
+                "finish_reason": "stop"
+            }],
+            "usage": {"prompt_tokens": 1, "completion_tokens": 1, "total_tokens": 2}
+        })
+
+
+class FakeLLM(_StubServer):
+    handler_class = _LLMHandler
+
+    def __init__(self, plan: Optional[List[Dict]] = None, plans: Optional[Dict[str, List[Dict]]] = None, **kwargs):
+        super().__init__(**kwargs)
+        self.plan = plan or [{"name": "Fetch requested data", "service_type": "data_scraper", "budget_usd": 5.0}]
+        # Per-prompt plans (keyed by the user message), falling back to `plan`
+        self.plans = plans or {}
+
+    def plan_for(self, request: Dict) -> List[Dict]:
+        user_messages = [m.get("content") for m in request.get("messages", []) if m.get("role") == "user"]
+        if user_messages and user_messages[-1] in self.plans:
+            return self.plans[user_messages[-1]]
+        return self.plan
+
+    @property
+    def base_url(self) -> str:
+        return f"{self.url}/v1"
@@ -0,0 +1,64 @@
+#!/usr/bin/env python3
+"""
+Wallet Pool Check
+Checks wallet assignment against tracked balances, without any RPC:
+- a wallet whose balance cannot cover a payment (plus the fee) is never
+  leased for it, under either strategy
+- a wallet covering only the fee is still leased for fee-only work
+- wallets with no tracked balance yet are still leased
+- with no wallet able to pay, the richest one gets the attempt
+Exits non-zero on failure.
+"""
+import os
+import sys
+from contextlib import ExitStack
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from solders.keypair import Keypair
+
+from wallet_pool import LAMPORTS_PER_SOL, STRATEGIES, WalletPool
+
+PAYMENT = 5_000_000
+
+
+def main():
+    failures = []
+
+    def check(name: str, ok: bool):
+        print(f"{'✅' if ok else '❌'} {name}")
+        if not ok:
+            failures.append(name)
+
+    for strategy in STRATEGIES:
+        poor, rich, other = Keypair(), Keypair(), Keypair()
+        pool = WalletPool([poor, rich, other], strategy=strategy)
+        pool.record_balance(poor.pubkey(), PAYMENT - 1_000_000)
+        pool.record_balance(rich.pubkey(), LAMPORTS_PER_SOL)
+        pool.record_balance(other.pubkey(), LAMPORTS_PER_SOL // 2)
+
+        # Leases held at once, so least-loaded assignment spreads them
+        with ExitStack() as stack:
+            leased = {stack.enter_context(pool.lease(PAYMENT)).pubkey() for _ in range(30)}
+        check(f"{strategy}: underfunded wallet skipped", poor.pubkey() not in leased)
+        check(f"{strategy}: funded wallets shared", leased == {rich.pubkey(), other.pubkey()})
+
+        # Least-loaded: two busy funded wallets leave the fee-only work to the poor one
+        with pool.lease(PAYMENT), pool.lease(PAYMENT), ExitStack() as stack:
+            leased = {stack.enter_context(pool.lease(0)).pubkey() for _ in range(3)}
+            check(f"{strategy}: fee-covering wallet leased for fee-only work", poor.pubkey() in leased)
+
+        with pool.lease(2 * LAMPORTS_PER_SOL) as keypair:
+            check(f"{strategy}: richest wallet tried when none can pay", keypair.pubkey() == rich.pubkey())
+
+        unknown = Keypair()
+        fresh = WalletPool([poor, unknown], strategy=strategy)
+        fresh.record_balance(poor.pubkey(), 1_000)
+        with fresh.lease(PAYMENT) as keypair:
+            check(f"{strategy}: untracked wallet leased", keypair.pubkey() == unknown.pubkey())
+
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,217 @@
+"""
+Local Task Planner
+Plans common requests from a declarative library of templates, so they
+skip the LLM decomposition call:
+- Each template lists the keywords that signal it (1.0 = strong, 0.5 =
+  ambiguous) and the subtasks it contributes
+- All keywords are compiled into one regex alternation, shaped as a
+  character trie ("f(?:etch|ind)|s(?:crape|ol)...") so each position
+  tries one branch instead of every keyword; a request is matched in a
+  single pass of a few microseconds, plurals ("prices") included
+- Matching templates are combined into one plan (multi-step templates
+  first, then in clause order, fetching before computing, analyzing and
+  rendering within a clause), deduplicated by service type
+- Confidence is the weakest contributing template's score times the share of
+  the request's clauses (split on "and", "then", commas, ...) that matched
+  something; an unmatched clause such as "translate it to French" means
+  the request needs something no template covers
+Plans below LOCAL_PLANNER_MIN_CONFIDENCE go to the LLM. plan() also counts
+hits and the time LLM plans took, for the hit ratio in /health.
+"""
+import os
+import re
+from bisect import bisect_right
+import threading
+from typing import Any, Dict, List, Optional, Tuple
+
+LOCAL_PLANNER_ENABLED = os.getenv("LOCAL_PLANNER", "true").lower() in ("1", "true", "yes")
+LOCAL_PLANNER_MIN_CONFIDENCE = float(os.getenv("LOCAL_PLANNER_MIN_CONFIDENCE", "0.75"))
+
+STRONG, WEAK = 1.0, 0.5
+DEFAULT_BUDGET_USD = 5.0
+
+
+def _subtask(name: str, service_type: str, budget_usd: float = DEFAULT_BUDGET_USD) -> Dict[str, Any]:
+    return {"name": name, "service_type": service_type, "budget_usd": budget_usd}
+
+
+# Pipeline order of subtasks matched in the same clause
+SERVICE_ORDER = {"data_scraper": 0, "code_executor": 1, "text_analyst": 2, "image_processor": 3}
+
+FETCH = _subtask("Fetch requested data", "data_scraper")
+ANALYZE = _subtask("Analyze text and sentiment", "text_analyst")
+IMAGE = _subtask("Process image", "image_processor")
+EXECUTE = _subtask("Run computation", "code_executor")
+
+PLAN_TEMPLATES: List[Dict[str, Any]] = [
+    {
+        "intent": "fetch_data",
+        "keywords": {
+            "fetch": STRONG, "scrape": STRONG, "crawl": STRONG, "retrieve": STRONG, "collect": STRONG,
+            "download": STRONG, "look up": STRONG, "lookup": STRONG, "headline": STRONG, "news": STRONG,
+            "price": STRONG, "quote": STRONG, "tweet": STRONG, "get": WEAK, "find": WEAK, "latest": WEAK,
+            "data": WEAK, "sol": WEAK, "token": WEAK, "market": WEAK, "volume": WEAK
+        },
+        "subtasks": [FETCH]
+    },
+    {
+        "intent": "analyze_text",
+        "keywords": {
+            "analyze": STRONG, "analyse": STRONG, "analysis": STRONG, "sentiment": STRONG,
+            "summarize": STRONG, "summarise": STRONG, "summary": STRONG, "summaries": STRONG,
+            "classify": STRONG, "translate": STRONG, "extract entities": STRONG, "keywords": STRONG,
+            "opinion": WEAK, "review": WEAK, "compare": WEAK, "explain": WEAK, "text": WEAK, "article": WEAK
+        },
+        "subtasks": [ANALYZE]
+    },
+    {
+        "intent": "process_image",
+        "keywords": {
+            "image": STRONG, "photo": STRONG, "picture": STRONG, "screenshot": STRONG, "thumbnail": STRONG,
+            "resize": STRONG, "crop": STRONG, "ocr": STRONG, "png": STRONG, "jpg": STRONG, "jpeg": STRONG,
+            "logo": WEAK, "caption": WEAK, "render": WEAK, "visual": WEAK
+        },
+        "subtasks": [IMAGE]
+    },
+    {
+        "intent": "execute_code",
+        "keywords": {
+            "execute": STRONG, "script": STRONG, "python": STRONG, "backtest": STRONG, "simulate": STRONG,
+            "simulation": STRONG, "calculate": STRONG, "compute": STRONG, "moving average": STRONG,
+            "run": WEAK, "code": WEAK, "model": WEAK, "forecast": WEAK
+        },
+        "subtasks": [EXECUTE]
+    },
+    {
+        "intent": "market_report",
+        "keywords": {
+            "market report": STRONG, "market overview": STRONG, "daily briefing": STRONG, "market briefing": STRONG
+        },
+        "subtasks": [FETCH, ANALYZE, _subtask("Render price chart", "image_processor")]
+    },
+    {
+        "intent": "strategy_backtest",
+        "keywords": {"trading strategy": STRONG, "trading signal": STRONG},
+        "subtasks": [FETCH, _subtask("Backtest strategy", "code_executor"), _subtask("Summarize results", "text_analyst")]
+    }
+]
+
+# Clause boundaries: every clause of a confident plan must match a template
+_CLAUSE_SPLIT = re.compile(r"[,;:.!?&+]|\b(?:and then|and|then|also|plus)\b", re.IGNORECASE)
+
+
+def _trie_pattern(node: Dict[str, Dict]) -> str:
+    """Regex matching every word in a character trie ("" marks a word end)"""
+    branches = [re.escape(char) + _trie_pattern(child) for char, child in sorted(node.items()) if char]
+    if not branches:
+        return ""
+    pattern = branches[0] if len(branches) == 1 else "(?:" + "|".join(branches) + ")"
+    if "" in node:
+        if len(branches) == 1 and len(branches[0]) > 1:
+            pattern = "(?:" + pattern + ")"
+        pattern += "?"
+    return pattern
+
+
+class LocalPlanner:
+    """Template planner with a single compiled keyword matcher"""
+
+    def __init__(self, templates: List[Dict[str, Any]] = None, min_confidence: float = None):
+        self.templates = PLAN_TEMPLATES if templates is None else templates
+        self.min_confidence = LOCAL_PLANNER_MIN_CONFIDENCE if min_confidence is None else min_confidence
+        # keyword -> [(template index, weight)]
+        self._keyword_targets: Dict[str, List[Tuple[int, float]]] = {}
+        trie: Dict[str, Dict] = {}
+        for index, template in enumerate(self.templates):
+            for keyword, weight in template["keywords"].items():
+                keyword = keyword.lower()
+                self._keyword_targets.setdefault(keyword, []).append((index, weight))
+                node = trie
+                for char in keyword:
+                    node = node.setdefault(char, {})
+                node[""] = {}
+        # Greedy, so the longest keyword wins ("market report" over "market")
+        self._matcher = re.compile(r"\b(" + _trie_pattern(trie) + r")(?:e?s)?\b", re.IGNORECASE)
+
+        self._lock = threading.Lock()
+        self.requests = 0
+        self.local_hits = 0
+        self.llm_plans = 0
+        self.llm_seconds = 0.0
+
+    def match(self, request: str) -> Tuple[List[Dict[str, Any]], float]:
+        """Best local plan for a request and its confidence (0 with no match)"""
+        # Clause spans; each clause needs a keyword for full confidence
+        clause_starts, clause_ends, start = [], [], 0
+        for separator in [*_CLAUSE_SPLIT.finditer(request), None]:
+            end = separator.start() if separator else len(request)
+            if request[start:end].strip():
+                clause_starts.append(start)
+                clause_ends.append(end)
+            start = separator.end() if separator else end
+
+        scores: Dict[int, float] = {}
+        first_clause: Dict[int, int] = {}
+        seen_keywords = set()
+        covered_clauses = set()
+        for match in self._matcher.finditer(request):
+            clause = bisect_right(clause_starts, match.start()) - 1
+            covered_clauses.add(clause)
+            keyword = match.group(1).lower()
+            if keyword in seen_keywords:
+                continue
+            seen_keywords.add(keyword)
+            for index, weight in self._keyword_targets[keyword]:
+                scores[index] = min(1.0, scores.get(index, 0.0) + weight)
+                first_clause.setdefault(index, clause)
+        if not scores:
+            return [], 0.0
+
+        # Multi-step templates first, then in clause order, and within a
+        # clause in pipeline order (fetch before compute, analyze, render);
+        # templates adding no new service type do not count towards confidence
+        plan, service_types, contributing = [], set(), []
+        for index in sorted(scores, key=lambda i: (
+            len(self.templates[i]["subtasks"]) == 1,
+            first_clause[i],
+            SERVICE_ORDER.get(self.templates[i]["subtasks"][0]["service_type"], len(SERVICE_ORDER))
+        )):
+            before = len(plan)
+            for subtask in self.templates[index]["subtasks"]:
+                if subtask["service_type"] not in service_types:
+                    service_types.add(subtask["service_type"])
+                    plan.append(dict(subtask))
+            if len(plan) > before:
+                contributing.append(scores[index])
+        confidence = min(contributing) * len(covered_clauses) / max(len(clause_starts), 1)
+        return plan, round(confidence, 3)
+
+    def plan(self, request: str) -> Optional[List[Dict[str, Any]]]:
+        """A confident local plan, or None to ask the LLM (counted for the hit ratio)"""
+        plan, confidence = self.match(request)
+        hit = bool(plan) and confidence >= self.min_confidence
+        with self._lock:
+            self.requests += 1
+            self.local_hits += hit
+        return plan if hit else None
+
+    def record_llm(self, seconds: float):
+        """Time an LLM plan took, to estimate what local hits save"""
+        with self._lock:
+            self.llm_plans += 1
+            self.llm_seconds += seconds
+
+    def snapshot(self) -> Dict[str, Any]:
+        average_llm = self.llm_seconds / self.llm_plans if self.llm_plans else None
+        return {
+            "templates": len(self.templates),
+            "requests": self.requests,
+            "local_hits": self.local_hits,
+            "hit_ratio": round(self.local_hits / self.requests, 4) if self.requests else None,
+            "llm_plans": self.llm_plans,
+            "avg_llm_plan_ms": round(average_llm * 1000, 1) if average_llm is not None else None,
+            "estimated_llm_time_saved_s": round(average_llm * self.local_hits, 2) if average_llm is not None else None
+        }
+
+
+local_planner = LocalPlanner()
@@ -1,20 +1,37 @@
+from __future__ import annotations
+
 import os
 import json
-import httpx
+import time
+import atexit
+import threading
 import asyncio
-from solana.rpc.api import Client
-from solana.rpc.commitment import Confirmed
-from solana.transaction import Transaction
-from solders.pubkey import Pubkey
-from solders.keypair import Keypair
-from solders.system_program import TransferParams, transfer
-from solders.message import Message
-from openai import OpenAI
-from typing import List, Dict, Any
+from collections import deque
+from contextlib import nullcontext
+from typing import List, Dict, Any, Optional, TYPE_CHECKING
 from dotenv import load_dotenv
 
+# Heavy dependencies (solana, solders, openai, httpx) are imported on first
+# use in the RPC, payment and LLM paths so that importing this module (e.g.
+# from api_server.py or register_agents.py) stays cheap.
+if TYPE_CHECKING:
+    from solana.rpc.api import Client
+    from solders.keypair import Keypair
+    from solders.pubkey import Pubkey
+
 # Import Professional Agent Manager
 from agent_manager import agent_manager
+from agent_record import AgentRecord
+from validation_queue import ValidationQueue
+from wallet_pool import WalletPool, load_keypairs, read_keypair_file
+from shared_store import get_cache
+from workers import current_worker
+from service_payload import PayloadTooLarge, read_service_response, read_snippet
+from rpc_pool import get_rpc_pool
+from payment_builder import payment_builder
+from local_planner import LOCAL_PLANNER_ENABLED, local_planner
+from receipt_ledger import receipt_ledger
+import metrics
 
 # Load environment variables
 load_dotenv()
@@ -23,25 +40,141 @@ load_dotenv()
 # 1. Real Configuration (from environment variables)
 # ----------------------------------------------------
 SOLANA_CLUSTER = os.getenv("SOLANA_RPC_URL", "https://api.devnet.solana.com")
-REPUTATION_PROGRAM_ID = Pubkey.from_string(
-    os.getenv("REPUTATION_PROGRAM_ID", "Fg6PaFpoGXkPABqLTSsAPoV2K1tTq2tL2R1fV9EFSGjM")
-)
-
-# OpenAI client (automatically reads OPENAI_API_KEY from environment)
-# If no API key, will use fallback in llm_task_breakdown
-try:
-    openai_client = OpenAI()
-    LLM_AVAILABLE = True
-    print("✅ OpenAI API key found - LLM task decomposition enabled")
-except Exception as e:
-    openai_client = None
-    LLM_AVAILABLE = False
-    print(f"⚠️ OpenAI API key not found - Using simple task decomposition: {e}")
+# Comma-separated endpoints for the RPC pool (latency routing, failover, batching)
+SOLANA_RPC_URLS = os.getenv("SOLANA_RPC_URLS", SOLANA_CLUSTER)
+REPUTATION_PROGRAM_ADDRESS = os.getenv("REPUTATION_PROGRAM_ID", "Fg6PaFpoGXkPABqLTSsAPoV2K1tTq2tL2R1fV9EFSGjM")
+_reputation_program_id = None
+
+def get_reputation_program_id() -> Pubkey:
+    """Get the Reputation Program ID as a Pubkey (parsed on first use)"""
+    global _reputation_program_id
+    if _reputation_program_id is None:
+        from solders.pubkey import Pubkey
+        _reputation_program_id = Pubkey.from_string(REPUTATION_PROGRAM_ADDRESS)
+    return _reputation_program_id
+
+# Constants
+LAMPORTS_PER_SOL = 1_000_000_000
+WALLET_FILE = os.getenv("ORCHESTRATOR_WALLET_PATH", "wallet.json")
+WALLET_DIR = os.getenv("ORCHESTRATOR_WALLET_DIR")
+WALLET_KEYSTORE = os.getenv("ORCHESTRATOR_WALLET_KEYSTORE")
+TREASURY_WALLET_PATH = os.getenv("TREASURY_WALLET_PATH")
+CONFIRMATION_TIMEOUT = float(os.getenv("CONFIRMATION_TIMEOUT", "30"))
+CONFIRMATION_POLL_INTERVAL = float(os.getenv("CONFIRMATION_POLL_INTERVAL", "0.5"))
+
+# Hedged probing: the unpaid 402 request goes to up to HEDGE_PROBE_COUNT of
+# the best-ranked agents, each started after HEDGE_DELAY_MS without an answer
+# ("auto" = the HEDGE_PERCENTILE of recent probe latencies, 0 = all at once)
+HEDGE_PROBE_COUNT = int(os.getenv("HEDGE_PROBE_COUNT", "2"))
+HEDGE_DELAY_MS = os.getenv("HEDGE_DELAY_MS", "auto")
+HEDGE_PERCENTILE = float(os.getenv("HEDGE_PERCENTILE", "95"))
+HEDGE_DEFAULT_DELAY_MS = 500.0  # until enough probe latencies are observed
+HEDGE_MIN_SAMPLES = 20
+HEDGE_WINDOW = 200
+
+# Failover: on agent failure the next-ranked candidate is tried, each HTTP
+# attempt capped at FAILOVER_ATTEMPT_TIMEOUT within an overall SUBTASK_DEADLINE
+FAILOVER_MAX_AGENTS = int(os.getenv("FAILOVER_MAX_AGENTS", "4"))
+FAILOVER_ATTEMPT_TIMEOUT = float(os.getenv("FAILOVER_ATTEMPT_TIMEOUT", "10"))
+SUBTASK_DEADLINE = float(os.getenv("SUBTASK_DEADLINE", "60"))
+
+# Deadlines: /api/orchestrate may pass a time budget (deadlineMs); every
+# stage caps its own timeout at what is left of it
+ORCHESTRATION_DEADLINE_MS = float(os.getenv("ORCHESTRATION_DEADLINE_MS", "0") or 0) or None
+LLM_TIMEOUT = float(os.getenv("LLM_TIMEOUT", "30"))
+RPC_TIMEOUT = float(os.getenv("RPC_TIMEOUT", "10"))
+PAYMENT_MIN_TIME_MS = float(os.getenv("PAYMENT_MIN_TIME_MS", "2000"))  # until payment times are observed
+
+# Caches shared by all workers through ORCHESTRATOR_SHARED_STORE (else
+# per-process): LLM plans by normalised request, and agents' x402 terms,
+# which let a repeat payment skip the unpaid probe (0 disables either)
+PLAN_CACHE_TTL = float(os.getenv("PLAN_CACHE_TTL", "300"))
+PAYMENT_TERMS_TTL = float(os.getenv("PAYMENT_TERMS_TTL", "60"))
+plan_cache = get_cache("plans")
+payment_terms_cache = get_cache("payment_terms")
+
+class Deadline:
+    """
+    Time budget for one orchestration (or one stage of it).
+    
+    Stages derive their timeouts with remaining(own_timeout); without a
+    budget each stage simply keeps its own timeout.
+    """
+    
+    def __init__(self, budget_ms: Optional[float] = None, expires_at: Optional[float] = None):
+        self.expires_at = expires_at
+        if budget_ms is not None:
+            self.expires_at = time.monotonic() + budget_ms / 1000
+    
+    def remaining(self, cap: Optional[float] = None) -> Optional[float]:
+        """Seconds left (never negative), capped at `cap`"""
+        if self.expires_at is None:
+            return cap
+        left = max(0.0, self.expires_at - time.monotonic())
+        return left if cap is None else min(cap, left)
+    
+    def expired(self) -> bool:
+        return self.expires_at is not None and time.monotonic() >= self.expires_at
+    
+    def child(self, seconds: float) -> "Deadline":
+        """A deadline `seconds` from now, never later than this one"""
+        expires_at = time.monotonic() + seconds
+        if self.expires_at is not None:
+            expires_at = min(expires_at, self.expires_at)
+        return Deadline(expires_at=expires_at)
+
+# Nothing below touches the network or disk at import time: the OpenAI
+# client and the wallet are created on first use (or by `startup()`), and
+# wallet funding runs as a background task.
+_init_lock = threading.Lock()
+_openai_client = None
+_openai_initialised = False
+_wallet_pool = None
+
+# Startup state reported by /health (liveness vs. readiness)
+startup_state = {
+    "ready": False,
+    "wallet_loaded": False,
+    "wallets": 0,
+    "llm_available": None,
+    "wallet_funding": "pending",
+    "started_at": None,
+    "ready_at": None
+}
+
+def get_openai_client():
+    """
+    Get the OpenAI client, creating it on first use.
+    
+    Returns None when no API key is configured (llm_task_breakdown then
+    falls back to simple decomposition).
+    """
+    global _openai_client, _openai_initialised
+    
+    if _openai_initialised:
+        return _openai_client
+    
+    with _init_lock:
+        if not _openai_initialised:
+            # OpenAI client (automatically reads OPENAI_API_KEY from environment)
+            try:
+                from openai import OpenAI
+                _openai_client = OpenAI()
+                print("✅ OpenAI API key found - LLM task decomposition enabled")
+            except Exception as e:
+                _openai_client = None
+                print(f"⚠️ OpenAI API key not found - Using simple task decomposition: {e}")
+            _openai_initialised = True
+            startup_state["llm_available"] = _openai_client is not None
+    
+    return _openai_client
 
 # Orchestrator wallet (load from saved wallet or generate new)
 def load_or_create_wallet():
     """Load wallet from wallet.json or create new one"""
-    wallet_file = "wallet.json"
+    from solders.keypair import Keypair
+    
+    wallet_file = WALLET_FILE
     
     try:
         if os.path.exists(wallet_file):
@@ -74,17 +207,57 @@ def load_or_create_wallet():
     
     return wallet
 
-ORCHESTRATOR_WALLET = load_or_create_wallet()
+def get_wallet_pool() -> WalletPool:
+    """
+    Get the pool of payer wallets, loading it on first use.
+    
+    Wallets come from ORCHESTRATOR_WALLET_DIR and/or ORCHESTRATOR_WALLET_KEYSTORE;
+    without either the pool holds just the wallet.json wallet. A
+    TREASURY_WALLET_PATH keypair enables topping up low wallets.
+    """
+    global _wallet_pool
+    
+    if _wallet_pool is not None:
+        return _wallet_pool
+    
+    with _init_lock:
+        if _wallet_pool is None:
+            keypairs = []
+            if WALLET_DIR or WALLET_KEYSTORE:
+                keypairs = load_keypairs(WALLET_DIR, WALLET_KEYSTORE)
+                print(f"👛 Loaded {len(keypairs)} pool wallet(s)")
+            if not keypairs:
+                keypairs = [load_or_create_wallet()]
+            # Pre-forked workers pay from disjoint slices of the pool when
+            # there are enough wallets, so they never share a fee payer
+            worker_index, worker_count = current_worker()
+            if worker_count > 1 and len(keypairs) >= worker_count:
+                keypairs = keypairs[worker_index::worker_count]
+            treasury = read_keypair_file(TREASURY_WALLET_PATH) if TREASURY_WALLET_PATH else None
+            _wallet_pool = WalletPool(keypairs, rpc_url=SOLANA_RPC_URLS, treasury=treasury)
+            startup_state["wallet_loaded"] = True
+            startup_state["wallets"] = len(keypairs)
+    
+    return _wallet_pool
 
-# Constants
-LAMPORTS_PER_SOL = 1_000_000_000
+def get_orchestrator_wallet() -> Keypair:
+    """Get the primary orchestrator wallet, loading or creating it on first use"""
+    return get_wallet_pool().primary
+
+# Validations are batched and flushed off the request path
+validation_queue = ValidationQueue(SOLANA_RPC_URLS, REPUTATION_PROGRAM_ADDRESS)
+atexit.register(validation_queue.stop)
+
+# Every payment and validation is appended to the local receipt ledger
+atexit.register(receipt_ledger.stop)
 
 # Auto-fund wallet if balance is low (Devnet only)
-def ensure_wallet_funded(wallet: Keypair, min_balance_sol: float = 0.1):
+async def ensure_wallet_funded(wallet: Keypair, min_balance_sol: float = 0.1):
     """Ensure the wallet has enough SOL for transactions"""
+    startup_state["wallet_funding"] = "checking"
     try:
-        solana_client = Client(SOLANA_CLUSTER)
-        balance_resp = solana_client.get_balance(wallet.pubkey())
+        solana_client = metrics.instrument_rpc_client(get_rpc_pool(SOLANA_RPC_URLS).client())
+        balance_resp = await asyncio.to_thread(solana_client.get_balance, wallet.pubkey())
         balance_sol = balance_resp.value / LAMPORTS_PER_SOL
         
         print(f"💰 Current balance: {balance_sol} SOL")
@@ -92,41 +265,121 @@ def ensure_wallet_funded(wallet: Keypair, min_balance_sol: float = 0.1):
         if balance_sol < min_balance_sol:
             print(f"⚠️ Low balance! Requesting airdrop from Devnet faucet...")
             try:
-                airdrop_resp = solana_client.request_airdrop(wallet.pubkey(), int(2 * LAMPORTS_PER_SOL))
+                airdrop_resp = await asyncio.to_thread(
+                    solana_client.request_airdrop, wallet.pubkey(), int(2 * LAMPORTS_PER_SOL)
+                )
                 print(f"✅ Airdrop requested: {airdrop_resp.value}")
                 
                 # Wait for confirmation
-                import time
-                time.sleep(3)
+                await asyncio.sleep(3)
                 
                 # Check new balance
-                new_balance_resp = solana_client.get_balance(wallet.pubkey())
+                new_balance_resp = await asyncio.to_thread(solana_client.get_balance, wallet.pubkey())
                 new_balance_sol = new_balance_resp.value / LAMPORTS_PER_SOL
                 print(f"💰 New balance: {new_balance_sol} SOL")
             except Exception as e:
                 print(f"❌ Airdrop failed: {e}")
                 print(f"💡 Please manually fund wallet: {wallet.pubkey()}")
                 print(f"   Visit: https://faucet.solana.com/")
+                startup_state["wallet_funding"] = "airdrop_failed"
+                return
+        
+        startup_state["wallet_funding"] = "funded"
     except Exception as e:
         print(f"⚠️ Could not check wallet balance: {e}")
+        startup_state["wallet_funding"] = "unavailable"
+
+async def ensure_wallets_funded(wallets: List[Keypair], min_balance_sol: float = 0.1):
+    """Fund each pool wallet in turn"""
+    for wallet in wallets:
+        await ensure_wallet_funded(wallet, min_balance_sol)
+
+# ----------------------------------------------------
+# Startup Phase
+# ----------------------------------------------------
+
+async def startup(fund_wallet: bool = True) -> Optional[asyncio.Task]:
+    """
+    Explicit async startup phase.
+    
+    Loads the wallets and OpenAI client off the event loop, marks the
+    orchestrator ready, and schedules wallet funding as a background task
+    (returned so the caller can await or cancel it). With a treasury the
+    pool's rebalancer keeps wallets funded instead of devnet airdrops.
+    """
+    startup_state["started_at"] = time.time()
+    
+    wallet_pool = await asyncio.to_thread(get_wallet_pool)
+    await asyncio.to_thread(get_openai_client)
+    
+    startup_state["ready"] = True
+    startup_state["ready_at"] = time.time()
+    print("✅ Orchestrator ready")
+    
+    if fund_wallet and wallet_pool.treasury is not None:
+        wallet_pool.start_rebalancer()
+        startup_state["wallet_funding"] = "treasury"
+        return None
+    if fund_wallet:
+        return asyncio.create_task(ensure_wallets_funded(wallet_pool.wallets))
+    
+    startup_state["wallet_funding"] = "skipped"
+    return None
 
-# Fund wallet on startup
-ensure_wallet_funded(ORCHESTRATOR_WALLET)
+def start_background_startup(fund_wallet: bool = True) -> threading.Thread:
+    """Run `startup()` and the funding task on a dedicated background thread"""
+    async def _run():
+        funding_task = await startup(fund_wallet=fund_wallet)
+        if funding_task is not None:
+            await funding_task
+    
+    def _target():
+        try:
+            asyncio.run(_run())
+        except Exception as e:
+            print(f"🚨 Orchestrator startup failed: {e}")
+    
+    thread = threading.Thread(target=_target, name="orchestrator-startup", daemon=True)
+    thread.start()
+    return thread
 
 # ----------------------------------------------------
 # 2. Real LLM Function for Task Breakdown
 # ----------------------------------------------------
 
-def llm_task_breakdown(user_request: str) -> List[Dict[str, Any]]:
+def llm_task_breakdown(user_request: str, timeout: Optional[float] = None) -> List[Dict[str, Any]]:
     """
     Uses a real LLM to break down complex tasks into executable subtasks.
     
     Returns a list of subtasks with service_type and budget allocation.
+    Requests the local template planner matches confidently are planned
+    without the LLM. The LLM call is bounded by `timeout` seconds
+    (LLM_TIMEOUT by default); with no time left the rule-based fallback is
+    used straight away.
     """
     print(f"🧠 Analyzing request: '{user_request[:60]}...'")
+    timeout = LLM_TIMEOUT if timeout is None else timeout
+    
+    # Common requests are planned locally from templates, in microseconds
+    if LOCAL_PLANNER_ENABLED:
+        local_plan = local_planner.plan(user_request)
+        if local_plan:
+            print(f"✅ Local planner matched ({len(local_plan)} subtasks)")
+            metrics.PLANS.inc("local")
+            return local_plan
     
-    # If LLM is available, use it
-    if LLM_AVAILABLE and openai_client:
+    # Plans the LLM produced for the same request (by any worker) are reused
+    plan_key = " ".join(user_request.lower().split())
+    if PLAN_CACHE_TTL > 0:
+        cached_plan = plan_cache.get(plan_key)
+        if cached_plan:
+            print(f"✅ Reusing cached plan ({len(cached_plan)} subtasks)")
+            metrics.PLANS.inc("cache")
+            return cached_plan
+    
+    # If LLM is available (and there is time to ask it), use it
+    openai_client = get_openai_client() if timeout > 0 else None
+    if openai_client:
         system_prompt = """You are an AI task decomposition expert for an agent orchestration system.
 
 Analyze the user request and break it down into atomic sub-tasks.
@@ -144,6 +397,7 @@ Return ONLY a JSON object with this structure:
         
         try:
             print("   Using OpenAI GPT-4o-mini for task decomposition...")
+            llm_started = time.perf_counter()
             response = openai_client.chat.completions.create(
                 model="gpt-4o-mini",  # Cost-effective model for hackathon
                 response_format={"type": "json_object"},
@@ -151,7 +405,8 @@ Return ONLY a JSON object with this structure:
                     {"role": "system", "content": system_prompt},
                     {"role": "user", "content": user_request}
                 ],
-                temperature=0.7
+                temperature=0.7,
+                timeout=timeout
             )
             
             # Parse LLM response
@@ -159,30 +414,22 @@ Return ONLY a JSON object with this structure:
             sub_tasks = plan.get("sub_tasks", [])
             
             print(f"✅ LLM generated {len(sub_tasks)} subtasks")
+            local_planner.record_llm(time.perf_counter() - llm_started)
+            metrics.PLANS.inc("llm")
+            if sub_tasks and PLAN_CACHE_TTL > 0:
+                plan_cache.set(plan_key, sub_tasks, PLAN_CACHE_TTL)
             return sub_tasks
             
         except Exception as e:
             print(f"🚨 LLM error: {e}. Using simple decomposition...")
     
-    # Fallback: Simple rule-based task decomposition
+    # Fallback: the local planner's best match, however unsure
     print("   Using simple rule-based task decomposition...")
-    
-    # Detect task type from keywords
-    user_lower = user_request.lower()
-    
-    if any(keyword in user_lower for keyword in ['analyze', 'sentiment', 'news', 'text', 'article']):
-        service_type = 'data_scraper'  # We have this!
-        task_name = "Scrape and analyze data"
-    elif any(keyword in user_lower for keyword in ['scrape', 'fetch', 'get', 'retrieve', 'data', 'price', 'sol']):
-        service_type = 'data_scraper'
-        task_name = "Fetch requested data"
-    else:
-        service_type = 'data_scraper'
-        task_name = "Execute user request"
-    
-    return [{
-        "name": task_name,
-        "service_type": service_type,
+    metrics.PLANS.inc("fallback")
+    fallback_plan, _ = local_planner.match(user_request)
+    return fallback_plan or [{
+        "name": "Execute user request",
+        "service_type": "data_scraper",
         "budget_usd": 5.0
     }]
 
@@ -190,19 +437,27 @@ Return ONLY a JSON object with this structure:
 # 3. Real Solana Query Function
 # ----------------------------------------------------
 
-def query_reputation_program(solana_client: Client, service_type: str) -> List[Dict[str, Any]]:
+def query_reputation_program(
+    solana_client: Client,
+    service_type: str,
+    timeout: Optional[float] = None
+) -> List[AgentRecord]:
     """
     Connects to Solana to read registered agent accounts and reputation scores.
     
     REAL IMPLEMENTATION: Query actual Solana blockchain for registered agents.
     NO MOCK DATA - If no agents on-chain, returns empty list.
+    
+    `timeout` bounds the local service agent check (2s by default).
     """
+    from solana.rpc.commitment import Confirmed
+    
     print(f"🔗 Querying REAL Solana blockchain at {SOLANA_CLUSTER} for '{service_type}' agents...")
     
     try:
         # Real Solana query using get_program_accounts
         accounts_result = solana_client.get_program_accounts(
-            REPUTATION_PROGRAM_ID,
+            get_reputation_program_id(),
             encoding="base64",
             commitment=Confirmed
         )
@@ -221,15 +476,15 @@ def query_reputation_program(solana_client: Client, service_type: str) -> List[D
                 
                 # Try to get real data from account
                 # This would be full IDL decoding in production
-                agent_data = {
-                    "agent_id": f"Agent_{pubkey[:8]}",
-                    "pubkey": pubkey,
-                    "reputation_score": 100,  # Would come from decoded account data
-                    "total_successful_txs": 0,  # Would come from decoded account data
-                    "api_url": "http://localhost:3001",  # Our REAL service agent
-                    "service_type": service_type,
-                    "owner": str(account_info.account.owner) if hasattr(account_info.account, 'owner') else "Unknown"
-                }
+                agent_data = AgentRecord(
+                    agent_id=f"Agent_{pubkey[:8]}",
+                    pubkey=pubkey,
+                    reputation_score=100,  # Would come from decoded account data
+                    total_successful_txs=0,  # Would come from decoded account data
+                    api_url="http://localhost:3001",  # Our REAL service agent
+                    service_type=service_type,
+                    owner=str(account_info.account.owner) if hasattr(account_info.account, 'owner') else "Unknown"
+                )
                 all_agents.append(agent_data)
                 
             except Exception as decode_error:
@@ -250,23 +505,23 @@ def query_reputation_program(solana_client: Client, service_type: str) -> List[D
             
             import httpx
             try:
-                response = httpx.get("http://localhost:3001/info", timeout=2.0)
+                response = httpx.get("http://localhost:3001/info", timeout=2.0 if timeout is None else min(2.0, timeout))
                 if response.status_code == 200:
                     agent_info = response.json()
                     print(f"✅ Found local service agent: {agent_info.get('agent_id')}")
                     
                     if agent_info.get('service_type') == service_type:
-                        local_agent = {
-                            "agent_id": agent_info.get('agent_id', 'DataAnalystAgent'),
-                            "pubkey": agent_info.get('wallet', 'Local'),
-                            "wallet": agent_info.get('wallet'),
-                            "reputation_score": 100,
-                            "total_successful_txs": 0,
-                            "api_url": "http://localhost:3001",
-                            "service_type": agent_info.get('service_type'),
-                            "owner": agent_info.get('wallet', 'Local'),
-                            "status": "active"
-                        }
+                        local_agent = AgentRecord(
+                            agent_id=agent_info.get('agent_id', 'DataAnalystAgent'),
+                            pubkey=agent_info.get('wallet', 'Local'),
+                            wallet=agent_info.get('wallet'),
+                            reputation_score=100,
+                            total_successful_txs=0,
+                            api_url="http://localhost:3001",
+                            service_type=agent_info.get('service_type'),
+                            owner=agent_info.get('wallet', 'Local'),
+                            status="active"
+                        )
                         
                         # Auto-register to professional registry
                         if agent_manager.register_agent(local_agent):
@@ -276,7 +531,7 @@ def query_reputation_program(solana_client: Client, service_type: str) -> List[D
             except Exception as local_check:
                 print(f"⚠️ No local service agent running: {local_check}")
         
-        filtered_agents = [a for a in all_agents if a["service_type"] == service_type]
+        filtered_agents = [a for a in all_agents if a.service_type == service_type]
         
         print(f"📊 Final result: {len(filtered_agents)} REAL agents available for '{service_type}'")
         return filtered_agents
@@ -291,207 +546,575 @@ def query_reputation_program(solana_client: Client, service_type: str) -> List[D
 # 4. REAL x402 Payment Integration (COMPLETE IMPLEMENTATION)
 # ----------------------------------------------------
 
+async def wait_for_confirmation(
+    solana_client: Client,
+    signature,
+    timeout: float = None,
+    poll_interval: float = None
+) -> bool:
+    """Poll getSignatureStatuses until the payment reaches 'confirmed' (or timeout)"""
+    from solders.transaction_status import TransactionConfirmationStatus
+    
+    timeout = CONFIRMATION_TIMEOUT if timeout is None else timeout
+    poll_interval = CONFIRMATION_POLL_INTERVAL if poll_interval is None else poll_interval
+    deadline = time.monotonic() + timeout
+    confirmed_levels = (TransactionConfirmationStatus.Confirmed, TransactionConfirmationStatus.Finalized)
+    
+    while True:
+        try:
+            status = (await asyncio.to_thread(solana_client.get_signature_statuses, [signature])).value[0]
+        except Exception as e:
+            print(f"⚠️ [X402] Signature status check failed: {e}")
+            status = None
+        
+        if status is not None:
+            if status.err is not None:
+                raise Exception(f"Transaction failed on-chain: {status.err}")
+            if status.confirmation_status in confirmed_levels:
+                return True
+        
+        if time.monotonic() + poll_interval > deadline:
+            return False
+        await asyncio.sleep(poll_interval)
+
+class ProbeError(Exception):
+    """An agent answered the unpaid request with something other than valid terms"""
+
+# Recent successful probe latencies (seconds) per service type
+_probe_latencies: Dict[str, deque] = {}
+
+# Recent paid round trips (payment, confirmation, paid retry) in seconds
+_payment_durations: deque = deque(maxlen=HEDGE_WINDOW)
+
+def _percentile(samples, pct: float) -> float:
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * pct / 100))]
+
+def hedge_delay(service_type: str) -> float:
+    """Seconds to wait on a probe before hedging to the next candidate"""
+    if HEDGE_DELAY_MS != "auto":
+        return float(HEDGE_DELAY_MS) / 1000
+    
+    samples = _probe_latencies.get(service_type)
+    if not samples or len(samples) < HEDGE_MIN_SAMPLES:
+        return HEDGE_DEFAULT_DELAY_MS / 1000
+    return _percentile(samples, HEDGE_PERCENTILE)
+
+def payment_time_estimate() -> float:
+    """Seconds a payment needs to finish (p90 of recent ones); less than this left means don't pay"""
+    if len(_payment_durations) < HEDGE_MIN_SAMPLES:
+        return PAYMENT_MIN_TIME_MS / 1000
+    return _percentile(_payment_durations, 90)
+
+def cached_payment_terms(agent: AgentRecord) -> Optional[Dict[str, Any]]:
+    """Terms this agent returned recently (to any worker), in probe_agent's format"""
+    from solders.pubkey import Pubkey
+    
+    if PAYMENT_TERMS_TTL <= 0:
+        return None
+    cached = payment_terms_cache.get(agent.api_url)
+    if cached is None:
+        return None
+    return {
+        "agent": agent,
+        "free": False,
+        "recipient": cached["recipient"],
+        "recipient_pubkey": Pubkey.from_string(cached["recipient"]),
+        "lamports": cached["lamports"]
+    }
+
+def remember_payment_terms(terms: Dict[str, Any]):
+    if PAYMENT_TERMS_TTL > 0 and not terms["free"]:
+        payment_terms_cache.set(
+            terms["agent"].api_url,
+            {"recipient": terms["recipient"], "lamports": terms["lamports"]},
+            PAYMENT_TERMS_TTL
+        )
+
+def forget_payment_terms(agent: AgentRecord):
+    if PAYMENT_TERMS_TTL > 0:
+        payment_terms_cache.delete(agent.api_url)
+
+async def probe_agent(
+    client,
+    agent: AgentRecord,
+    service_type: str,
+    timeout: float = None,
+    stream_payload: bool = False
+) -> Dict[str, Any]:
+    """
+    Unpaid request to an agent's service endpoint.
+    
+    Returns its payment terms, or the data itself if the service is free
+    (read like a paid response, see pay_and_fetch). Raises ProbeError for
+    any other answer.
+    """
+    from solders.pubkey import Pubkey
+    
+    agent_id = agent.agent_id or ''
+    started = time.perf_counter()
+    with metrics.span("probe", service_type, agent_id):
+        async with client.stream(
+            "GET",
+            f"{agent.api_url}/scrape",
+            params={"q": "solana"},
+            timeout=max(0.1, timeout) if timeout is not None else client.timeout
+        ) as response:
+            status_code = response.status_code
+            try:
+                if status_code in (200, 402):
+                    body, size = await read_service_response(response, stream=stream_payload and status_code == 200)
+            except (PayloadTooLarge, ValueError) as e:
+                print(f"❌ [X402] {agent_id}: unusable response: {e}")
+                raise ProbeError(f"Unusable response: {e}")
+    _probe_latencies.setdefault(service_type, deque(maxlen=HEDGE_WINDOW)).append(time.perf_counter() - started)
+    
+    if status_code == 200:
+        print(f"✅ [X402] {agent_id}: service delivered without payment (200 OK)")
+        return {"agent": agent, "free": True, "data": body, "data_bytes": size}
+    
+    if status_code != 402:
+        print(f"❌ [X402] {agent_id}: unexpected status code: {status_code}")
+        raise ProbeError(f"Unexpected status: {status_code}")
+    
+    print(f"✅ [X402] {agent_id}: received 402 Payment Required")
+    try:
+        payment_details = body.get('payment_details', {})
+        recipient = payment_details.get('recipient')
+        lamports = int(payment_details.get('amount_lamports', 5000000))
+        recipient_pubkey = Pubkey.from_string(recipient)
+    except Exception as e:
+        print(f"🚨 [X402] {agent_id}: failed to parse payment details: {e}")
+        raise ProbeError("Failed to parse payment details")
+    
+    return {
+        "agent": agent,
+        "free": False,
+        "recipient": recipient,
+        "recipient_pubkey": recipient_pubkey,
+        "lamports": lamports
+    }
+
+async def hedged_probe(
+    client,
+    candidates: List[AgentRecord],
+    service_type: str,
+    timeout: float = None,
+    stream_payload: bool = False,
+    cut_by_deadline: bool = False
+):
+    """
+    Probe the best-ranked candidates until one returns valid terms.
+    
+    Candidates are started in rank order, the next one as soon as a probe
+    fails or after hedge_delay() without an answer; the first valid terms
+    win and the remaining probes are cancelled. Returns (terms or None,
+    [(agent, error), ...] for failed probes).
+    
+    With `cut_by_deadline` (the timeout was shortened to fit the deadline),
+    probes that time out are not the agent's fault and are not reported.
+    """
+    import httpx
+    
+    candidates = candidates[:max(1, HEDGE_PROBE_COUNT)]
+    delay = hedge_delay(service_type)
+    ranks: Dict[asyncio.Task, int] = {}
+    pending = set()
+    failures = []
+    
+    def launch():
+        rank = len(ranks)
+        task = asyncio.ensure_future(probe_agent(client, candidates[rank], service_type, timeout, stream_payload))
+        ranks[task] = rank
+        pending.add(task)
+        if rank:
+            print(f"🔀 [X402] Hedging: probing {candidates[rank].agent_id}")
+    
+    launch()
+    while delay <= 0 and len(ranks) < len(candidates):
+        launch()
+    
+    try:
+        while pending:
+            hedge_left = len(ranks) < len(candidates)
+            done, pending = await asyncio.wait(
+                pending,
+                timeout=delay if hedge_left else None,
+                return_when=asyncio.FIRST_COMPLETED
+            )
+            for task in sorted(done, key=ranks.get):
+                agent = candidates[ranks[task]]
+                try:
+                    terms = task.result()
+                except ProbeError as e:
+                    failures.append((agent, str(e)))
+                except httpx.TimeoutException as e:
+                    if cut_by_deadline:
+                        print(f"⏱️ [X402] {agent.agent_id}: probe cut short by the deadline")
+                        metrics.PROBES.inc(service_type, "deadline")
+                        continue
+                    print(f"🚨 [X402] {agent.agent_id}: connection error: {e}")
+                    failures.append((agent, f"Connection failed: {str(e)}"))
+                except Exception as e:
+                    print(f"🚨 [X402] {agent.agent_id}: connection error: {e}")
+                    failures.append((agent, f"Connection failed: {str(e)}"))
+                else:
+                    metrics.PROBES.inc(service_type, "won")
+                    return terms, failures
+                metrics.PROBES.inc(service_type, "failed")
+            
+            # Hedge on silence, or replace a failed probe right away
+            if len(ranks) < len(candidates) and (not done or not pending):
+                launch()
+    finally:
+        for task in pending:
+            task.cancel()
+            metrics.PROBES.inc(service_type, "cancelled")
+        if pending:
+            await asyncio.gather(*pending, return_exceptions=True)
+    
+    return None, failures
+
 async def execute_x402_payment_and_service(
     agent_url: str,
     budget_usd: float,
-    buyer_keypair: Keypair,
-    solana_client: Client
+    buyer_keypair: Optional[Keypair],
+    solana_client: Client,
+    service_type: str = "",
+    agent_id: str = "",
+    candidates: Optional[List[AgentRecord]] = None,
+    deadline: Optional[Deadline] = None,
+    stream_payload: bool = False
 ) -> Dict[str, Any]:
     """
     Complete x402 payment flow:
-    1. Request service (receive 402 Payment Required)
-    2. Parse payment details
-    3. Execute SOL payment on Solana blockchain
+    1. Request service from the top-ranked candidates (hedged, expecting 402)
+    2. Parse payment details from the first valid answer
+    3. Execute SOL payment on Solana blockchain (at most once per agent)
     4. Retry request with payment proof
     5. Receive and return service data
     
+    `candidates` are agent records ranked best first; without them only
+    `agent_url` is tried. When an agent fails (bad terms, connection error,
+    non-200 after payment) the flow fails over to the next candidate, up to
+    FAILOVER_MAX_AGENTS agents within SUBTASK_DEADLINE, each HTTP attempt
+    capped at FAILOVER_ATTEMPT_TIMEOUT. A paid agent is never tried again.
+    Payment-side errors (balance, RPC) end the flow: the next agent would
+    fail the same way.
+    
+    All timeouts are also capped by the orchestration `deadline`, and no
+    payment is started with less than payment_time_estimate() left.
+    
+    Each payment is made by `buyer_keypair`, or when it is None by a pool
+    wallet leased for that payment's amount; payments record their payer.
+    
+    The service data is read within SERVICE_RESPONSE_MAX_BYTES and, with
+    `stream_payload`, kept as a spooled ServicePayload instead of parsed.
+    
+    When the best remaining candidate's terms are cached (see
+    PAYMENT_TERMS_TTL) the unpaid probe is skipped and it is paid directly;
+    an agent that then fails has its cached terms dropped.
+    
+    The result names the agent that served (or failed last; None when the
+    deadline ran out before any agent failed, so nobody is blamed) and
+    lists all failed agents and every payment made.
+    
     This is the HEART of the x402 integration!
     """
+    import httpx
     
-    SERVICE_ENDPOINT = f"{agent_url}/scrape"
+    candidates = (candidates or [AgentRecord(agent_id=agent_id, api_url=agent_url)])[:max(1, FAILOVER_MAX_AGENTS)]
+    subtask_deadline = (deadline or Deadline()).child(SUBTASK_DEADLINE)
+    deadline_exceeded = False
+    remaining = list(candidates)
+    chosen_agent = candidates[0]
+    failures = []
+    payments = []
+    result = None
     print(f"\n{'='*60}")
-    print(f"[X402] Starting payment flow to: {SERVICE_ENDPOINT}")
+    print(f"[X402] Starting payment flow ({len(candidates)} candidate(s), best: {candidates[0].api_url})")
     print(f"{'='*60}")
     
-    # Step 1: Initial request WITHOUT payment proof
-    try:
-        async with httpx.AsyncClient(timeout=30.0) as client:
-            print("[X402] Step 1: Initial request (expecting 402)...")
-            response = await client.get(SERVICE_ENDPOINT, params={"q": "solana"})
+    async with httpx.AsyncClient(timeout=30.0) as client:
+        while remaining:
+            if subtask_deadline.expired():
+                print("⏱️ [X402] Subtask deadline reached")
+                deadline_exceeded = True
+                break
+            attempt_timeout = subtask_deadline.remaining(FAILOVER_ATTEMPT_TIMEOUT)
+            if failures:
+                print(f"🔁 [X402] Failing over ({len(remaining)} candidate(s) left)")
             
-            # Step 2: Check if payment is required (402 status)
-            if response.status_code == 402:
-                print("✅ [X402] Received 402 Payment Required")
-                
-                try:
-                    payment_data = response.json()
-                    payment_details = payment_data.get('payment_details', {})
-                    
-                    recipient_pubkey_str = payment_details.get('recipient')
-                    required_lamports = payment_details.get('amount_lamports', 5000000)
-                    required_sol = required_lamports / LAMPORTS_PER_SOL
-                    
-                    print(f"\n💰 Payment Details:")
-                    print(f"   Recipient: {recipient_pubkey_str}")
-                    print(f"   Amount: {required_sol} SOL ({required_lamports} lamports)")
-                    print(f"   Budget: ${budget_usd}")
-                    
-                    recipient_pubkey = Pubkey.from_string(recipient_pubkey_str)
-                    
-                except (KeyError, json.JSONDecodeError, Exception) as e:
-                    print(f"🚨 [X402] Failed to parse payment details: {e}")
-                    return {
-                        "success": False,
-                        "error": "Failed to parse payment details",
-                        "data": None
-                    }
-                
-                # Step 3: Execute REAL Solana payment (NO DEMO MODE!)
-                print(f"\n[X402] Step 3: Executing payment on Solana...")
-                
-                # Check wallet balance first
-                balance_resp = solana_client.get_balance(buyer_keypair.pubkey())
-                balance = balance_resp.value
-                print(f"💰 Wallet balance: {balance / LAMPORTS_PER_SOL} SOL")
-                
-                # If balance is too low, try airdrop once
-                if balance < required_lamports:
-                    print(f"⚠️ Insufficient balance. Trying airdrop...")
-                    try:
-                        print("[X402] Requesting devnet airdrop for buyer wallet...")
-                        airdrop_sig = solana_client.request_airdrop(
-                            buyer_keypair.pubkey(),
-                            2 * LAMPORTS_PER_SOL
-                        )
-                        print(f"   Airdrop signature: {airdrop_sig.value}")
-                        await asyncio.sleep(3)
-                        
-                        # Check balance again
-                        balance_resp = solana_client.get_balance(buyer_keypair.pubkey())
-                        balance = balance_resp.value
-                        print(f"💰 New balance: {balance / LAMPORTS_PER_SOL} SOL")
-                        
-                        if balance < required_lamports:
-                            # NO DEMO MODE - just fail
-                            raise Exception(f"Insufficient balance: {balance / LAMPORTS_PER_SOL} SOL < {required_sol} SOL. Please fund wallet manually at https://faucet.solana.com/")
-                    except Exception as e:
-                        print(f"❌ Cannot proceed: {e}")
-                        raise
-                
-                # Execute REAL payment (NO FALLBACK)
-                try:
-                    # Create transfer instruction
-                    transfer_ix = transfer(
-                        TransferParams(
-                            from_pubkey=buyer_keypair.pubkey(),
-                            to_pubkey=recipient_pubkey,
-                            lamports=required_lamports
-                        )
-                    )
-                    
-                    # Get recent blockhash
-                    recent_blockhash_resp = solana_client.get_latest_blockhash()
-                    recent_blockhash = recent_blockhash_resp.value.blockhash
-                    
-                    # Create transaction
-                    from solana.transaction import Transaction
-                    tx = Transaction()
-                    tx.add(transfer_ix)
-                    tx.recent_blockhash = recent_blockhash
-                    tx.fee_payer = buyer_keypair.pubkey()
-                    
-                    # Sign transaction
-                    tx.sign(buyer_keypair)
-                    
-                    # Send transaction
-                    print("[X402] Sending payment transaction...")
-                    tx_signature = solana_client.send_transaction(
-                        tx,
-                        buyer_keypair
-                    )
-                    
-                    tx_sig_str = str(tx_signature.value)
-                    print(f"✅ [X402] Payment sent successfully!")
-                    print(f"   Transaction signature: {tx_sig_str}")
-                    
-                    # Wait for confirmation
-                    print("[X402] Waiting for transaction confirmation...")
-                    await asyncio.sleep(3)
-                except Exception as payment_error:
-                    print(f"❌ Real payment failed: {payment_error}")
-                    # NO DEMO MODE - just fail
-                    raise Exception(f"Payment failed: {payment_error}")
-                
-                # Step 4: Retry request WITH payment proof
-                print(f"\n[X402] Step 4: Retrying request with payment proof...")
-                
-                try:
-                    payment_headers = {
-                        "X-Payment-Proof": tx_sig_str
-                    }
-                    
-                    final_response = await client.get(
-                        SERVICE_ENDPOINT,
-                        headers=payment_headers,
-                        params={"q": "solana"}
-                    )
-                    
-                    # Step 5: Check if service was delivered
-                    if final_response.status_code == 200:
-                        print("🎉 [X402] SUCCESS! Payment verified and service delivered!")
-                        service_data = final_response.json()
-                        
-                        return {
-                            "success": True,
-                            "data": service_data,
-                            "payment_tx": tx_sig_str,
-                            "amount_paid_sol": required_sol,
-                            "recipient": recipient_pubkey_str
-                        }
-                    else:
-                        print(f"❌ [X402] Service failed after payment. Status: {final_response.status_code}")
-                        print(f"   Response: {final_response.text}")
-                        return {
-                            "success": False,
-                            "error": f"Service returned {final_response.status_code}",
-                            "payment_tx": tx_sig_str,
-                            "data": None
-                        }
-                        
-                except Exception as e:
-                    print(f"🚨 [X402] Service call failed: {e}")
-                    import traceback
-                    traceback.print_exc()
-                    return {
-                        "success": False,
-                        "error": f"Service call failed: {str(e)}",
-                        "data": None
-                    }
-                    
-            elif response.status_code == 200:
-                # Service is free or doesn't require payment
-                print("✅ [X402] Service delivered without payment (200 OK)")
-                return {
+            # Step 1: Initial request(s) WITHOUT payment proof (unless the
+            # agent's terms are already known)
+            terms = cached_payment_terms(remaining[0])
+            if terms is not None:
+                print(f"[X402] Step 1: Using cached payment terms for {remaining[0].agent_id}")
+                metrics.PROBES.inc(service_type, "cached")
+                probe_failures = []
+            else:
+                print("[X402] Step 1: Initial request (expecting 402)...")
+                terms, probe_failures = await hedged_probe(
+                    client, remaining, service_type, attempt_timeout, stream_payload,
+                    cut_by_deadline=attempt_timeout < FAILOVER_ATTEMPT_TIMEOUT
+                )
+                if terms is not None:
+                    remember_payment_terms(terms)
+            failures.extend(probe_failures)
+            remaining = [a for a in remaining if not any(a is failed for failed, _ in probe_failures)]
+            if terms is None:
+                metrics.FAILOVERS.inc(service_type, "probe_failed")
+                continue
+            
+            chosen_agent = terms["agent"]
+            remaining = [a for a in remaining if a is not chosen_agent]
+            if terms["free"]:
+                result = {
                     "success": True,
-                    "data": response.json(),
+                    "data": terms["data"],
+                    "data_bytes": terms["data_bytes"],
                     "payment_tx": None,
                     "amount_paid_sol": 0
                 }
-            else:
-                print(f"❌ [X402] Unexpected status code: {response.status_code}")
-                return {
+                break
+            
+            # Never start a payment that cannot finish before the deadline
+            if subtask_deadline.remaining() < payment_time_estimate():
+                print(f"⏱️ [X402] {subtask_deadline.remaining():.2f}s left, not enough to pay {chosen_agent.agent_id}")
+                deadline_exceeded = True
+                break
+            
+            # Steps 3-5: pay this agent (once) and fetch the service, leasing
+            # a pool wallet that can cover the amount now that it is known
+            paid_started = time.perf_counter()
+            try:
+                with (nullcontext(buyer_keypair) if buyer_keypair is not None
+                      else get_wallet_pool().lease(terms["lamports"])) as payer:
+                    result = await pay_and_fetch(
+                        client, terms, budget_usd, payer, solana_client, service_type,
+                        deadline=subtask_deadline, stream_payload=stream_payload
+                    )
+            except Exception as e:
+                print(f"🚨 [X402] Payment error: {e}")
+                import traceback
+                traceback.print_exc()
+                result = {
                     "success": False,
-                    "error": f"Unexpected status: {response.status_code}",
+                    "error": f"Connection failed: {str(e)}",
                     "data": None
                 }
+                break
+            
+            if result.get("payment_tx"):
+                payments.append({
+                    "agent": chosen_agent,
+                    "payer": payer,
+                    "payment_tx": result["payment_tx"],
+                    "amount_paid_sol": result["amount_paid_sol"]
+                })
+                receipt_ledger.record_payment(
+                    chosen_agent.agent_id, service_type, terms["lamports"], result["success"],
+                    latency_ms=(time.perf_counter() - paid_started) * 1000,
+                    signature=result["payment_tx"]
+                )
+            if result["success"]:
+                break
+            
+            failures.append((chosen_agent, result["error"]))
+            forget_payment_terms(chosen_agent)
+            metrics.FAILOVERS.inc(service_type, "service_failed")
+            result = None
+    
+    if result is None:
+        if failures:
+            chosen_agent = failures[-1][0]
+        elif deadline_exceeded:
+            # Our time ran out before any agent failed: nobody to blame
+            chosen_agent = None
+        errors = [error for _, error in failures]
+        if deadline_exceeded:
+            error = "Deadline exceeded" + (f" after: {'; '.join(errors)}" if errors else "")
+        elif not errors:
+            error = "Deadline exceeded"
+        elif len(errors) == 1:
+            error = errors[0]
+        else:
+            error = f"All {len(errors)} attempted agents failed: {'; '.join(errors)}"
+        result = {"success": False, "error": error, "data": None}
+    
+    result["agent"] = chosen_agent
+    result["failures"] = failures
+    result["payments"] = payments
+    result["deadline_exceeded"] = deadline_exceeded and not result["success"]
+    return result
+
+async def pay_and_fetch(
+    client,
+    terms: Dict[str, Any],
+    budget_usd: float,
+    buyer_keypair: Keypair,
+    solana_client: Client,
+    service_type: str = "",
+    deadline: Optional[Deadline] = None,
+    stream_payload: bool = False
+) -> Dict[str, Any]:
+    """
+    Pay the agent that returned `terms` and retry its service with the
+    payment proof, confirmation and retry bounded by `deadline`. Raises if
+    the payment itself cannot be made.
+    
+    The response is read in chunks and fails once it passes
+    SERVICE_RESPONSE_MAX_BYTES; it is parsed as JSON, or with
+    `stream_payload` spooled unparsed for streaming to the API client.
+    """
+    deadline = deadline or Deadline()
+    started = time.perf_counter()
+    
+    agent_id = terms["agent"].agent_id or ""
+    SERVICE_ENDPOINT = f"{terms['agent'].api_url}/scrape"
+    recipient_pubkey_str = terms["recipient"]
+    recipient_pubkey = terms["recipient_pubkey"]
+    required_lamports = terms["lamports"]
+    required_sol = required_lamports / LAMPORTS_PER_SOL
+    
+    print(f"\n💰 Payment Details ({agent_id}):")
+    print(f"   Recipient: {recipient_pubkey_str}")
+    print(f"   Amount: {required_sol} SOL ({required_lamports} lamports)")
+    print(f"   Budget: ${budget_usd}")
+    
+    # Step 3: Execute REAL Solana payment (NO DEMO MODE!)
+    print(f"\n[X402] Step 3: Executing payment on Solana...")
+    
+    # Check wallet balance first (the pool's tracked balance saves the RPC when it suffices)
+    wallet_pool = get_wallet_pool()
+    recent_blockhash = None
+    with metrics.span("balance_check", service_type, agent_id):
+        balance = wallet_pool.known_balance(buyer_keypair.pubkey())
+        if balance is None or balance < required_lamports:
+            # Fetched together so the RPC pool sends both in one batch request
+            balance_resp, blockhash_resp = await asyncio.gather(
+                asyncio.to_thread(solana_client.get_balance, buyer_keypair.pubkey()),
+                asyncio.to_thread(solana_client.get_latest_blockhash)
+            )
+            balance = balance_resp.value
+            recent_blockhash = blockhash_resp.value.blockhash
+            wallet_pool.record_balance(buyer_keypair.pubkey(), balance)
+        print(f"💰 Wallet balance: {balance / LAMPORTS_PER_SOL} SOL")
+        
+        # If balance is too low, try airdrop once
+        if balance < required_lamports:
+            print(f"⚠️ Insufficient balance. Trying airdrop...")
+            try:
+                print("[X402] Requesting devnet airdrop for buyer wallet...")
+                airdrop_sig = await asyncio.to_thread(
+                    solana_client.request_airdrop,
+                    buyer_keypair.pubkey(),
+                    2 * LAMPORTS_PER_SOL
+                )
+                print(f"   Airdrop signature: {airdrop_sig.value}")
+                await asyncio.sleep(3)
+                
+                # Check balance again
+                balance_resp = await asyncio.to_thread(solana_client.get_balance, buyer_keypair.pubkey())
+                balance = balance_resp.value
+                wallet_pool.record_balance(buyer_keypair.pubkey(), balance)
+                print(f"💰 New balance: {balance / LAMPORTS_PER_SOL} SOL")
                 
+                if balance < required_lamports:
+                    # NO DEMO MODE - just fail
+                    raise Exception(f"Insufficient balance: {balance / LAMPORTS_PER_SOL} SOL < {required_sol} SOL. Please fund wallet manually at https://faucet.solana.com/")
+            except Exception as e:
+                print(f"❌ Cannot proceed: {e}")
+                raise
+    
+    # Execute REAL payment (NO FALLBACK)
+    try:
+        with metrics.span("payment_send", service_type, agent_id):
+            # Get recent blockhash (unless fetched with the balance)
+            if recent_blockhash is None:
+                recent_blockhash_resp = await asyncio.to_thread(solana_client.get_latest_blockhash)
+                recent_blockhash = recent_blockhash_resp.value.blockhash
+            
+            # Build and sign the transfer from the cached (payer, recipient) template
+            raw_tx, _ = payment_builder.build(buyer_keypair, recipient_pubkey, required_lamports, recent_blockhash)
+            
+            # Send transaction
+            print("[X402] Sending payment transaction...")
+            tx_signature = await asyncio.to_thread(solana_client.send_raw_transaction, raw_tx)
+        
+        tx_sig_str = str(tx_signature.value)
+        wallet_pool.debit(buyer_keypair.pubkey(), required_lamports)
+        print(f"✅ [X402] Payment sent successfully!")
+        print(f"   Transaction signature: {tx_sig_str}")
+        
+        # Wait for confirmation
+        print("[X402] Waiting for transaction confirmation...")
+        with metrics.span("confirmation", service_type, agent_id):
+            confirmation_timeout = deadline.remaining(CONFIRMATION_TIMEOUT)
+            confirmed = await wait_for_confirmation(solana_client, tx_signature.value, timeout=confirmation_timeout)
+        if not confirmed:
+            print(f"⚠️ [X402] Not confirmed after {confirmation_timeout:.1f}s, retrying service anyway")
+    except Exception as payment_error:
+        print(f"❌ Real payment failed: {payment_error}")
+        # NO DEMO MODE - just fail
+        raise Exception(f"Payment failed: {payment_error}")
+    
+    # Step 4: Retry request WITH payment proof
+    print(f"\n[X402] Step 4: Retrying request with payment proof...")
+    
+    try:
+        payment_headers = {
+            "X-Payment-Proof": tx_sig_str
+        }
+        
+        with metrics.span("paid_retry", service_type, agent_id):
+            async with client.stream(
+                "GET",
+                SERVICE_ENDPOINT,
+                headers=payment_headers,
+                params={"q": "solana"},
+                timeout=max(0.1, deadline.remaining(FAILOVER_ATTEMPT_TIMEOUT))
+            ) as final_response:
+                if final_response.status_code == 200:
+                    service_data, service_data_bytes = await read_service_response(
+                        final_response, stream=stream_payload
+                    )
+                else:
+                    error_snippet = await read_snippet(final_response)
+        
+        # Step 5: Check if service was delivered
+        if final_response.status_code == 200:
+            print(f"🎉 [X402] SUCCESS! Payment verified and service delivered ({service_data_bytes} bytes)!")
+            _payment_durations.append(time.perf_counter() - started)
+            
+            return {
+                "success": True,
+                "data": service_data,
+                "data_bytes": service_data_bytes,
+                "payment_tx": tx_sig_str,
+                "amount_paid_sol": required_sol,
+                "recipient": recipient_pubkey_str
+            }
+        else:
+            print(f"❌ [X402] Service failed after payment. Status: {final_response.status_code}")
+            print(f"   Response: {error_snippet}")
+            return {
+                "success": False,
+                "error": f"Service returned {final_response.status_code}",
+                "payment_tx": tx_sig_str,
+                "amount_paid_sol": required_sol,
+                "data": None
+            }
+            
     except Exception as e:
-        print(f"🚨 [X402] Connection error: {e}")
+        print(f"🚨 [X402] Service call failed: {e}")
         import traceback
         traceback.print_exc()
         return {
             "success": False,
-            "error": f"Connection failed: {str(e)}",
+            "error": f"Service call failed: {str(e)}",
+            "payment_tx": tx_sig_str,
+            "amount_paid_sol": required_sol,
             "data": None
         }
 
@@ -503,52 +1126,48 @@ def record_validation_on_chain(
     solana_client: Client,
     seller_pubkey: str,
     success: bool,
-    buyer_keypair: Keypair
+    buyer_keypair: Keypair,
+    agent_id: str = "",
+    service_type: str = ""
 ) -> str:
     """
-    Calls the record_validation instruction on the Reputation Program.
+    Queues a record_validation instruction for the Reputation Program.
     
-    This updates the agent's reputation on-chain based on service success/failure.
+    Validations are buffered and flushed in the background: instructions are
+    packed into as few transactions as fit and the matching registry
+    reputation updates are committed together, so the caller never waits
+    on validation writes. Each one is also appended to the receipt ledger.
     """
-    print(f"\n📝 Recording validation on Solana blockchain...")
+    print(f"\n📝 Queueing validation for Solana blockchain...")
     print(f"   Seller: {seller_pubkey}")
     print(f"   Success: {success}")
     print(f"   Buyer: {buyer_keypair.pubkey()}")
     
-    # Real implementation would:
-    # 1. Build Anchor instruction for record_validation
-    # 2. Create transaction with instruction
-    # 3. Sign with buyer keypair
-    # 4. Send to Solana
-    # 5. Update Professional Agent Registry
-    print(f"📝 Updating professional agent registry...")
-    
-    # Find agent by pubkey/wallet
-    all_agents = agent_manager.get_all_agents()
-    agent_id = None
-    
-    for agent in all_agents:
-        if agent.get('pubkey') == seller_pubkey or agent.get('wallet') == seller_pubkey:
-            agent_id = agent.get('agent_id')
-            break
-    
-    if agent_id:
-        agent_manager.update_agent_reputation(agent_id, success)
-        print(f"✅ Updated reputation for {agent_id}")
-    else:
-        print(f"⚠️ Agent not found in registry: {seller_pubkey[:8]}")
-    
-    # Return validation ID (not blockchain tx since program not deployed)
-    validation_id = f"Validation_{seller_pubkey[:8]}_{success}_{int(asyncio.get_event_loop().time())}"
-    print(f"✅ Validation recorded: {validation_id}")
+    validation_id = validation_queue.enqueue(seller_pubkey, success, buyer_keypair, agent_id=agent_id)
+    receipt_ledger.record_validation(agent_id, service_type, success, validation_id)
+    print(f"✅ Validation queued: {validation_id}")
     
     return validation_id
 
+def summarize_results(final_results: Dict[str, Dict]) -> Dict[str, Dict]:
+    """Results for logging: service data replaced by its size, never re-serialised"""
+    return {
+        name: {
+            key: (f"<{result.get('service_data_bytes', 0)} bytes>" if key == "service_data" else value)
+            for key, value in result.items()
+        }
+        for name, result in final_results.items()
+    }
+
 # ----------------------------------------------------
 # 6. Main Orchestrator Logic (COMPLETE WITH REAL X402)
 # ----------------------------------------------------
 
-async def orchestrate_task(user_request: str):
+async def orchestrate_task(
+    user_request: str,
+    deadline_ms: Optional[float] = None,
+    stream_payload: bool = False
+):
     """
     Complete orchestration workflow with REAL x402 payments:
     
@@ -559,9 +1178,23 @@ async def orchestrate_task(user_request: str):
     5. Receive service data
     6. Record validation on-chain
     
+    With a `deadline_ms` budget (or ORCHESTRATION_DEADLINE_MS) every stage
+    derives its timeout from the time left; once it runs out the remaining
+    subtasks are skipped and the results so far are returned, marked with
+    `deadline_exceeded`.
+    
+    Each result holds its service data once, as `service_data` (parsed JSON,
+    or with `stream_payload` a spooled ServicePayload the caller must close)
+    plus its size in `service_data_bytes`.
+    
     This is the complete end-to-end implementation!
     """
-    solana_client = Client(SOLANA_CLUSTER)
+    orchestration_start = time.perf_counter()
+    deadline = Deadline(deadline_ms or ORCHESTRATION_DEADLINE_MS)
+    solana_client = metrics.instrument_rpc_client(
+        get_rpc_pool(SOLANA_RPC_URLS).client(timeout=max(0.1, deadline.remaining(RPC_TIMEOUT)))
+    )
+    wallet_pool = get_wallet_pool()
     print("\n" + "="*60)
     print("🤖 ORCHESTRATOR AGENT STARTED")
     print("   Mode: PRODUCTION (Real LLM + Real x402 + Real Solana)")
@@ -570,10 +1203,12 @@ async def orchestrate_task(user_request: str):
     # Step 1: Task decomposition using real LLM
     print("\n[STEP 1] Task Decomposition")
     print("-" * 60)
-    task_plan = llm_task_breakdown(user_request)
+    with metrics.span("decomposition"):
+        task_plan = llm_task_breakdown(user_request, timeout=deadline.remaining(LLM_TIMEOUT))
     
     if not task_plan:
         print("🛑 Failed to generate task plan. Aborting.")
+        metrics.ORCHESTRATIONS.inc("aborted")
         return
     
     final_results = {}
@@ -591,80 +1226,173 @@ async def orchestrate_task(user_request: str):
         print(f"   Budget: ${budget}")
         print(f"{'='*60}")
         
+        if deadline.expired():
+            print(f"⏱️ Deadline exceeded, skipping subtask")
+            final_results[task_name] = {
+                "success": False,
+                "service_type": service_type,
+                "budget_usd": budget,
+                "error": "Deadline exceeded",
+                "deadline_exceeded": True
+            }
+            metrics.SUBTASKS.inc(service_type, "", "deadline")
+            continue
+        
         # Step 3: Discover agents from Solana
         print(f"\n[STEP 3] Agent Discovery")
         print("-" * 60)
-        available_agents = query_reputation_program(solana_client, service_type)
+        with metrics.span("discovery", service_type):
+            available_agents = query_reputation_program(solana_client, service_type, timeout=deadline.remaining())
         
         if not available_agents:
             print(f"❌ No agents found for service type '{service_type}'")
-            final_results[task_name] = {"success": False, "error": "No agents available"}
+            final_results[task_name] = {
+                "success": False,
+                "service_type": service_type,
+                "budget_usd": budget,
+                "error": "No agents available"
+            }
+            metrics.SUBTASKS.inc(service_type, "", "no_agents")
             continue
         
-        # Step 4: Select best agent (highest reputation)
+        # Step 4: Rank agents (highest reputation first)
         print(f"\n[STEP 4] Agent Selection")
         print("-" * 60)
-        best_agent = max(available_agents, key=lambda x: x['reputation_score'])
+        with metrics.span("selection", service_type):
+            ranked_agents = sorted(available_agents, key=lambda x: x.reputation_score, reverse=True)
+        best_agent = ranked_agents[0]
         
         print(f"✅ SELECTED AGENT:")
-        print(f"   ID: {best_agent['agent_id']}")
-        print(f"   Reputation: {best_agent['reputation_score']}")
-        print(f"   Total Successful Txs: {best_agent['total_successful_txs']}")
-        print(f"   API URL: {best_agent['api_url']}")
+        print(f"   ID: {best_agent.agent_id}")
+        print(f"   Reputation: {best_agent.reputation_score}")
+        print(f"   Total Successful Txs: {best_agent.total_successful_txs}")
+        print(f"   API URL: {best_agent.api_url}")
         
         # Step 5: EXECUTE REAL X402 PAYMENT AND GET SERVICE
         print(f"\n[STEP 5] Execute x402 Payment & Service")
         print("-" * 60)
+        # Each payment is leased a pool wallet (least-loaded by default)
+        # that can cover its amount
         payment_result = await execute_x402_payment_and_service(
-            agent_url=best_agent['api_url'],
+            agent_url=best_agent.api_url,
             budget_usd=budget,
-            buyer_keypair=ORCHESTRATOR_WALLET,
-            solana_client=solana_client
+            buyer_keypair=None,
+            solana_client=solana_client,
+            service_type=service_type,
+            agent_id=best_agent.agent_id,
+            candidates=ranked_agents,
+            deadline=deadline,
+            stream_payload=stream_payload
         )
         
+        # Hedging and failover may have served the subtask from another
+        # candidate; None when our deadline ran out with no agent at fault
+        best_agent = payment_result["agent"]
+        agent_id = best_agent.agent_id if best_agent is not None else None
+        paid_by_agent = {p["agent"].agent_id: p for p in payment_result["payments"]}
+        
+        def validation_signer(agent: AgentRecord) -> Keypair:
+            """The wallet that paid this agent (the primary wallet if none did)"""
+            payment = paid_by_agent.get(agent.agent_id)
+            return payment["payer"] if payment is not None else wallet_pool.primary
+        failovers = [
+            {
+                "agent": failed_agent.agent_id,
+                "error": error,
+                "payment_tx": paid_by_agent.get(failed_agent.agent_id, {}).get("payment_tx")
+            }
+            for failed_agent, error in payment_result["failures"]
+        ]
+        for payment in payment_result["payments"]:
+            metrics.LAMPORTS_PAID.inc(
+                service_type, payment["agent"].agent_id,
+                amount=int(payment["amount_paid_sol"] * LAMPORTS_PER_SOL)
+            )
+        
         # Step 6: Record validation on Solana
         print(f"\n[STEP 6] Record Validation On-Chain")
         print("-" * 60)
+        for failed_agent, error in payment_result["failures"]:
+            if failed_agent is best_agent:
+                continue
+            print(f"⚠️ {failed_agent.agent_id} failed: {error}")
+            with metrics.span("validation", service_type, failed_agent.agent_id):
+                record_validation_on_chain(
+                    solana_client,
+                    failed_agent.seller_key,
+                    success=False,
+                    buyer_keypair=validation_signer(failed_agent),
+                    agent_id=failed_agent.agent_id,
+                    service_type=service_type
+                )
+        
         if payment_result["success"]:
-            validation_tx = record_validation_on_chain(
-                solana_client,
-                best_agent.get('pubkey') or best_agent.get('wallet'),
-                success=True,
-                buyer_keypair=ORCHESTRATOR_WALLET
-            )
+            with metrics.span("validation", service_type, agent_id):
+                validation_tx = record_validation_on_chain(
+                    solana_client,
+                    best_agent.seller_key,
+                    success=True,
+                    buyer_keypair=validation_signer(best_agent),
+                    agent_id=agent_id,
+                    service_type=service_type
+                )
+            metrics.SUBTASKS.inc(service_type, agent_id, "success")
             
             final_results[task_name] = {
                 "success": True,
-                "agent": best_agent['agent_id'],
-                "reputation": best_agent['reputation_score'],
+                "service_type": service_type,
+                "budget_usd": budget,
+                "agent": best_agent.agent_id,
+                "reputation": best_agent.reputation_score,
                 "payment_tx": payment_result.get("payment_tx"),
                 "amount_paid_sol": payment_result.get("amount_paid_sol"),
                 "validation_tx": validation_tx,
-                "service_data": payment_result.get("data")
+                "failovers": failovers,
+                "service_data": payment_result.get("data"),
+                "service_data_bytes": payment_result.get("data_bytes", 0)
             }
             print(f"✅ Task completed successfully!")
         else:
-            validation_tx = record_validation_on_chain(
-                solana_client,
-                best_agent.get('pubkey') or best_agent.get('wallet'),
-                success=False,
-                buyer_keypair=ORCHESTRATOR_WALLET
-            )
+            validation_tx = None
+            if best_agent is not None:
+                with metrics.span("validation", service_type, agent_id):
+                    validation_tx = record_validation_on_chain(
+                        solana_client,
+                        best_agent.seller_key,
+                        success=False,
+                        buyer_keypair=validation_signer(best_agent),
+                        agent_id=agent_id,
+                        service_type=service_type
+                    )
+            metrics.SUBTASKS.inc(service_type, agent_id or "", "failure")
             
             final_results[task_name] = {
                 "success": False,
-                "agent": best_agent['agent_id'],
+                "service_type": service_type,
+                "budget_usd": budget,
+                "agent": agent_id,
                 "error": payment_result.get("error"),
-                "validation_tx": validation_tx
+                "validation_tx": validation_tx,
+                "failovers": failovers,
+                "deadline_exceeded": payment_result["deadline_exceeded"]
             }
             print(f"❌ Task failed")
     
+    any_success = any(r.get("success") for r in final_results.values())
+    if any_success:
+        metrics.ORCHESTRATIONS.inc("success")
+    elif any(r.get("deadline_exceeded") for r in final_results.values()):
+        metrics.ORCHESTRATIONS.inc("deadline")
+    else:
+        metrics.ORCHESTRATIONS.inc("failure")
+    metrics.STAGE_DURATION.observe(time.perf_counter() - orchestration_start, "orchestration", "", "")
+    
     # Final summary
     print(f"\n{'='*60}")
     print("✅ ORCHESTRATION COMPLETED")
     print(f"{'='*60}")
     print(f"\n📊 Final Results:")
-    print(json.dumps(final_results, indent=2))
+    print(json.dumps(summarize_results(final_results), indent=2))
     
     return final_results
 
@@ -685,5 +1413,11 @@ if __name__ == "__main__":
     print("   Complete x402 Payment Integration Demo")
     print("="*60)
     
-    # Run orchestrator with complete x402 flow
-    asyncio.run(orchestrate_task(user_query))
+    async def run_demo():
+        funding_task = await startup()
+        if funding_task is not None:
+            await funding_task
+        # Run orchestrator with complete x402 flow
+        await orchestrate_task(user_query)
+    
+    asyncio.run(run_demo())
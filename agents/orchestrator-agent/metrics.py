@@ -0,0 +1,377 @@
+"""
+Lightweight Orchestrator Metrics
+Low-overhead counters, histograms and timing spans, rendered in the
+Prometheus text exposition format for the /metrics endpoint.
+"""
+import threading
+from contextvars import ContextVar
+from bisect import bisect_left
+from time import perf_counter
+from typing import Dict, List, Tuple, Sequence, Optional
+
+# Default latency buckets (seconds): sub-millisecond local work up to
+# multi-second RPC confirmations and service calls
+DEFAULT_BUCKETS = (
+    0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1,
+    0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0
+)
+
+
+def _format_labels(labelnames: Sequence[str], values: Sequence[str], extra: str = "") -> str:
+    parts = []
+    for name, value in zip(labelnames, values):
+        value = str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+        parts.append(f'{name}="{value}"')
+    if extra:
+        parts.append(extra)
+    return "{" + ",".join(parts) + "}" if parts else ""
+
+
+def _format_value(value: float) -> str:
+    if isinstance(value, int) or float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
+
+
+class Counter:
+    """Monotonic counter keyed by label values"""
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._values: Dict[Tuple[str, ...], float] = {}
+        self._lock = threading.Lock()
+
+    def inc(self, *labelvalues: str, amount: float = 1):
+        with self._lock:
+            self._values[labelvalues] = self._values.get(labelvalues, 0) + amount
+
+    def get(self, *labelvalues: str) -> float:
+        return self._values.get(labelvalues, 0)
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} counter"]
+        with self._lock:
+            items = sorted(self._values.items())
+        for labelvalues, value in items:
+            lines.append(f"{self.name}{_format_labels(self.labelnames, labelvalues)} {_format_value(value)}")
+        return lines
+
+
+class Gauge:
+    """Point-in-time value keyed by label values"""
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._values: Dict[Tuple[str, ...], float] = {}
+        self._lock = threading.Lock()
+
+    def set(self, value: float, *labelvalues: str):
+        with self._lock:
+            self._values[labelvalues] = value
+
+    def inc(self, *labelvalues: str, amount: float = 1):
+        with self._lock:
+            self._values[labelvalues] = self._values.get(labelvalues, 0) + amount
+
+    def dec(self, *labelvalues: str, amount: float = 1):
+        self.inc(*labelvalues, amount=-amount)
+
+    def get(self, *labelvalues: str) -> float:
+        return self._values.get(labelvalues, 0)
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} gauge"]
+        with self._lock:
+            items = sorted(self._values.items())
+        for labelvalues, value in items:
+            lines.append(f"{self.name}{_format_labels(self.labelnames, labelvalues)} {_format_value(value)}")
+        return lines
+
+
+class Histogram:
+    """Fixed-bucket histogram keyed by label values"""
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: Sequence[str] = (),
+        buckets: Sequence[float] = DEFAULT_BUCKETS
+    ):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(sorted(buckets))
+        # labelvalues -> [bucket counts..., +Inf count, sum]
+        self._series: Dict[Tuple[str, ...], List[float]] = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value: float, *labelvalues: str):
+        index = bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(labelvalues)
+            if series is None:
+                series = self._series[labelvalues] = [0] * (len(self.buckets) + 2)
+            series[index] += 1
+            series[-1] += value
+
+    def time(self, *labelvalues: str) -> "Span":
+        """Context manager observing the elapsed time of its block"""
+        return Span(self, labelvalues)
+
+    def count(self, *labelvalues: str) -> int:
+        series = self._series.get(labelvalues)
+        return int(sum(series[:-1])) if series else 0
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            items = sorted((k, list(v)) for k, v in self._series.items())
+        for labelvalues, series in items:
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets, series):
+                cumulative += bucket_count
+                le = _format_labels(self.labelnames, labelvalues, f'le="{bound}"')
+                lines.append(f"{self.name}_bucket{le} {cumulative}")
+            cumulative += series[len(self.buckets)]
+            le = _format_labels(self.labelnames, labelvalues, 'le="+Inf"')
+            lines.append(f"{self.name}_bucket{le} {cumulative}")
+            labels = _format_labels(self.labelnames, labelvalues)
+            lines.append(f"{self.name}_sum{labels} {_format_value(series[-1])}")
+            lines.append(f"{self.name}_count{labels} {cumulative}")
+        return lines
+
+
+class Span:
+    """Times a block with perf_counter and feeds the result into a histogram"""
+    __slots__ = ("_histogram", "_labelvalues", "_errors", "_start")
+
+    def __init__(self, histogram: Histogram, labelvalues: Tuple[str, ...], errors: "Counter" = None):
+        self._histogram = histogram
+        self._labelvalues = labelvalues
+        self._errors = errors
+        self._start = 0.0
+
+    def __enter__(self):
+        self._start = perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        # Abandoned blocks (task cancellation, interpreter exit) are not timed
+        if exc_type is not None and not issubclass(exc_type, Exception):
+            return False
+        elapsed = perf_counter() - self._start
+        self._histogram.observe(elapsed, *self._labelvalues)
+        if self._errors is not None:
+            if exc_type is not None:
+                self._errors.inc(self._labelvalues[0])
+            timings = _stage_timings.get()
+            if timings is not None:
+                timings.append(self._labelvalues + (elapsed,))
+        return False
+
+
+class MetricsRegistry:
+    def __init__(self):
+        self._metrics = []
+
+    def register(self, metric):
+        self._metrics.append(metric)
+        return metric
+
+    def render(self) -> str:
+        lines = []
+        for metric in self._metrics:
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+
+# Per-orchestration stage timings, collected only where explicitly enabled
+_stage_timings: ContextVar[Optional[List[Tuple[str, str, str, float]]]] = ContextVar(
+    "stage_timings", default=None
+)
+
+
+def collect_stage_timings() -> List[Tuple[str, str, str, float]]:
+    """
+    Record every stage span in the current context (and tasks it spawns)
+    into the returned list as (stage, service_type, agent, seconds).
+    """
+    timings = []
+    _stage_timings.set(timings)
+    return timings
+
+
+# ----------------------------------------------------
+# Orchestrator Metrics
+# ----------------------------------------------------
+
+registry = MetricsRegistry()
+
+STAGE_DURATION = registry.register(Histogram(
+    "xgov_stage_duration_seconds",
+    "Time spent in each orchestration stage",
+    ("stage", "service_type", "agent")
+))
+STAGE_ERRORS = registry.register(Counter(
+    "xgov_stage_errors_total",
+    "Orchestration stages that raised an exception",
+    ("stage",)
+))
+ORCHESTRATIONS = registry.register(Counter(
+    "xgov_orchestrations_total",
+    "Completed orchestrations by outcome",
+    ("outcome",)
+))
+SUBTASKS = registry.register(Counter(
+    "xgov_subtasks_total",
+    "Processed subtasks by service type, agent and outcome",
+    ("service_type", "agent", "outcome")
+))
+LAMPORTS_PAID = registry.register(Counter(
+    "xgov_lamports_paid_total",
+    "Lamports paid to service agents",
+    ("service_type", "agent")
+))
+PROBES = registry.register(Counter(
+    "xgov_probes_total",
+    "Unpaid 402 probes by outcome (won/failed/cancelled, deadline when the orchestration deadline cut them short, or cached when known terms skipped the probe)",
+    ("service_type", "outcome")
+))
+FAILOVERS = registry.register(Counter(
+    "xgov_failovers_total",
+    "Subtasks moved on to the next-ranked agent, by reason (probe_failed/service_failed)",
+    ("service_type", "reason")
+))
+ADMISSION_QUEUE_DEPTH = registry.register(Gauge(
+    "xgov_admission_queue_depth",
+    "Orchestrations waiting for a worker slot"
+))
+ADMISSION_IN_FLIGHT = registry.register(Gauge(
+    "xgov_admission_in_flight",
+    "Orchestrations currently running"
+))
+ADMISSION_WAIT = registry.register(Histogram(
+    "xgov_admission_wait_seconds",
+    "Time orchestrations spent queued before admission (or before timing out)"
+))
+ADMISSION_REJECTIONS = registry.register(Counter(
+    "xgov_admission_rejections_total",
+    "Orchestrations rejected by admission control, by reason",
+    ("reason",)
+))
+WALLET_BALANCE = registry.register(Gauge(
+    "xgov_wallet_balance_lamports",
+    "Tracked balance of each orchestrator pool wallet",
+    ("wallet",)
+))
+WALLET_IN_FLIGHT = registry.register(Gauge(
+    "xgov_wallet_in_flight",
+    "Subtasks currently assigned to each orchestrator pool wallet",
+    ("wallet",)
+))
+WALLET_TOP_UPS = registry.register(Counter(
+    "xgov_wallet_top_ups_total",
+    "Pool wallets topped up from the treasury"
+))
+RPC_CALLS = registry.register(Counter(
+    "xgov_rpc_calls_total",
+    "Solana JSON-RPC calls by method and outcome",
+    ("method", "outcome")
+))
+RPC_DURATION = registry.register(Histogram(
+    "xgov_rpc_duration_seconds",
+    "Solana JSON-RPC call latency",
+    ("method",)
+))
+RPC_ENDPOINT_REQUESTS = registry.register(Counter(
+    "xgov_rpc_endpoint_requests_total",
+    "HTTP requests per pooled RPC endpoint by outcome (ok/rate_limited/error)",
+    ("endpoint", "outcome")
+))
+RPC_ENDPOINT_LATENCY = registry.register(Gauge(
+    "xgov_rpc_endpoint_latency_seconds",
+    "Smoothed (EWMA) request latency per pooled RPC endpoint",
+    ("endpoint",)
+))
+RPC_BATCH_SIZE = registry.register(Histogram(
+    "xgov_rpc_batch_size",
+    "RPC calls sent per HTTP request by the RPC pool",
+    buckets=(1, 2, 4, 8, 16, 32)
+))
+HTTP_REQUESTS = registry.register(Counter(
+    "xgov_http_requests_total",
+    "API requests by endpoint and status code",
+    ("endpoint", "status")
+))
+HTTP_DURATION = registry.register(Histogram(
+    "xgov_http_request_duration_seconds",
+    "API request latency by endpoint",
+    ("endpoint",)
+))
+REGISTRY_STATS_DRIFT = registry.register(Counter(
+    "xgov_registry_stats_drift_total",
+    "Periodic full recomputes that found the incremental registry stats had drifted"
+))
+PLANS = registry.register(Counter(
+    "xgov_plans_total",
+    "Task plans by source (local/cache/llm/fallback); local / total is the local planner hit ratio",
+    ("source",)
+))
+CACHE_REQUESTS = registry.register(Counter(
+    "xgov_cache_requests_total",
+    "Cache lookups by cache name and result (hit/miss)",
+    ("cache", "result")
+))
+
+
+def span(stage: str, service_type: str = "", agent: str = "") -> Span:
+    """Time an orchestration stage: `with metrics.span("discovery", service_type): ...`"""
+    return Span(STAGE_DURATION, (stage, service_type, agent), STAGE_ERRORS)
+
+
+def record_cache(cache: str, hit: bool):
+    """Count a cache lookup; hit rate = hit / (hit + miss)"""
+    CACHE_REQUESTS.inc(cache, "hit" if hit else "miss")
+
+
+def render() -> str:
+    """Render all metrics in the Prometheus text exposition format"""
+    return registry.render()
+
+
+class InstrumentedRPCClient:
+    """Wraps a solana Client, counting and timing every RPC method call"""
+
+    def __init__(self, client):
+        self._client = client
+
+    def __getattr__(self, name):
+        attr = getattr(self._client, name)
+        if not callable(attr) or name.startswith("_"):
+            return attr
+
+        def call(*args, **kwargs):
+            start = perf_counter()
+            try:
+                result = attr(*args, **kwargs)
+            except Exception:
+                RPC_CALLS.inc(name, "error")
+                raise
+            finally:
+                RPC_DURATION.observe(perf_counter() - start, name)
+            RPC_CALLS.inc(name, "ok")
+            return result
+
+        return call
+
+
+def instrument_rpc_client(client) -> InstrumentedRPCClient:
+    """Count and time all RPC calls made through client"""
+    if isinstance(client, InstrumentedRPCClient):
+        return client
+    return InstrumentedRPCClient(client)
@@ -0,0 +1,95 @@
+"""
+Payment Transaction Builder
+Builds the signed SOL transfer for an x402 payment as raw wire bytes:
+- The transfer message for each (payer, recipient) pair is compiled once
+  with solders; later payments copy it and patch in the lamports and
+  recent blockhash, which sit at fixed offsets of the legacy message
+- The message is signed once with the payer's keypair, and the bytes go
+  straight to send_raw_transaction
+The result is byte-for-byte what solders.transaction.Transaction produces
+for the same transfer.
+"""
+import os
+import struct
+import threading
+from typing import Dict, Tuple, TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from solders.hash import Hash
+    from solders.keypair import Keypair
+    from solders.pubkey import Pubkey
+    from solders.signature import Signature
+
+PAYMENT_TEMPLATE_CACHE_SIZE = int(os.getenv("PAYMENT_TEMPLATE_CACHE_SIZE", "4096"))
+
+_LAMPORTS = struct.Struct("<Q")
+# Wire prefix of a transaction with one signature (compact-u16 count of 1)
+_ONE_SIGNATURE = b"\x01"
+
+
+class TransferTemplate:
+    """Compiled transfer message for one (payer, recipient) pair"""
+
+    __slots__ = ("message", "blockhash_offset", "lamports_offset")
+
+    def __init__(self, payer: "Pubkey", recipient: "Pubkey"):
+        from solders.hash import Hash
+        from solders.message import Message
+        from solders.system_program import TransferParams, transfer
+
+        # Compiled with sentinel values so the patch offsets can be checked
+        sentinel_lamports = 0x0102030405060708
+        sentinel_blockhash = Hash(bytes(range(1, 33)))
+        message = bytes(Message.new_with_blockhash(
+            [transfer(TransferParams(from_pubkey=payer, to_pubkey=recipient, lamports=sentinel_lamports))],
+            payer,
+            sentinel_blockhash
+        ))
+        # Legacy layout: 3-byte header, account count, account keys,
+        # blockhash, instructions; the transfer data ends with the lamports
+        self.blockhash_offset = message.index(bytes(sentinel_blockhash))
+        self.lamports_offset = len(message) - _LAMPORTS.size
+        if message[self.lamports_offset:] != _LAMPORTS.pack(sentinel_lamports):
+            raise ValueError("Unexpected transfer message layout")
+        self.message = message
+
+    def message_bytes(self, lamports: int, blockhash: "Hash") -> bytes:
+        message = bytearray(self.message)
+        message[self.blockhash_offset:self.blockhash_offset + 32] = bytes(blockhash)
+        _LAMPORTS.pack_into(message, self.lamports_offset, lamports)
+        return bytes(message)
+
+
+class PaymentBuilder:
+    """Signed transfer transactions from per-(payer, recipient) templates"""
+
+    def __init__(self, max_templates: int = None):
+        self.max_templates = max_templates if max_templates is not None else PAYMENT_TEMPLATE_CACHE_SIZE
+        self._templates: Dict[Tuple["Pubkey", "Pubkey"], TransferTemplate] = {}
+        self._lock = threading.Lock()
+
+    def template(self, payer: "Pubkey", recipient: "Pubkey") -> TransferTemplate:
+        key = (payer, recipient)
+        template = self._templates.get(key)
+        if template is None:
+            template = TransferTemplate(payer, recipient)
+            with self._lock:
+                if len(self._templates) >= self.max_templates:
+                    self._templates.clear()
+                self._templates[key] = template
+        return template
+
+    def build(
+        self,
+        payer: "Keypair",
+        recipient: "Pubkey",
+        lamports: int,
+        blockhash: "Hash"
+    ) -> Tuple[bytes, "Signature"]:
+        """Raw signed transfer of `lamports` from payer to recipient, and its signature"""
+        message = self.template(payer.pubkey(), recipient).message_bytes(lamports, blockhash)
+        signature = payer.sign_message(message)
+        return _ONE_SIGNATURE + bytes(signature) + message, signature
+
+
+payment_builder = PaymentBuilder()
@@ -0,0 +1,207 @@
+"""
+On-Demand Sampling Profiler
+Statistical stack sampler for the orchestrator server:
+- Samples every thread plus suspended asyncio tasks on running loops
+- Emits collapsed stacks (flamegraph.pl / speedscope ready)
+- Costs nothing unless a capture is running
+"""
+import asyncio
+import itertools
+import os
+import sys
+import threading
+import time
+from collections import Counter, OrderedDict
+from typing import Dict, List, Optional, Iterable
+
+DEFAULT_INTERVAL = 0.005
+MAX_CAPTURE_SECONDS = 60.0
+
+# Slow-orchestration profiling (disabled unless a threshold is configured)
+SLOW_ORCHESTRATION_MS = float(os.getenv("PROFILE_SLOW_ORCHESTRATION_MS", "0") or 0)
+MAX_SLOW_PROFILES = int(os.getenv("PROFILE_SLOW_MAX_KEPT", "20"))
+
+
+def _frame_label(frame) -> str:
+    code = frame.f_code
+    return f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})"
+
+
+def _collapse(root: str, frames: Iterable) -> str:
+    """frames must be ordered outermost first"""
+    return ";".join([root] + [_frame_label(f) for f in frames])
+
+
+def _thread_stack(frame) -> List:
+    stack = []
+    while frame is not None:
+        stack.append(frame)
+        frame = frame.f_back
+    stack.reverse()
+    return stack
+
+
+def _running_loops(frames: Dict[int, object]) -> List[asyncio.AbstractEventLoop]:
+    """Find event loops currently running on any thread by inspecting their stacks"""
+    loops = []
+    for frame in frames.values():
+        while frame is not None:
+            if frame.f_code.co_name == "_run_once":
+                loop = frame.f_locals.get("self")
+                if isinstance(loop, asyncio.AbstractEventLoop):
+                    loops.append(loop)
+                break
+            frame = frame.f_back
+    return loops
+
+
+class StackSampler:
+    """Samples stacks on a background thread until stopped"""
+
+    def __init__(
+        self,
+        interval: float = DEFAULT_INTERVAL,
+        thread_ids: Optional[Iterable[int]] = None,
+        include_tasks: bool = True
+    ):
+        self.interval = interval
+        self.thread_ids = set(thread_ids) if thread_ids is not None else None
+        self.include_tasks = include_tasks
+        self.samples: Counter = Counter()
+        self.sample_count = 0
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self.started_at = None
+        self.duration = 0.0
+
+    def start(self) -> "StackSampler":
+        self.started_at = time.time()
+        self._thread = threading.Thread(target=self._run, name="stack-sampler", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self) -> "StackSampler":
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+        self.duration = time.time() - self.started_at
+        return self
+
+    def _run(self):
+        own_ident = threading.get_ident()
+        names = {}
+
+        while not self._stop.wait(self.interval):
+            frames = sys._current_frames()
+            frames.pop(own_ident, None)
+            if self.thread_ids is not None:
+                frames = {tid: f for tid, f in frames.items() if tid in self.thread_ids}
+
+            if len(names) != threading.active_count():
+                names = {t.ident: t.name for t in threading.enumerate()}
+
+            for tid, frame in frames.items():
+                root = f"thread:{names.get(tid, tid)}"
+                self.samples[_collapse(root, _thread_stack(frame))] += 1
+
+            if self.include_tasks:
+                self._sample_tasks(frames)
+
+            self.sample_count += 1
+
+    def _sample_tasks(self, frames: Dict[int, object]):
+        for loop in _running_loops(frames):
+            try:
+                tasks = asyncio.all_tasks(loop)
+                running = asyncio.current_task(loop)
+            except RuntimeError:
+                continue
+            for task in tasks:
+                # The running task is already visible in its thread's stack
+                if task is running or task.done():
+                    continue
+                stack = task.get_stack()
+                if stack:
+                    self.samples[_collapse(f"task:{task.get_name()}", stack)] += 1
+
+    def collapsed(self) -> str:
+        """Render samples in collapsed-stack format: `frame;frame;frame count`"""
+        return "".join(f"{stack} {count}\n" for stack, count in self.samples.most_common())
+
+
+# ----------------------------------------------------
+# Process-wide capture (one at a time)
+# ----------------------------------------------------
+
+_capture_lock = threading.Lock()
+
+
+def capture(seconds: float, interval: float = DEFAULT_INTERVAL) -> Optional[StackSampler]:
+    """
+    Profile the whole process for `seconds`.
+
+    Returns None if another capture is already running.
+    """
+    seconds = max(0.1, min(seconds, MAX_CAPTURE_SECONDS))
+    if not _capture_lock.acquire(blocking=False):
+        return None
+    try:
+        sampler = StackSampler(interval=interval).start()
+        time.sleep(seconds)
+        return sampler.stop()
+    finally:
+        _capture_lock.release()
+
+
+# ----------------------------------------------------
+# Per-request profiles for slow orchestrations
+# ----------------------------------------------------
+
+_slow_profiles: "OrderedDict[str, Dict]" = OrderedDict()
+_slow_lock = threading.Lock()
+_profile_ids = itertools.count(1)
+
+
+def slow_profiling_enabled() -> bool:
+    return SLOW_ORCHESTRATION_MS > 0
+
+
+def start_request_profile() -> StackSampler:
+    """Sample only the calling thread (and the asyncio tasks it runs)"""
+    return StackSampler(thread_ids=[threading.get_ident()]).start()
+
+
+def finish_request_profile(sampler: StackSampler, elapsed_ms: float, label: str = "") -> Optional[str]:
+    """Stop a request profile; keep it only if the request was slow. Returns its id."""
+    sampler.stop()
+    if elapsed_ms < SLOW_ORCHESTRATION_MS:
+        return None
+
+    profile_id = f"slow-{int(time.time())}-{next(_profile_ids)}"
+    with _slow_lock:
+        _slow_profiles[profile_id] = {
+            "profile_id": profile_id,
+            "label": label,
+            "elapsed_ms": round(elapsed_ms, 1),
+            "captured_at": sampler.started_at,
+            "samples": sampler.sample_count,
+            "collapsed": sampler.collapsed()
+        }
+        while len(_slow_profiles) > MAX_SLOW_PROFILES:
+            _slow_profiles.popitem(last=False)
+
+    print(f"🐢 Slow orchestration ({elapsed_ms:.0f}ms) profiled: {profile_id}")
+    return profile_id
+
+
+def get_slow_profile(profile_id: str) -> Optional[Dict]:
+    with _slow_lock:
+        return _slow_profiles.get(profile_id)
+
+
+def list_slow_profiles() -> List[Dict]:
+    with _slow_lock:
+        return [
+            {k: v for k, v in p.items() if k != "collapsed"}
+            for p in reversed(_slow_profiles.values())
+        ]
@@ -0,0 +1,589 @@
+"""
+Receipt Ledger
+Append-only local record of every x402 payment and service validation
+(agent, service type, success, lamports, latency, transaction signature
+or validation id), queryable for spend and success analytics:
+- Receipts are buffered on the request path and written in batches by a
+  background thread
+- The log is segmented by time: one SQLite file (WAL) per
+  RECEIPT_SEGMENT_SECONDS window (one UTC day by default) under
+  RECEIPT_LEDGER_DIR (unset disables the ledger); segments past
+  RECEIPT_RETENTION_DAYS (30 by default) are deleted whole
+- Each segment indexes receipts by timestamp, agent and service type, and
+  keeps rollups per day, hour and minute (count, successes, lamports,
+  latency sum/max) per (kind, agent, service type) and per (kind, service
+  type) across all agents, updated in the same transaction as the
+  inserts; queries not about agents read the few all-agent rows
+- A segment's WAL is checkpointed into its file once a newer segment
+  starts, leaving one file per closed segment
+- aggregate() splits a window into the coarsest aligned rollup ranges it
+  contains and reads raw receipts only for the partial minutes at its
+  edges, so results are exact and take milliseconds over millions of
+  receipts
+- Queries read what the writer has committed (at most
+  RECEIPT_FLUSH_INTERVAL behind); receipts() pages with an opaque
+  (ts, id) keyset cursor, so receipts sharing a timestamp are not skipped
+Worker processes share the segment files like the shared store (one
+connection per thread, reopened after fork).
+"""
+import base64
+import json
+import math
+import os
+import re
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime, timezone
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+KINDS = ("payment", "validation")
+GROUP_BY = {"agent": "agent_id", "service_type": "service_type", "kind": "kind"}
+LAMPORTS_PER_SOL = 1_000_000_000
+
+# agent_id of the rollup rows that cover all agents
+ALL_AGENTS = "*"
+
+# Rollup granularities in seconds, coarsest first
+ROLLUP_LEVELS = (86400, 3600, 60)
+
+# Open segment connections kept per thread
+MAX_OPEN_SEGMENTS = 64
+
+# Most time buckets one aggregate() may return
+RECEIPT_MAX_BUCKETS = int(os.getenv("RECEIPT_MAX_BUCKETS", "10000"))
+
+_SEGMENT_FILE = re.compile(r"^receipts-(\d{8}T\d{6})Z\.db$")
+_DURATION = re.compile(r"^(\d+(?:\.\d+)?)([smhdw]?)$")
+_DURATION_UNITS = {"": 1, "s": 1, "m": 60, "h": 3600, "d": 86400, "w": 604800}
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS receipts (
+    id INTEGER PRIMARY KEY,
+    ts REAL NOT NULL,
+    kind TEXT NOT NULL,
+    agent_id TEXT NOT NULL,
+    service_type TEXT NOT NULL,
+    success INTEGER NOT NULL,
+    lamports INTEGER NOT NULL,
+    latency_ms REAL,
+    ref TEXT
+);
+CREATE INDEX IF NOT EXISTS receipts_ts ON receipts (ts);
+CREATE INDEX IF NOT EXISTS receipts_agent ON receipts (agent_id, ts);
+CREATE INDEX IF NOT EXISTS receipts_service_type ON receipts (service_type, ts);
+CREATE TABLE IF NOT EXISTS rollup (
+    level INTEGER NOT NULL,
+    start INTEGER NOT NULL,
+    kind TEXT NOT NULL,
+    agent_id TEXT NOT NULL,
+    service_type TEXT NOT NULL,
+    count INTEGER NOT NULL,
+    successes INTEGER NOT NULL,
+    lamports INTEGER NOT NULL,
+    latency_count INTEGER NOT NULL,
+    latency_sum REAL NOT NULL,
+    latency_max REAL,
+    PRIMARY KEY (level, start, kind, agent_id, service_type)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS rollup_agent ON rollup (agent_id, level, start);
+CREATE INDEX IF NOT EXISTS rollup_service_type ON rollup (service_type, level, start);
+"""
+
+_UPSERT_ROLLUP = """
+INSERT INTO rollup (level, start, kind, agent_id, service_type, count, successes, lamports,
+                    latency_count, latency_sum, latency_max)
+VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+ON CONFLICT (level, start, kind, agent_id, service_type) DO UPDATE SET
+    count = count + excluded.count,
+    successes = successes + excluded.successes,
+    lamports = lamports + excluded.lamports,
+    latency_count = latency_count + excluded.latency_count,
+    latency_sum = latency_sum + excluded.latency_sum,
+    latency_max = MAX(COALESCE(latency_max, excluded.latency_max), COALESCE(excluded.latency_max, latency_max))
+"""
+
+_RECEIPT_COLUMNS = ("ts", "kind", "agent_id", "service_type", "success", "lamports", "latency_ms", "ref")
+
+# Counter order in aggregated rows
+COUNT, SUCCESSES, LAMPORTS, LATENCY_COUNT, LATENCY_SUM, LATENCY_MAX = range(6)
+
+
+def parse_duration(value: str) -> float:
+    """Seconds from '90', '15m', '24h', '7d' or '2w'; raises ValueError"""
+    match = _DURATION.match(str(value).strip().lower())
+    if not match:
+        raise ValueError(f"Invalid duration '{value}' (e.g. 900, 15m, 24h, 7d)")
+    return float(match.group(1)) * _DURATION_UNITS[match.group(2)]
+
+
+def encode_cursor(ts: float, receipt_id: int) -> str:
+    """Opaque receipts() cursor: the (ts, id) of the last receipt returned"""
+    return base64.urlsafe_b64encode(json.dumps([ts, receipt_id]).encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> Tuple[float, int]:
+    """(ts, id) from a cursor; ValueError if it is malformed"""
+    try:
+        ts, receipt_id = json.loads(base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)))
+    except Exception:
+        raise ValueError("Malformed cursor")
+    if isinstance(ts, bool) or not isinstance(ts, (int, float)) or isinstance(receipt_id, bool) or not isinstance(receipt_id, int):
+        raise ValueError("Malformed cursor")
+    return float(ts), receipt_id
+
+
+def _window_pieces(since: float, until: float, levels: Tuple[int, ...]) -> Iterator[Tuple[int, float, float]]:
+    """Split [since, until) into aligned (level, lo, hi) rollup ranges; level 0 = raw receipts"""
+    if since >= until:
+        return
+    if not levels:
+        yield 0, since, until
+        return
+    level = levels[0]
+    lo = math.ceil(since / level) * level
+    hi = math.floor(until / level) * level
+    if lo >= hi:
+        yield from _window_pieces(since, until, levels[1:])
+        return
+    yield from _window_pieces(since, lo, levels[1:])
+    yield level, lo, hi
+    yield from _window_pieces(hi, until, levels[1:])
+
+
+class ReceiptLedger:
+    """Time-segmented SQLite receipt log with rollups; safe across threads and forked workers"""
+
+    def __init__(
+        self,
+        directory: Optional[str],
+        segment_seconds: int = None,
+        retention_days: float = None,
+        flush_interval: float = None,
+        batch_size: int = None,
+        busy_timeout_ms: int = None
+    ):
+        self.directory = directory or None
+        self.segment_seconds = segment_seconds if segment_seconds is not None else int(
+            os.getenv("RECEIPT_SEGMENT_SECONDS", "86400")
+        )
+        self.retention_days = retention_days if retention_days is not None else float(
+            os.getenv("RECEIPT_RETENTION_DAYS", "30")
+        )
+        self.flush_interval = flush_interval if flush_interval is not None else float(
+            os.getenv("RECEIPT_FLUSH_INTERVAL", "0.5")
+        )
+        self.batch_size = batch_size if batch_size is not None else int(
+            os.getenv("RECEIPT_BATCH_SIZE", "256")
+        )
+        self.busy_timeout_ms = busy_timeout_ms if busy_timeout_ms is not None else int(
+            os.getenv("SHARED_STORE_BUSY_TIMEOUT_MS", "5000")
+        )
+
+        self._pending: List[Tuple] = []
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._stopped = threading.Event()
+        self._worker: Optional[threading.Thread] = None
+        self._local = threading.local()
+        self._ready_segments = set()
+        self._newest_segment = None
+
+    @property
+    def enabled(self) -> bool:
+        return self.directory is not None
+
+    # ------------------------------------------------
+    # Producer side (request path)
+    # ------------------------------------------------
+
+    def record_payment(
+        self,
+        agent_id: str,
+        service_type: str,
+        lamports: int,
+        success: bool,
+        latency_ms: float = None,
+        signature: str = None
+    ):
+        """A payment to an agent; success means the paid service was delivered"""
+        self.record("payment", agent_id, service_type, success, lamports, latency_ms, signature)
+
+    def record_validation(self, agent_id: str, service_type: str, success: bool, validation_id: str = None):
+        self.record("validation", agent_id, service_type, success, 0, None, validation_id)
+
+    def record(
+        self,
+        kind: str,
+        agent_id: str,
+        service_type: str,
+        success: bool,
+        lamports: int = 0,
+        latency_ms: float = None,
+        ref: str = None,
+        ts: float = None
+    ):
+        if not self.enabled:
+            return
+        receipt = (
+            time.time() if ts is None else ts, kind, agent_id or "", service_type or "",
+            int(bool(success)), int(lamports or 0), latency_ms, ref
+        )
+        with self._lock:
+            self._pending.append(receipt)
+            pending_count = len(self._pending)
+        self._ensure_worker()
+        if pending_count >= self.batch_size:
+            self._wakeup.set()
+
+    # ------------------------------------------------
+    # Writer (background flusher)
+    # ------------------------------------------------
+
+    def _ensure_worker(self):
+        """Start the background writer on first use"""
+        if self._worker is not None and self._worker.is_alive():
+            return
+        with self._lock:
+            if self._worker is not None and self._worker.is_alive():
+                return
+            self._stopped.clear()
+            self._worker = threading.Thread(target=self._run, name="receipt-ledger-writer", daemon=True)
+            self._worker.start()
+
+    def _run(self):
+        while not self._stopped.is_set():
+            self._wakeup.wait(self.flush_interval)
+            self._wakeup.clear()
+            try:
+                self.flush()
+            except Exception as e:
+                print(f"⚠️ Receipt ledger flush failed: {e}")
+
+    def stop(self, flush: bool = True):
+        """Stop the background writer, optionally writing what is buffered"""
+        self._stopped.set()
+        self._wakeup.set()
+        if self._worker is not None:
+            self._worker.join(timeout=self.flush_interval + 1)
+        if flush and self.enabled:
+            self.flush()
+
+    def flush(self) -> int:
+        """Write buffered receipts: one transaction per segment"""
+        with self._flush_lock:
+            with self._lock:
+                batch, self._pending = self._pending, []
+            if not batch:
+                return 0
+            by_segment: Dict[int, List[Tuple]] = {}
+            for receipt in batch:
+                by_segment.setdefault(self._segment_start(receipt[0]), []).append(receipt)
+            for segment_start, receipts in sorted(by_segment.items()):
+                self.write(segment_start, receipts)
+            return len(batch)
+
+    def write(self, segment_start: int, receipts: List[Tuple]):
+        """Append receipts (ts, kind, agent_id, service_type, success, lamports, latency_ms, ref) to one segment"""
+        rollups: Dict[Tuple, List] = {}
+        for ts, kind, agent_id, service_type, success, lamports, latency_ms, _ in receipts:
+            for level in ROLLUP_LEVELS:
+                start = int(ts // level) * level
+                for agent in (agent_id, ALL_AGENTS):
+                    key = (level, start, kind, agent, service_type)
+                    row = rollups.get(key)
+                    if row is None:
+                        row = rollups[key] = [0, 0, 0, 0, 0.0, None]
+                    row[COUNT] += 1
+                    row[SUCCESSES] += success
+                    row[LAMPORTS] += lamports
+                    if latency_ms is not None:
+                        row[LATENCY_COUNT] += 1
+                        row[LATENCY_SUM] += latency_ms
+                        row[LATENCY_MAX] = latency_ms if row[LATENCY_MAX] is None else max(row[LATENCY_MAX], latency_ms)
+
+        conn = self._connection(self._segment_path(segment_start), create=True)
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            conn.executemany(
+                "INSERT INTO receipts (ts, kind, agent_id, service_type, success, lamports, latency_ms, ref) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                receipts
+            )
+            conn.executemany(_UPSERT_ROLLUP, [key + tuple(row) for key, row in rollups.items()])
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+        conn.execute("COMMIT")
+
+        if self._newest_segment is None or segment_start > self._newest_segment:
+            if self._newest_segment is not None:
+                self._seal(self._newest_segment)
+            self._newest_segment = segment_start
+            self._apply_retention()
+
+    # ------------------------------------------------
+    # Segments
+    # ------------------------------------------------
+
+    def _segment_start(self, ts: float) -> int:
+        return int(ts // self.segment_seconds) * self.segment_seconds
+
+    def _segment_path(self, segment_start: int) -> str:
+        name = datetime.fromtimestamp(segment_start, timezone.utc).strftime("%Y%m%dT%H%M%S")
+        return os.path.join(self.directory, f"receipts-{name}Z.db")
+
+    def segments(self) -> List[Tuple[int, str]]:
+        """Existing segment files as (start, path), oldest first"""
+        if not self.enabled or not os.path.isdir(self.directory):
+            return []
+        segments = []
+        for name in os.listdir(self.directory):
+            match = _SEGMENT_FILE.match(name)
+            if match:
+                start = datetime.strptime(match.group(1), "%Y%m%dT%H%M%S").replace(tzinfo=timezone.utc)
+                segments.append((int(start.timestamp()), os.path.join(self.directory, name)))
+        return sorted(segments)
+
+    def _segments_between(self, since: float, until: float) -> List[str]:
+        """Paths of segments that can hold receipts in [since, until)"""
+        return [
+            path for start, path in self.segments()
+            if start < until and start + self.segment_seconds > since
+        ]
+
+    def _seal(self, segment_start: int):
+        """Fold a segment's WAL into its file once writes have moved on"""
+        try:
+            self._connection(self._segment_path(segment_start)).execute("PRAGMA wal_checkpoint(TRUNCATE)")
+        except Exception as e:
+            print(f"⚠️ Receipt segment checkpoint failed: {e}")
+
+    def _apply_retention(self):
+        if self.retention_days <= 0:
+            return
+        cutoff = time.time() - self.retention_days * 86400
+        for start, path in self.segments():
+            if start + self.segment_seconds <= cutoff:
+                self._close(path)
+                for suffix in ("", "-wal", "-shm"):
+                    try:
+                        os.remove(path + suffix)
+                    except FileNotFoundError:
+                        pass
+                print(f"🗑️ Dropped receipt segment {os.path.basename(path)}")
+
+    def _connection(self, path: str, create: bool = False):
+        connections = getattr(self._local, "connections", None)
+        if connections is None or self._local.pid != os.getpid():
+            # Connections inherited across fork() are never used or closed
+            connections = self._local.connections = OrderedDict()
+            self._local.pid = os.getpid()
+        conn = connections.get(path)
+        if conn is not None:
+            connections.move_to_end(path)
+            return conn
+
+        import sqlite3
+
+        if create:
+            os.makedirs(self.directory, exist_ok=True)
+        conn = sqlite3.connect(path, timeout=self.busy_timeout_ms / 1000, isolation_level=None)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        if path not in self._ready_segments:
+            conn.executescript(_SCHEMA)
+            self._ready_segments.add(path)
+        connections[path] = conn
+        if len(connections) > MAX_OPEN_SEGMENTS:
+            connections.popitem(last=False)[1].close()
+        return conn
+
+    def _close(self, path: str):
+        connections = getattr(self._local, "connections", None)
+        if connections is not None and self._local.pid == os.getpid() and path in connections:
+            connections.pop(path).close()
+        self._ready_segments.discard(path)
+
+    # ------------------------------------------------
+    # Queries
+    # ------------------------------------------------
+
+    @staticmethod
+    def _filters(agent_id: str = None, service_type: str = None, kind: str = None) -> Tuple[str, List[Any]]:
+        clauses, params = [], []
+        for column, value in (("agent_id", agent_id), ("service_type", service_type), ("kind", kind)):
+            if value is not None:
+                clauses.append(f" AND {column} = ?")
+                params.append(value)
+        return "".join(clauses), params
+
+    def receipts(
+        self,
+        agent_id: str = None,
+        service_type: str = None,
+        kind: str = None,
+        since: float = None,
+        until: float = None,
+        cursor: str = None,
+        limit: int = 100
+    ) -> Tuple[List[Dict[str, Any]], Optional[str]]:
+        """
+        Receipts in [since, until), newest first, and the cursor of the next
+        page (None on the last one). Raises ValueError on a malformed cursor.
+        """
+        if kind is not None and kind not in KINDS:
+            raise ValueError(f"kind must be one of {', '.join(KINDS)}")
+        # (ts, id) keyset; ids order receipts within a segment, and equal
+        # timestamps always fall in the same segment
+        after = decode_cursor(cursor) if cursor else (math.inf, 0)
+        if not self.enabled:
+            return [], None
+        since = 0.0 if since is None else since
+        until = math.inf if until is None else until
+        where, params = self._filters(agent_id, service_type, kind)
+        rows = []
+        for path in reversed(self._segments_between(since, min(until, math.nextafter(after[0], math.inf)))):
+            rows += self._connection(path).execute(
+                f"SELECT id, {', '.join(_RECEIPT_COLUMNS)} FROM receipts "
+                f"WHERE ts >= ? AND ts < ? AND (ts, id) < (?, ?){where} ORDER BY ts DESC, id DESC LIMIT ?",
+                [since, until, *after, *params, limit + 1 - len(rows)]
+            ).fetchall()
+            if len(rows) > limit:
+                break
+
+        receipts = []
+        for row in rows[:limit]:
+            receipt = dict(zip(_RECEIPT_COLUMNS, row[1:]))
+            receipt["success"] = bool(receipt["success"])
+            receipts.append(receipt)
+        next_cursor = encode_cursor(rows[limit - 1][1], rows[limit - 1][0]) if len(rows) > limit else None
+        return receipts, next_cursor
+
+    def aggregate(
+        self,
+        since: float,
+        until: float,
+        group_by: str = None,
+        bucket_seconds: int = None,
+        agent_id: str = None,
+        service_type: str = None,
+        kind: str = None
+    ) -> Dict[str, Any]:
+        """
+        Spend, success rate and latency over [since, until), in total and
+        optionally per group (agent, service_type or kind) and per time
+        bucket (a multiple of 60 seconds, aligned to the epoch). Payments
+        give the spend, payment success (service delivered) and latency;
+        validations give the success rate.
+        """
+        if group_by is not None and group_by not in GROUP_BY:
+            raise ValueError(f"group_by must be one of {', '.join(GROUP_BY)}")
+        if bucket_seconds is not None and (bucket_seconds <= 0 or bucket_seconds % 60):
+            raise ValueError("bucket must be a positive multiple of 60 seconds")
+        if kind is not None and kind not in KINDS:
+            raise ValueError(f"kind must be one of {', '.join(KINDS)}")
+        if until <= since:
+            raise ValueError("until must be after since")
+        if bucket_seconds is not None and (until - since) / bucket_seconds > RECEIPT_MAX_BUCKETS:
+            raise ValueError(f"Window spans more than {RECEIPT_MAX_BUCKETS} buckets; use a larger bucket")
+
+        # Rollup levels that fit whole into the buckets
+        levels = tuple(level for level in ROLLUP_LEVELS if bucket_seconds is None or bucket_seconds % level == 0)
+        key_column = GROUP_BY[group_by] if group_by else "''"
+        where, filter_params = self._filters(agent_id, service_type, kind)
+        # Per-agent rollup rows only when agents are filtered or grouped
+        if agent_id is None and group_by != "agent":
+            rollup_where = where + f" AND agent_id = '{ALL_AGENTS}'"
+        else:
+            rollup_where = where + f" AND agent_id != '{ALL_AGENTS}'"
+
+        # (group, bucket, kind) -> counters
+        totals: Dict[Tuple[str, int, str], List] = {}
+        if self.enabled:
+            pieces = list(_window_pieces(since, until, levels))
+            for path in self._segments_between(since, until):
+                conn = self._connection(path)
+                for level, lo, hi in pieces:
+                    if level:
+                        sql = (
+                            f"SELECT {key_column}, {self._bucket_sql('start', bucket_seconds)}, kind, SUM(count), "
+                            "SUM(successes), SUM(lamports), SUM(latency_count), SUM(latency_sum), MAX(latency_max) "
+                            f"FROM rollup WHERE level = ? AND start >= ? AND start < ?{rollup_where} GROUP BY 1, 2, 3"
+                        )
+                        params = [level, lo, hi, *filter_params]
+                    else:
+                        sql = (
+                            f"SELECT {key_column}, {self._bucket_sql('ts', bucket_seconds)}, kind, COUNT(*), "
+                            "SUM(success), SUM(lamports), COUNT(latency_ms), TOTAL(latency_ms), MAX(latency_ms) "
+                            f"FROM receipts WHERE ts >= ? AND ts < ?{where} GROUP BY 1, 2, 3"
+                        )
+                        params = [lo, hi, *filter_params]
+                    for group, bucket, row_kind, *counters in conn.execute(sql, params):
+                        self._merge(totals, (group, bucket, row_kind), counters)
+
+        overall: Dict[str, List] = {}
+        groups: Dict[str, Dict[str, List]] = {}
+        series: Dict[int, Dict[str, List]] = {}
+        for (group, bucket, row_kind), counters in totals.items():
+            self._merge(overall, row_kind, counters)
+            if group_by:
+                self._merge(groups.setdefault(group, {}), row_kind, counters)
+            if bucket_seconds:
+                self._merge(series.setdefault(bucket, {}), row_kind, counters)
+
+        result = {"since": since, "until": until, "total": self._summary(overall)}
+        if group_by:
+            result["group_by"] = group_by
+            result["groups"] = {
+                group: self._summary(by_kind)
+                for group, by_kind in sorted(groups.items(), key=lambda item: -item[1].get("payment", [0, 0, 0])[LAMPORTS])
+            }
+        if bucket_seconds:
+            result["bucket_seconds"] = bucket_seconds
+            result["series"] = [
+                {"start": bucket, **self._summary(series.get(bucket, {}))}
+                for bucket in range(int(since // bucket_seconds) * bucket_seconds, math.ceil(until), bucket_seconds)
+            ]
+        return result
+
+    @staticmethod
+    def _bucket_sql(column: str, bucket_seconds: Optional[int]) -> str:
+        if not bucket_seconds:
+            return "0"
+        return f"(CAST({column} AS INTEGER) / {int(bucket_seconds)}) * {int(bucket_seconds)}"
+
+    @staticmethod
+    def _merge(target: Dict, key, counters: List):
+        row = target.get(key)
+        if row is None:
+            target[key] = list(counters)
+            return
+        for i in range(LATENCY_MAX):
+            row[i] += counters[i] or 0
+        if counters[LATENCY_MAX] is not None:
+            row[LATENCY_MAX] = counters[LATENCY_MAX] if row[LATENCY_MAX] is None else max(row[LATENCY_MAX], counters[LATENCY_MAX])
+
+    @staticmethod
+    def _summary(by_kind: Dict[str, List]) -> Dict[str, Any]:
+        payments = by_kind.get("payment") or [0, 0, 0, 0, 0.0, None]
+        validations = by_kind.get("validation") or [0, 0, 0, 0, 0.0, None]
+        return {
+            "payments": payments[COUNT],
+            "spent_lamports": payments[LAMPORTS],
+            "spent_sol": payments[LAMPORTS] / LAMPORTS_PER_SOL,
+            "payment_success_rate": round(payments[SUCCESSES] / payments[COUNT], 4) if payments[COUNT] else None,
+            "validations": validations[COUNT],
+            "success_rate": round(validations[SUCCESSES] / validations[COUNT], 4) if validations[COUNT] else None,
+            "avg_latency_ms": round(payments[LATENCY_SUM] / payments[LATENCY_COUNT], 2) if payments[LATENCY_COUNT] else None,
+            "max_latency_ms": round(payments[LATENCY_MAX], 2) if payments[LATENCY_MAX] is not None else None
+        }
+
+
+def ledger_from_env() -> ReceiptLedger:
+    """Ledger under RECEIPT_LEDGER_DIR (unset or empty disables it)"""
+    return ReceiptLedger(os.getenv("RECEIPT_LEDGER_DIR"))
+
+
+receipt_ledger = ledger_from_env()
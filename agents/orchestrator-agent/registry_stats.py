@@ -0,0 +1,160 @@
+"""
+Incremental Registry Statistics
+Aggregates over the agent registry, kept up to date as agents are added
+or changed instead of being recomputed from every agent on each read:
+- Counters per (service_type, status): agents, successful and failed
+  transactions, reputation sum
+- Reputation percentiles from a ReputationSketch per service type, a
+  log-bucketed quantile sketch (DDSketch-style) whose buckets can be
+  decremented when an agent's score changes
+A stats object can also hold deltas (negative counts); the shared store
+applies those to its stats tables inside each registry write.
+"""
+import math
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from agent_record import AgentRecord
+
+# Percentiles are estimated within this relative error
+SKETCH_RELATIVE_ACCURACY = 0.01
+PERCENTILES = (50, 90, 99)
+
+# Bucket for scores <= 0 (log buckets only cover positive values)
+ZERO_BUCKET = -(2 ** 31)
+
+# Counter order in RegistryStats groups
+AGENTS, SUCCESSFUL_TXS, FAILED_TXS, REPUTATION_SUM = range(4)
+
+
+class ReputationSketch:
+    """Quantile sketch over scores: counts per logarithmic bucket"""
+
+    def __init__(self, relative_accuracy: float = SKETCH_RELATIVE_ACCURACY):
+        self.gamma = (1 + relative_accuracy) / (1 - relative_accuracy)
+        self._log_gamma = math.log(self.gamma)
+        self.buckets: Dict[int, int] = {}
+        self.count = 0
+
+    def bucket(self, value: float) -> int:
+        if value <= 0:
+            return ZERO_BUCKET
+        return math.ceil(math.log(value) / self._log_gamma)
+
+    def bucket_value(self, bucket: int) -> float:
+        """Representative value of a bucket (within the relative accuracy of every value in it)"""
+        if bucket == ZERO_BUCKET:
+            return 0.0
+        return 2 * self.gamma ** bucket / (self.gamma + 1)
+
+    def add(self, value: float, count: int = 1):
+        self.add_to_bucket(self.bucket(value), count)
+
+    def add_to_bucket(self, bucket: int, count: int):
+        total = self.buckets.get(bucket, 0) + count
+        if total:
+            self.buckets[bucket] = total
+        else:
+            self.buckets.pop(bucket, None)
+        self.count += count
+
+    def quantile(self, q: float) -> Optional[float]:
+        if self.count <= 0:
+            return None
+        rank = q * (self.count - 1)
+        seen = 0
+        for bucket in sorted(self.buckets):
+            seen += self.buckets[bucket]
+            if seen > rank:
+                return self.bucket_value(bucket)
+        return self.bucket_value(max(self.buckets))
+
+    def merge(self, other: "ReputationSketch"):
+        for bucket, count in other.buckets.items():
+            self.add_to_bucket(bucket, count)
+
+
+class RegistryStats:
+    """Registry aggregates by (service_type, status), with O(1) updates"""
+
+    def __init__(self):
+        self.groups: Dict[Tuple[str, str], List[int]] = {}
+        self.sketches: Dict[str, ReputationSketch] = {}
+        self._snapshot: Optional[Dict] = None
+
+    @classmethod
+    def from_agents(cls, agents: Iterable[AgentRecord]) -> "RegistryStats":
+        """Full recompute"""
+        stats = cls()
+        for agent in agents:
+            stats.add(agent)
+        return stats
+
+    def add(self, agent: AgentRecord, sign: int = 1):
+        self.add_values(
+            agent.service_type or "", agent.status or "", agent.reputation_score,
+            agent.total_successful_txs, agent.total_failed_txs, sign
+        )
+
+    def remove(self, agent: AgentRecord):
+        """Call before changing an agent, and add() it again afterwards"""
+        self.add(agent, -1)
+
+    def add_values(self, service_type: str, status: str, reputation: int, successful: int, failed: int, sign: int = 1):
+        group = self.groups.get((service_type, status))
+        if group is None:
+            group = self.groups[(service_type, status)] = [0, 0, 0, 0]
+        group[AGENTS] += sign
+        group[SUCCESSFUL_TXS] += sign * successful
+        group[FAILED_TXS] += sign * failed
+        group[REPUTATION_SUM] += sign * reputation
+        if not any(group):
+            del self.groups[(service_type, status)]
+
+        sketch = self.sketches.get(service_type)
+        if sketch is None:
+            sketch = self.sketches[service_type] = ReputationSketch()
+        sketch.add(reputation, sign)
+        if not sketch.buckets:
+            del self.sketches[service_type]
+        self._snapshot = None
+
+    def __eq__(self, other) -> bool:
+        if not isinstance(other, RegistryStats):
+            return NotImplemented
+        return self.groups == other.groups and {
+            service_type: sketch.buckets for service_type, sketch in self.sketches.items()
+        } == {
+            service_type: sketch.buckets for service_type, sketch in other.sketches.items()
+        }
+
+    @staticmethod
+    def _summary(groups: List[Tuple[str, List[int]]], sketch: ReputationSketch) -> Dict:
+        agents = sum(counters[AGENTS] for _, counters in groups)
+        return {
+            "total_agents": agents,
+            "active_agents": sum(counters[AGENTS] for status, counters in groups if status == "active"),
+            "total_transactions": sum(counters[SUCCESSFUL_TXS] + counters[FAILED_TXS] for _, counters in groups),
+            "average_reputation": round(sum(counters[REPUTATION_SUM] for _, counters in groups) / agents, 2) if agents else 0,
+            "reputation_percentiles": {
+                f"p{p}": round(value, 1) if (value := sketch.quantile(p / 100)) is not None else None
+                for p in PERCENTILES
+            }
+        }
+
+    def snapshot(self) -> Dict:
+        """Registry totals plus a breakdown per service type (cached until the next change; do not modify)"""
+        if self._snapshot is None:
+            by_type: Dict[str, List[Tuple[str, List[int]]]] = {}
+            for (service_type, status), counters in self.groups.items():
+                by_type.setdefault(service_type, []).append((status, counters))
+            overall = ReputationSketch()
+            for sketch in self.sketches.values():
+                overall.merge(sketch)
+
+            snapshot = self._summary([group for groups in by_type.values() for group in groups], overall)
+            snapshot["by_service_type"] = {
+                service_type or "unknown": self._summary(groups, self.sketches.get(service_type) or ReputationSketch())
+                for service_type, groups in sorted(by_type.items())
+            }
+            self._snapshot = snapshot
+        return self._snapshot
@@ -0,0 +1,396 @@
+"""
+Solana RPC Pool
+Spreads the orchestrator's Solana JSON-RPC traffic over several endpoints
+(SOLANA_RPC_URLS, comma-separated; default SOLANA_RPC_URL):
+- Every endpoint keeps a persistent HTTP client (keep-alive connections,
+  no client setup per call) and a smoothed (EWMA) latency; each call goes
+  to the endpoint with the lowest latency x (requests in flight + 1) that
+  is not cooling down, so concurrent calls spread out instead of piling
+  onto one endpoint, with a small share sent elsewhere to keep the other
+  latencies current
+- HTTP 429 cools an endpoint down for its Retry-After; connection errors,
+  timeouts and 5xx back off exponentially. Either way the call fails over
+  to the next endpoint
+- Read calls issued within RPC_BATCH_WINDOW_MS of each other, from any
+  thread, are sent as one JSON-RPC batch request; a call made while no
+  other is in flight is sent at once. An endpoint answering a batch with
+  anything but a list (rate limit or batch-size errors) is treated like a
+  429 or 5xx, and if every endpoint refuses the batch its calls are sent
+  one by one
+The pool plugs into solana-py as a Client's provider, so callers keep
+using the usual Client methods.
+"""
+import json
+import os
+import random
+import threading
+import time
+from typing import Any, Dict, List, Optional, Sequence, Tuple, Union
+from urllib.parse import urlparse
+
+import metrics
+
+RPC_BATCH_WINDOW_MS = float(os.getenv("RPC_BATCH_WINDOW_MS", "2"))
+RPC_BATCH_MAX = int(os.getenv("RPC_BATCH_MAX", "32"))
+RPC_EXPLORE_RATE = float(os.getenv("RPC_EXPLORE_RATE", "0.05"))
+RPC_RATE_LIMIT_COOLDOWN = float(os.getenv("RPC_RATE_LIMIT_COOLDOWN", "1"))
+RPC_MAX_CONNECTIONS = int(os.getenv("RPC_MAX_CONNECTIONS", "32"))
+
+# Failure backoff: doubles per consecutive failure, up to the cap
+FAILURE_COOLDOWN = 0.25
+FAILURE_COOLDOWN_MAX = 30.0
+LATENCY_EWMA_ALPHA = 0.2
+
+# JSON-RPC error codes providers use for rate limiting
+RATE_LIMIT_ERROR_CODES = frozenset({429, -32005})
+
+# Requests that only read state, safe to combine into batch requests
+BATCHABLE_REQUESTS = frozenset({
+    "GetBalance", "GetLatestBlockhash", "GetSignatureStatuses", "GetAccountInfo",
+    "GetMultipleAccounts", "GetBlockHeight", "GetSlot"
+})
+
+
+class RPCPoolError(Exception):
+    """Every endpoint failed (or was cooling down) for a request"""
+
+
+class RPCEndpoint:
+    """One RPC URL: its HTTP client, latency estimate and cooldown state"""
+
+    def __init__(self, url: str, index: int = 0):
+        self.url = url
+        # URLs can carry API keys; metrics and /health only show the host
+        self.label = f"{index}:{urlparse(url).hostname or url}"
+        self.latency: Optional[float] = None
+        self.cooldown_until = 0.0
+        self.failures = 0
+        self.in_flight = 0
+        self.outcomes: Dict[str, int] = {"ok": 0, "rate_limited": 0, "error": 0}
+        self._http = None
+        self._pid = None
+        self._lock = threading.Lock()
+
+    def http(self):
+        """Persistent client, recreated in forked worker processes"""
+        if self._http is None or self._pid != os.getpid():
+            import httpx
+            self._http = httpx.Client(limits=httpx.Limits(
+                max_connections=RPC_MAX_CONNECTIONS,
+                max_keepalive_connections=RPC_MAX_CONNECTIONS
+            ))
+            self._pid = os.getpid()
+        return self._http
+
+    def expected_wait(self) -> float:
+        """Routing key: latency x (requests in flight + 1); idle unmeasured endpoints come first"""
+        if self.latency is None:
+            return 0.0 if self.in_flight == 0 else float("inf")
+        return self.latency * (self.in_flight + 1)
+
+    def begin(self):
+        with self._lock:
+            self.in_flight += 1
+
+    def record(self, outcome: str, seconds: float = None, cooldown: float = None):
+        with self._lock:
+            self.in_flight -= 1
+            self._record(outcome, seconds, cooldown)
+
+    def _record(self, outcome: str, seconds: float, cooldown: float):
+        self.outcomes[outcome] += 1
+        metrics.RPC_ENDPOINT_REQUESTS.inc(self.label, outcome)
+        if outcome == "ok":
+            self.failures = 0
+            self.latency = seconds if self.latency is None else (
+                LATENCY_EWMA_ALPHA * seconds + (1 - LATENCY_EWMA_ALPHA) * self.latency
+            )
+            metrics.RPC_ENDPOINT_LATENCY.set(self.latency, self.label)
+            return
+        if outcome == "error":
+            self.failures += 1
+            cooldown = min(FAILURE_COOLDOWN * 2 ** (self.failures - 1), FAILURE_COOLDOWN_MAX)
+        self.cooldown_until = max(self.cooldown_until, time.monotonic() + cooldown)
+
+    def snapshot(self) -> Dict[str, Any]:
+        return {
+            "endpoint": self.label,
+            "latency_ms": round(self.latency * 1000, 2) if self.latency is not None else None,
+            "cooling_down_s": round(max(0.0, self.cooldown_until - time.monotonic()), 2),
+            "in_flight": self.in_flight,
+            "requests": dict(self.outcomes)
+        }
+
+
+class _PendingCall:
+    __slots__ = ("body", "parser", "timeout", "result", "error", "done")
+
+    def __init__(self, body, parser, timeout: float):
+        self.body = body
+        self.parser = parser
+        self.timeout = timeout
+        self.result = None
+        self.error: Optional[BaseException] = None
+        self.done = threading.Event()
+
+
+def _parse(raw: str, parser):
+    """Parse one JSON-RPC response like solana-py does (RPC errors raise RPCException)"""
+    from typing import get_args
+    from solana.rpc.core import RPCException
+    from solders.rpc.responses import RPCError
+
+    parsed = parser.from_json(raw)
+    if isinstance(parsed, get_args(RPCError)):
+        raise RPCException(parsed)
+    return parsed
+
+
+def _batch_rejection(text: str) -> Tuple[bool, str]:
+    """(rate limited?, short description) of a non-list answer to a batch request"""
+    try:
+        error = json.loads(text).get("error") or {}
+    except (ValueError, AttributeError):
+        return False, "invalid response"
+    if not isinstance(error, dict):
+        return False, str(error)[:100]
+    message = str(error.get("message", ""))
+    rate_limited = error.get("code") in RATE_LIMIT_ERROR_CODES or "rate limit" in message.lower()
+    return rate_limited, f"{error.get('code')}: {message[:100]}"
+
+
+class RPCPool:
+    """Latency-routed, rate-limit-aware pool of Solana RPC endpoints with request batching"""
+
+    def __init__(
+        self,
+        urls: Sequence[str],
+        timeout: float = 10.0,
+        batch_window_ms: float = None,
+        batch_max: int = None,
+        explore_rate: float = None
+    ):
+        if not urls:
+            raise ValueError("RPC pool needs at least one endpoint")
+        self.endpoints = [RPCEndpoint(url, i) for i, url in enumerate(urls)]
+        self.timeout = timeout
+        self.batch_window = (RPC_BATCH_WINDOW_MS if batch_window_ms is None else batch_window_ms) / 1000
+        self.batch_max = batch_max if batch_max is not None else RPC_BATCH_MAX
+        self.explore_rate = explore_rate if explore_rate is not None else RPC_EXPLORE_RATE
+        self._random = random.Random()
+        self._pending: List[_PendingCall] = []
+        self._pending_lock = threading.Lock()
+        # Calls inside request(), batched or not
+        self._active = 0
+
+    @property
+    def primary_url(self) -> str:
+        return self.endpoints[0].url
+
+    def ranked(self) -> List[RPCEndpoint]:
+        """Endpoints in the order to try: available ones by expected wait, then cooling ones by readiness"""
+        now = time.monotonic()
+        available = [e for e in self.endpoints if e.cooldown_until <= now]
+        cooling = sorted((e for e in self.endpoints if e.cooldown_until > now), key=lambda e: e.cooldown_until)
+        available.sort(key=RPCEndpoint.expected_wait)
+        if len(available) > 1 and self._random.random() < self.explore_rate:
+            explored = available.pop(self._random.randrange(1, len(available)))
+            available.insert(0, explored)
+        return available + cooling
+
+    def post(self, content: str, timeout: float = None, batch: bool = False) -> str:
+        """
+        POST a JSON-RPC payload, failing over across endpoints; returns the
+        response text. With `batch`, a response that is not a JSON list
+        (a single error object) fails that endpoint too.
+        """
+        import httpx
+
+        timeout = self.timeout if timeout is None else timeout
+        errors = []
+        for endpoint in self.ranked():
+            endpoint.begin()
+            started = time.perf_counter()
+            try:
+                response = endpoint.http().post(
+                    endpoint.url,
+                    content=content,
+                    headers={"Content-Type": "application/json"},
+                    timeout=timeout
+                )
+            except httpx.HTTPError as e:
+                endpoint.record("error")
+                errors.append(f"{endpoint.label}: {type(e).__name__}")
+                continue
+
+            if response.status_code == 429:
+                retry_after = response.headers.get("retry-after", "")
+                endpoint.record(
+                    "rate_limited",
+                    cooldown=float(retry_after) if retry_after.replace(".", "", 1).isdigit() else RPC_RATE_LIMIT_COOLDOWN
+                )
+                errors.append(f"{endpoint.label}: rate limited")
+                continue
+            if response.status_code >= 500:
+                endpoint.record("error")
+                errors.append(f"{endpoint.label}: HTTP {response.status_code}")
+                continue
+            if response.status_code >= 400:
+                endpoint.record("error")
+                raise RPCPoolError(f"{endpoint.label}: HTTP {response.status_code}: {response.text[:200]}")
+
+            if batch and not response.text.lstrip().startswith("["):
+                rate_limited, detail = _batch_rejection(response.text)
+                if rate_limited:
+                    endpoint.record("rate_limited", cooldown=RPC_RATE_LIMIT_COOLDOWN)
+                else:
+                    endpoint.record("error")
+                errors.append(f"{endpoint.label}: batch rejected ({detail})")
+                continue
+
+            endpoint.record("ok", time.perf_counter() - started)
+            return response.text
+        raise RPCPoolError(f"All RPC endpoints failed ({'; '.join(errors)})")
+
+    def request(self, body, parser, timeout: float = None):
+        """One call, batched with concurrent read calls when batching is enabled"""
+        with self._pending_lock:
+            self._active += 1
+        try:
+            if self.batch_window <= 0 or type(body).__name__ not in BATCHABLE_REQUESTS:
+                metrics.RPC_BATCH_SIZE.observe(1)
+                return _parse(self.post(body.to_json(), timeout), parser)
+
+            call = _PendingCall(body, parser, self.timeout if timeout is None else timeout)
+            with self._pending_lock:
+                self._pending.append(call)
+                leader = len(self._pending) == 1
+                # A lone caller has nobody to batch with
+                concurrent = self._active > 1
+            if leader:
+                # The first caller of a window collects the others' calls and sends them
+                if concurrent:
+                    time.sleep(self.batch_window)
+                with self._pending_lock:
+                    calls, self._pending = self._pending, []
+                for start in range(0, len(calls), self.batch_max):
+                    self._send_batch(calls[start:start + self.batch_max])
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result
+        finally:
+            with self._pending_lock:
+                self._active -= 1
+
+    def _send_batch(self, calls: List[_PendingCall]):
+        metrics.RPC_BATCH_SIZE.observe(len(calls))
+        timeout = max(call.timeout for call in calls)
+        try:
+            if len(calls) == 1:
+                raw_responses = [self.post(calls[0].body.to_json(), timeout)]
+            else:
+                # Ids must be unique within a batch; responses may come back in any order
+                payload = []
+                for i, call in enumerate(calls):
+                    request = json.loads(call.body.to_json())
+                    request["id"] = i
+                    payload.append(request)
+                try:
+                    responses = json.loads(self.post(json.dumps(payload), timeout, batch=True))
+                except RPCPoolError:
+                    # Every endpoint refused the batch: send the calls one by one
+                    self._send_each(calls)
+                    return
+                by_id = {item.get("id"): item for item in responses if isinstance(item, dict)}
+                raw_responses = [json.dumps(by_id[i]) if i in by_id else None for i in range(len(calls))]
+        except BaseException as e:
+            for call in calls:
+                call.error = e
+                call.done.set()
+            return
+
+        for call, raw in zip(calls, raw_responses):
+            try:
+                if raw is None:
+                    raise RPCPoolError("No response for this call in the batch")
+                call.result = _parse(raw, call.parser)
+            except Exception as e:
+                call.error = e
+            call.done.set()
+
+    def _send_each(self, calls: List[_PendingCall]):
+        for call in calls:
+            try:
+                call.result = _parse(self.post(call.body.to_json(), call.timeout), call.parser)
+            except BaseException as e:
+                call.error = e
+            call.done.set()
+
+    def client(self, timeout: float = None, commitment=None):
+        """A solana Client whose requests go through this pool"""
+        from solana.rpc.api import Client
+
+        client = Client(self.primary_url, commitment=commitment, timeout=timeout or self.timeout)
+        client._provider = PooledProvider(self, timeout or self.timeout)
+        return client
+
+    def snapshot(self) -> List[Dict[str, Any]]:
+        return [endpoint.snapshot() for endpoint in self.endpoints]
+
+
+def PooledProvider(pool: RPCPool, timeout: float):
+    """solana-py HTTPProvider whose requests go through `pool`"""
+    from solana.rpc.providers.http import HTTPProvider
+
+    class _PooledProvider(HTTPProvider):
+        def make_request(self, body, parser):
+            return pool.request(body, parser, self.timeout)
+
+        def make_batch_request(self, reqs, parsers):
+            results = [None] * len(reqs)
+
+            def run(i):
+                results[i] = pool.request(reqs[i], parsers[i], self.timeout)
+
+            # Concurrent calls are combined by the pool's batching window
+            threads = [threading.Thread(target=run, args=(i,)) for i in range(1, len(reqs))]
+            for thread in threads:
+                thread.start()
+            run(0)
+            for thread in threads:
+                thread.join()
+            return tuple(results)
+
+        def is_connected(self) -> bool:
+            try:
+                pool.post(json.dumps({"jsonrpc": "2.0", "id": 0, "method": "getHealth"}), self.timeout)
+                return True
+            except Exception:
+                return False
+
+    return _PooledProvider(pool.primary_url, timeout=timeout)
+
+
+def parse_rpc_urls(urls: Union[str, Sequence[str], None]) -> Tuple[str, ...]:
+    if urls is None:
+        urls = os.getenv("SOLANA_RPC_URLS") or os.getenv("SOLANA_RPC_URL", "https://api.devnet.solana.com")
+    if isinstance(urls, str):
+        urls = urls.split(",")
+    return tuple(url.strip() for url in urls if url.strip())
+
+
+_pools: Dict[Tuple[str, ...], RPCPool] = {}
+_pools_lock = threading.Lock()
+
+
+def get_rpc_pool(urls: Union[str, Sequence[str], None] = None) -> RPCPool:
+    """Shared pool for a set of endpoints (a comma-separated string or a list)"""
+    key = parse_rpc_urls(urls)
+    pool = _pools.get(key)
+    if pool is None:
+        with _pools_lock:
+            pool = _pools.get(key)
+            if pool is None:
+                pool = _pools[key] = RPCPool(key)
+    return pool
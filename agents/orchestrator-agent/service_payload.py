@@ -0,0 +1,116 @@
+"""
+Service Response Payloads
+Reads service-agent responses in chunks with a size cap, so one large
+answer cannot exhaust the orchestrator's memory:
+- Bodies above SERVICE_RESPONSE_MAX_BYTES are rejected while reading
+  (or up front, from Content-Length)
+- By default the body is parsed into JSON once it is complete
+- In streaming mode it is spooled (memory up to SERVICE_PAYLOAD_SPOOL_BYTES,
+  then a temporary file) and later copied to the API client chunk by chunk
+  without ever being parsed
+"""
+import json
+import os
+import tempfile
+from typing import Any, Iterator, Tuple
+
+SERVICE_RESPONSE_MAX_BYTES = int(os.getenv("SERVICE_RESPONSE_MAX_BYTES", str(16 * 1024 * 1024)))
+SERVICE_PAYLOAD_SPOOL_BYTES = int(os.getenv("SERVICE_PAYLOAD_SPOOL_BYTES", str(1024 * 1024)))
+STREAM_CHUNK_BYTES = 64 * 1024
+
+# Error bodies are only ever logged, so only their start is read
+ERROR_SNIPPET_BYTES = 500
+
+
+class PayloadTooLarge(Exception):
+    """A service response exceeded SERVICE_RESPONSE_MAX_BYTES"""
+
+    def __init__(self, size: int, limit: int):
+        super().__init__(f"Service response exceeds {limit} bytes ({size}+ bytes)")
+        self.size = size
+        self.limit = limit
+
+
+class ServicePayload:
+    """Raw JSON body of a service response, spooled to disk past a threshold"""
+
+    def __init__(self, spool_bytes: int = None):
+        self._file = tempfile.SpooledTemporaryFile(
+            max_size=SERVICE_PAYLOAD_SPOOL_BYTES if spool_bytes is None else spool_bytes
+        )
+        self.size = 0
+
+    def write(self, chunk: bytes):
+        self._file.write(chunk)
+        self.size += len(chunk)
+
+    def chunks(self, chunk_size: int = STREAM_CHUNK_BYTES) -> Iterator[bytes]:
+        self._file.seek(0)
+        while True:
+            chunk = self._file.read(chunk_size)
+            if not chunk:
+                return
+            yield chunk
+
+    def close(self):
+        self._file.close()
+
+    def __repr__(self) -> str:
+        return f"<ServicePayload {self.size} bytes>"
+
+
+def _is_json(response) -> bool:
+    return "json" in response.headers.get("content-type", "").lower()
+
+
+async def read_service_response(response, stream: bool = False, max_bytes: int = None) -> Tuple[Any, int]:
+    """
+    Read an httpx streaming response's body within the size cap.
+
+    Returns (parsed JSON, size), or (ServicePayload, size) with `stream`.
+    Raises PayloadTooLarge past the cap and ValueError for a body that is
+    not JSON (in streaming mode: not declared as JSON).
+    """
+    max_bytes = SERVICE_RESPONSE_MAX_BYTES if max_bytes is None else max_bytes
+    declared = response.headers.get("content-length")
+    if declared and declared.isdigit() and int(declared) > max_bytes:
+        raise PayloadTooLarge(int(declared), max_bytes)
+
+    if stream:
+        if not _is_json(response):
+            raise ValueError(f"Service response is not JSON ({response.headers.get('content-type')})")
+        payload = ServicePayload()
+        try:
+            async for chunk in response.aiter_bytes():
+                if payload.size + len(chunk) > max_bytes:
+                    raise PayloadTooLarge(payload.size + len(chunk), max_bytes)
+                payload.write(chunk)
+        except BaseException:
+            payload.close()
+            raise
+        return payload, payload.size
+
+    body = bytearray()
+    async for chunk in response.aiter_bytes():
+        if len(body) + len(chunk) > max_bytes:
+            raise PayloadTooLarge(len(body) + len(chunk), max_bytes)
+        body += chunk
+    return json.loads(body), len(body)
+
+
+async def read_snippet(response, limit: int = ERROR_SNIPPET_BYTES) -> str:
+    """The start of a response body, for logging; the rest is never read"""
+    snippet = b""
+    async for chunk in response.aiter_bytes():
+        snippet += chunk
+        if len(snippet) >= limit:
+            break
+    return snippet[:limit].decode(errors="replace")
+
+
+def close_payloads(results: dict):
+    """Release the spooled payloads of an orchestration's results"""
+    for result in results.values():
+        payload = result.get("service_data")
+        if isinstance(payload, ServicePayload):
+            payload.close()
@@ -0,0 +1,514 @@
+"""
+Shared Orchestrator Store
+One SQLite database (WAL mode) shared by every orchestrator worker process:
+- The agent registry, with reputation updates applied as atomic SQL
+  increments, so an update from any worker is seen by all on their next read
+- Registry statistics (see registry_stats), updated in the same
+  transaction as each registry write
+- Small TTL caches (LLM plans, x402 payment terms) keyed by namespace
+
+Enabled by ORCHESTRATOR_SHARED_STORE (a database path). Without it the
+registry stays in agent_registry.json and caches are per-process.
+"""
+import json
+import os
+import random
+import threading
+import time
+from collections import OrderedDict
+from contextlib import contextmanager
+from typing import Any, Iterable, List, Optional, Tuple
+
+import metrics
+from agent_record import AgentRecord
+from registry_stats import RegistryStats, ReputationSketch
+
+# Registry fields kept in their own columns so they can be updated in SQL;
+# everything else lives in the JSON `data` column
+MUTABLE_FIELDS = ("status", "reputation_score", "total_successful_txs", "total_failed_txs", "last_updated")
+
+# Expired cache rows are swept on roughly this fraction of writes
+CACHE_SWEEP_RATE = 0.01
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS agents (
+    agent_id TEXT PRIMARY KEY,
+    service_type TEXT,
+    status TEXT,
+    reputation_score INTEGER NOT NULL DEFAULT 100,
+    total_successful_txs INTEGER NOT NULL DEFAULT 0,
+    total_failed_txs INTEGER NOT NULL DEFAULT 0,
+    last_updated TEXT,
+    data TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS agents_service_type ON agents (service_type);
+CREATE INDEX IF NOT EXISTS agents_reputation ON agents (reputation_score DESC, agent_id);
+CREATE TABLE IF NOT EXISTS meta (
+    key TEXT PRIMARY KEY,
+    value INTEGER NOT NULL
+);
+INSERT OR IGNORE INTO meta (key, value) VALUES ('registry_version', 0);
+-- Stores created before the stats tables existed are backfilled on first use
+INSERT OR IGNORE INTO meta (key, value) SELECT 'stats_ready', NOT EXISTS (SELECT 1 FROM agents);
+CREATE TABLE IF NOT EXISTS agent_stats (
+    service_type TEXT NOT NULL,
+    status TEXT NOT NULL,
+    agents INTEGER NOT NULL,
+    successful_txs INTEGER NOT NULL,
+    failed_txs INTEGER NOT NULL,
+    reputation_sum INTEGER NOT NULL,
+    PRIMARY KEY (service_type, status)
+);
+CREATE TABLE IF NOT EXISTS reputation_sketch (
+    service_type TEXT NOT NULL,
+    bucket INTEGER NOT NULL,
+    count INTEGER NOT NULL,
+    PRIMARY KEY (service_type, bucket)
+);
+CREATE TABLE IF NOT EXISTS cache (
+    namespace TEXT NOT NULL,
+    key TEXT NOT NULL,
+    value TEXT NOT NULL,
+    expires_at REAL NOT NULL,
+    PRIMARY KEY (namespace, key)
+);
+"""
+
+
+class SharedStore:
+    """SQLite-backed registry and caches, safe across threads and forked workers"""
+
+    def __init__(self, path: str, busy_timeout_ms: int = None):
+        self.path = path
+        self.busy_timeout_ms = busy_timeout_ms if busy_timeout_ms is not None else int(
+            os.getenv("SHARED_STORE_BUSY_TIMEOUT_MS", "5000")
+        )
+        # One connection per thread, reopened after fork (connections must
+        # never cross a process boundary)
+        self._local = threading.local()
+        self._inherited = []
+        self._schema_ready = False
+
+    def _connection(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is not None:
+            if self._local.pid == os.getpid():
+                return conn
+            # Inherited across fork(): never use it, and never close it
+            # either (closing could checkpoint the parent's WAL)
+            self._inherited.append(conn)
+
+        import sqlite3
+
+        conn = sqlite3.connect(self.path, timeout=self.busy_timeout_ms / 1000, isolation_level=None)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        conn.execute(f"PRAGMA busy_timeout={self.busy_timeout_ms}")
+        if not self._schema_ready:
+            conn.executescript(_SCHEMA)
+            self._schema_ready = True
+        self._local.conn = conn
+        self._local.pid = os.getpid()
+        return conn
+
+    @contextmanager
+    def _write(self):
+        """Write transaction; BEGIN IMMEDIATE takes the write lock up front so concurrent writers queue instead of deadlocking"""
+        conn = self._connection()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            yield conn
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+        conn.execute("COMMIT")
+
+    # ------------------------------------------------
+    # Agent registry
+    # ------------------------------------------------
+
+    @staticmethod
+    def _row_to_agent(row) -> AgentRecord:
+        agent = AgentRecord.from_dict(json.loads(row[5]))
+        for field, value in zip(MUTABLE_FIELDS, row[:5]):
+            if value is not None:
+                setattr(agent, field, value)
+        return agent
+
+    _AGENT_COLUMNS = "status, reputation_score, total_successful_txs, total_failed_txs, last_updated, data"
+
+    def all_agents(self) -> List[AgentRecord]:
+        rows = self._connection().execute(f"SELECT {self._AGENT_COLUMNS} FROM agents ORDER BY rowid")
+        return [self._row_to_agent(row) for row in rows]
+
+    def agents_by_service_type(self, service_type: str) -> List[AgentRecord]:
+        rows = self._connection().execute(
+            f"SELECT {self._AGENT_COLUMNS} FROM agents WHERE service_type = ? ORDER BY rowid",
+            (service_type,)
+        )
+        return [self._row_to_agent(row) for row in rows]
+
+    def query_agents(
+        self,
+        service_type: Optional[str] = None,
+        status: Optional[str] = None,
+        min_reputation: Optional[int] = None,
+        sort: str = "reputation",
+        after: Optional[Tuple] = None,
+        limit: int = 100
+    ) -> Tuple[List[Tuple[Tuple, AgentRecord]], int]:
+        """
+        One page of matching agents as (sort key, agent) pairs, plus the
+        number of matches. `sort` is "reputation" (highest first, key
+        (score, agent_id)) or "recent" (newest registration first, key
+        (rowid,)); `after` is the key of the previous page's last agent.
+        """
+        conditions, params = [], []
+        for column, value in (("service_type", service_type), ("status", status)):
+            if value is not None:
+                conditions.append(f"{column} = ?")
+                params.append(value)
+        if min_reputation is not None:
+            conditions.append("reputation_score >= ?")
+            params.append(min_reputation)
+
+        conn = self._connection()
+        where = f" WHERE {' AND '.join(conditions)}" if conditions else ""
+        total = conn.execute(f"SELECT COUNT(*) FROM agents{where}", params).fetchone()[0]
+
+        if sort == "recent":
+            order = "rowid DESC"
+            if after is not None:
+                conditions.append("rowid < ?")
+                params.append(after[0])
+        else:
+            order = "reputation_score DESC, agent_id"
+            if after is not None:
+                conditions.append("(reputation_score < ? OR (reputation_score = ? AND agent_id > ?))")
+                params.extend((after[0], after[0], after[1]))
+        where = f" WHERE {' AND '.join(conditions)}" if conditions else ""
+        rows = conn.execute(
+            f"SELECT rowid, {self._AGENT_COLUMNS} FROM agents{where} ORDER BY {order} LIMIT ?",
+            params + [limit]
+        )
+        page = []
+        for row in rows:
+            agent = self._row_to_agent(row[1:])
+            key = (row[0],) if sort == "recent" else (agent.reputation_score, agent.agent_id)
+            page.append((key, agent))
+        return page, total
+
+    def get_agent(self, agent_id: str) -> Optional[AgentRecord]:
+        row = self._connection().execute(
+            f"SELECT {self._AGENT_COLUMNS} FROM agents WHERE agent_id = ?",
+            (agent_id,)
+        ).fetchone()
+        return self._row_to_agent(row) if row else None
+
+    @staticmethod
+    def _agent_params(agent: AgentRecord) -> Tuple:
+        data = {k: v for k, v in agent.to_dict().items() if k not in MUTABLE_FIELDS}
+        return (
+            agent.agent_id,
+            agent.service_type,
+            agent.status,
+            agent.reputation_score,
+            agent.total_successful_txs,
+            agent.total_failed_txs,
+            agent.last_updated,
+            json.dumps(data)
+        )
+
+    def insert_agents(self, agents: Iterable[AgentRecord]) -> int:
+        """Insert agents whose id is not registered yet; returns how many were added"""
+        return sum(self.add_agents(list(agents)))
+
+    def add_agents(self, agents: List[AgentRecord]) -> List[bool]:
+        """
+        Insert agents in one transaction; returns, per agent, whether it was
+        added (False: the id was already registered)
+        """
+        with self._write() as conn:
+            existing = set()
+            ids = [agent.agent_id for agent in agents]
+            for start in range(0, len(ids), 500):
+                chunk = ids[start:start + 500]
+                existing.update(row[0] for row in conn.execute(
+                    f"SELECT agent_id FROM agents WHERE agent_id IN ({','.join('?' * len(chunk))})",
+                    chunk
+                ))
+            added = []
+            delta = RegistryStats()
+            for agent in agents:
+                new = agent.agent_id not in existing
+                if new:
+                    # Also catches ids repeated within `agents`
+                    existing.add(agent.agent_id)
+                    delta.add(agent)
+                added.append(new)
+            conn.executemany(
+                "INSERT INTO agents "
+                "(agent_id, service_type, status, reputation_score, total_successful_txs, "
+                "total_failed_txs, last_updated, data) VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                [self._agent_params(agent) for agent, new in zip(agents, added) if new]
+            )
+            if any(added):
+                self._apply_stats(conn, delta)
+                self._bump_version(conn)
+        return added
+
+    def update_reputations(self, updates: List[Tuple[str, bool]], now: str) -> List[Optional[int]]:
+        """
+        Apply (agent_id, success) updates in one transaction (+1 on success,
+        -5 floored at 0 on failure). Returns each agent's new score, None
+        for unknown agents.
+        """
+        scores = []
+        delta = RegistryStats()
+        with self._write() as conn:
+            for agent_id, success in updates:
+                old = conn.execute(
+                    f"SELECT {self._STATS_COLUMNS} FROM agents WHERE agent_id = ?", (agent_id,)
+                ).fetchone()
+                if old is None:
+                    scores.append(None)
+                    continue
+                if success:
+                    conn.execute(
+                        "UPDATE agents SET reputation_score = reputation_score + 1, "
+                        "total_successful_txs = total_successful_txs + 1, last_updated = ? "
+                        "WHERE agent_id = ?",
+                        (now, agent_id)
+                    )
+                else:
+                    conn.execute(
+                        "UPDATE agents SET reputation_score = MAX(0, reputation_score - 5), "
+                        "total_failed_txs = total_failed_txs + 1, last_updated = ? "
+                        "WHERE agent_id = ?",
+                        (now, agent_id)
+                    )
+                new = conn.execute(
+                    f"SELECT {self._STATS_COLUMNS} FROM agents WHERE agent_id = ?", (agent_id,)
+                ).fetchone()
+                delta.add_values(*self._stats_values(old), sign=-1)
+                delta.add_values(*self._stats_values(new))
+                scores.append(new[2])
+            if any(score is not None for score in scores):
+                self._apply_stats(conn, delta)
+                self._bump_version(conn)
+        return scores
+
+    def set_status(self, agent_id: str, status: str, now: str) -> bool:
+        with self._write() as conn:
+            old = conn.execute(
+                f"SELECT {self._STATS_COLUMNS} FROM agents WHERE agent_id = ?", (agent_id,)
+            ).fetchone()
+            if old is None:
+                return False
+            conn.execute(
+                "UPDATE agents SET status = ?, last_updated = ? WHERE agent_id = ?",
+                (status, now, agent_id)
+            )
+            delta = RegistryStats()
+            values = self._stats_values(old)
+            delta.add_values(*values, sign=-1)
+            delta.add_values(values[0], status or "", *values[2:])
+            self._apply_stats(conn, delta)
+            self._bump_version(conn)
+        return True
+
+    def agent_count(self) -> int:
+        return self._connection().execute("SELECT COUNT(*) FROM agents").fetchone()[0]
+
+    def registry_version(self) -> int:
+        """Incremented by every registry write, from any process"""
+        return self._connection().execute(
+            "SELECT value FROM meta WHERE key = 'registry_version'"
+        ).fetchone()[0]
+
+    @staticmethod
+    def _bump_version(conn):
+        conn.execute("UPDATE meta SET value = value + 1 WHERE key = 'registry_version'")
+
+    # ------------------------------------------------
+    # Registry statistics
+    # ------------------------------------------------
+
+    _STATS_COLUMNS = "service_type, status, reputation_score, total_successful_txs, total_failed_txs"
+
+    @staticmethod
+    def _stats_values(row) -> Tuple:
+        return (row[0] or "", row[1] or "", row[2], row[3], row[4])
+
+    @staticmethod
+    def _apply_stats(conn, delta: RegistryStats):
+        """Add a stats delta to the stats tables (inside the caller's write transaction)"""
+        conn.executemany(
+            "INSERT INTO agent_stats (service_type, status, agents, successful_txs, failed_txs, reputation_sum) "
+            "VALUES (?, ?, ?, ?, ?, ?) ON CONFLICT (service_type, status) DO UPDATE SET "
+            "agents = agents + excluded.agents, successful_txs = successful_txs + excluded.successful_txs, "
+            "failed_txs = failed_txs + excluded.failed_txs, reputation_sum = reputation_sum + excluded.reputation_sum",
+            [(*key, *counters) for key, counters in delta.groups.items()]
+        )
+        conn.executemany(
+            "INSERT INTO reputation_sketch (service_type, bucket, count) VALUES (?, ?, ?) "
+            "ON CONFLICT (service_type, bucket) DO UPDATE SET count = count + excluded.count",
+            [
+                (service_type, bucket, count)
+                for service_type, sketch in delta.sketches.items()
+                for bucket, count in sketch.buckets.items()
+            ]
+        )
+        conn.execute("DELETE FROM agent_stats WHERE agents = 0")
+        conn.execute("DELETE FROM reputation_sketch WHERE count = 0")
+
+    @staticmethod
+    def _read_stats(conn) -> RegistryStats:
+        stats = RegistryStats()
+        for service_type, status, *counters in conn.execute(
+            "SELECT service_type, status, agents, successful_txs, failed_txs, reputation_sum FROM agent_stats"
+        ):
+            stats.groups[(service_type, status)] = counters
+        for service_type, bucket, count in conn.execute(
+            "SELECT service_type, bucket, count FROM reputation_sketch"
+        ):
+            if service_type not in stats.sketches:
+                stats.sketches[service_type] = ReputationSketch()
+            stats.sketches[service_type].add_to_bucket(bucket, count)
+        return stats
+
+    @classmethod
+    def _recompute_stats(cls, conn) -> RegistryStats:
+        stats = RegistryStats()
+        for row in conn.execute(f"SELECT {cls._STATS_COLUMNS} FROM agents"):
+            stats.add_values(*cls._stats_values(row))
+        return stats
+
+    def registry_stats(self) -> RegistryStats:
+        """The maintained statistics (built from the agents the first time)"""
+        conn = self._connection()
+        if not conn.execute("SELECT value FROM meta WHERE key = 'stats_ready'").fetchone()[0]:
+            self.verify_stats()
+        return self._read_stats(conn)
+
+    def verify_stats(self) -> bool:
+        """
+        Recompute the statistics from every agent and replace the maintained
+        ones if they differ; returns True if they had drifted
+        """
+        conn = self._connection()
+        # One read transaction: both sides from the same snapshot
+        conn.execute("BEGIN")
+        try:
+            ready = conn.execute("SELECT value FROM meta WHERE key = 'stats_ready'").fetchone()[0]
+            drifted = not ready or self._read_stats(conn) != self._recompute_stats(conn)
+        finally:
+            conn.execute("COMMIT")
+        if not drifted:
+            return False
+
+        with self._write() as conn:
+            recomputed = self._recompute_stats(conn)
+            conn.execute("DELETE FROM agent_stats")
+            conn.execute("DELETE FROM reputation_sketch")
+            self._apply_stats(conn, recomputed)
+            conn.execute("UPDATE meta SET value = 1 WHERE key = 'stats_ready'")
+        return bool(ready)
+
+    # ------------------------------------------------
+    # TTL caches
+    # ------------------------------------------------
+
+    def cache_get(self, namespace: str, key: str) -> Optional[Any]:
+        row = self._connection().execute(
+            "SELECT value, expires_at FROM cache WHERE namespace = ? AND key = ?",
+            (namespace, key)
+        ).fetchone()
+        if row is None or row[1] < time.time():
+            return None
+        return json.loads(row[0])
+
+    def cache_set(self, namespace: str, key: str, value: Any, ttl: float):
+        with self._write() as conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO cache (namespace, key, value, expires_at) VALUES (?, ?, ?, ?)",
+                (namespace, key, json.dumps(value), time.time() + ttl)
+            )
+            if random.random() < CACHE_SWEEP_RATE:
+                conn.execute("DELETE FROM cache WHERE expires_at < ?", (time.time(),))
+
+    def cache_delete(self, namespace: str, key: str):
+        with self._write() as conn:
+            conn.execute("DELETE FROM cache WHERE namespace = ? AND key = ?", (namespace, key))
+
+
+class StoreCache:
+    """A namespace of the shared store's cache table"""
+
+    def __init__(self, store: SharedStore, namespace: str):
+        self.store = store
+        self.namespace = namespace
+
+    def get(self, key: str) -> Optional[Any]:
+        value = self.store.cache_get(self.namespace, key)
+        metrics.record_cache(self.namespace, value is not None)
+        return value
+
+    def set(self, key: str, value: Any, ttl: float):
+        self.store.cache_set(self.namespace, key, value, ttl)
+
+    def delete(self, key: str):
+        self.store.cache_delete(self.namespace, key)
+
+
+class MemoryCache:
+    """Per-process TTL cache with the same interface, used without a shared store"""
+
+    def __init__(self, namespace: str, max_entries: int = 1024):
+        self.namespace = namespace
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[str, Tuple[float, Any]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> Optional[Any]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] < time.monotonic():
+                del self._entries[key]
+                entry = None
+        metrics.record_cache(self.namespace, entry is not None)
+        return entry[1] if entry is not None else None
+
+    def set(self, key: str, value: Any, ttl: float):
+        with self._lock:
+            self._entries[key] = (time.monotonic() + ttl, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def delete(self, key: str):
+        with self._lock:
+            self._entries.pop(key, None)
+
+
+_store: Optional[SharedStore] = None
+_store_lock = threading.Lock()
+
+
+def get_shared_store() -> Optional[SharedStore]:
+    """The store at ORCHESTRATOR_SHARED_STORE, or None when running with per-process state"""
+    global _store
+
+    path = os.getenv("ORCHESTRATOR_SHARED_STORE")
+    if not path:
+        return None
+    with _store_lock:
+        if _store is None or _store.path != path:
+            _store = SharedStore(path)
+    return _store
+
+
+def get_cache(namespace: str):
+    """A cache shared by all workers when the shared store is enabled, else per-process"""
+    store = get_shared_store()
+    return StoreCache(store, namespace) if store is not None else MemoryCache(namespace)
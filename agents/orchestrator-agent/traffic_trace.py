@@ -0,0 +1,114 @@
+"""
+Orchestration Traffic Traces
+Optionally records a compact, secret-free trace of every /api/orchestrate
+call (request, plan, chosen agents, per-stage timings, response sizes) as
+JSON lines, so real traffic shapes can be replayed against local stand-ins.
+"""
+import json
+import os
+import random
+import re
+import threading
+from typing import Dict, List, Optional
+
+TRACE_VERSION = 1
+
+# Anything that looks like a credential, key, signature or address is
+# replaced before a trace is written
+_SECRET_PATTERNS = [
+    re.compile(r"sk-[A-Za-z0-9_\-]{16,}"),                    # OpenAI-style API keys
+    re.compile(r"(?i)bearer\s+[A-Za-z0-9._\-]+"),             # Authorization tokens
+    re.compile(r"\[\s*\d{1,3}(?:\s*,\s*\d{1,3}){31,}\s*\]"),  # Raw secret key byte arrays
+    re.compile(r"\b[1-9A-HJ-NP-Za-km-z]{32,88}\b"),           # Base58 keys/signatures
+    re.compile(r"\b[0-9a-fA-F]{64,}\b"),                      # Hex-encoded keys
+]
+
+
+def redact(text: str) -> str:
+    """Strip secrets from free-form text"""
+    for pattern in _SECRET_PATTERNS:
+        text = pattern.sub("<redacted>", text)
+    return text
+
+
+def build_trace(
+    task: str,
+    results: Dict[str, Dict],
+    stage_timings: List[Dict],
+    status: int,
+    elapsed_ms: float,
+    response_bytes: int,
+    received_at: float
+) -> Dict:
+    """Build a compact trace record; payment signatures, wallets and payloads are dropped"""
+    subtasks = []
+    for name, result in results.items():
+        subtasks.append({
+            "name": redact(name),
+            "service_type": result.get("service_type"),
+            "budget_usd": result.get("budget_usd"),
+            "agent": result.get("agent"),
+            "success": bool(result.get("success")),
+            "paid": bool(result.get("payment_tx")),
+            "data_bytes": result.get("service_data_bytes") or 0,
+            "error": redact(str(result["error"]))[:200] if result.get("error") else None
+        })
+
+    return {
+        "v": TRACE_VERSION,
+        "ts": round(received_at, 3),
+        "task": redact(task),
+        "status": status,
+        "elapsed_ms": round(elapsed_ms, 3),
+        "response_bytes": response_bytes,
+        "subtasks": subtasks,
+        "stages": [
+            [t["stage"], t["service_type"], t["agent"], t["ms"]]
+            for t in stage_timings
+        ]
+    }
+
+
+class TraceRecorder:
+    """Appends trace records to a JSONL file (thread-safe)"""
+
+    def __init__(self, path: str, sample_rate: float = 1.0):
+        self.path = path
+        self.sample_rate = sample_rate
+        self._lock = threading.Lock()
+        self.recorded = 0
+
+    def should_record(self) -> bool:
+        return self.sample_rate >= 1.0 or random.random() < self.sample_rate
+
+    def record(self, trace: Dict):
+        line = json.dumps(trace, separators=(",", ":")) + "\n"
+        try:
+            with self._lock:
+                with open(self.path, "a") as f:
+                    f.write(line)
+                self.recorded += 1
+        except Exception as e:
+            print(f"⚠️ Could not write orchestration trace: {e}")
+
+
+def load_traces(path: str) -> List[Dict]:
+    """Load trace records, oldest first"""
+    traces = []
+    with open(path) as f:
+        for line in f:
+            line = line.strip()
+            if line:
+                traces.append(json.loads(line))
+    traces.sort(key=lambda t: t["ts"])
+    return traces
+
+
+def recorder_from_env() -> Optional[TraceRecorder]:
+    """Recording is enabled by ORCHESTRATION_TRACE_PATH (sampled by ORCHESTRATION_TRACE_SAMPLE)"""
+    path = os.getenv("ORCHESTRATION_TRACE_PATH")
+    if not path:
+        return None
+    sample_rate = float(os.getenv("ORCHESTRATION_TRACE_SAMPLE", "1.0"))
+    print(f"🎞️ Recording orchestration traces to {path} (sample rate {sample_rate})")
+    return TraceRecorder(path, sample_rate)
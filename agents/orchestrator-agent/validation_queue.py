@@ -0,0 +1,292 @@
+"""
+Batched Validation Queue
+Buffers service validations and flushes them off the request path:
+- Packs as many record_validation instructions per transaction as fit
+- Applies the matching registry reputation updates in one commit
+"""
+import hashlib
+import itertools
+import os
+import threading
+import time
+from typing import List, Dict, Optional, Any, TYPE_CHECKING
+
+from agent_manager import agent_manager
+import metrics
+from rpc_pool import get_rpc_pool
+
+# solders is only needed when a batch is actually submitted on-chain
+if TYPE_CHECKING:
+    from solders.keypair import Keypair
+    from solders.instruction import Instruction
+    from solders.transaction import Transaction
+
+# Maximum serialized transaction size accepted by the Solana network
+PACKET_DATA_SIZE = 1232
+
+# Anchor instruction discriminator for `record_validation`
+RECORD_VALIDATION_DISCRIMINATOR = hashlib.sha256(b"global:record_validation").digest()[:8]
+
+# Seed used by the `register_agent` instruction for AgentProfile PDAs
+AGENT_PROFILE_SEED = b"agent"
+
+
+class ValidationQueue:
+    def __init__(
+        self,
+        rpc_url: str,
+        program_address: str,
+        flush_interval: float = None,
+        batch_size: int = None,
+        submit_on_chain: bool = None
+    ):
+        self.rpc_url = rpc_url
+        self.program_address = program_address
+        self._program_id = None
+        self.flush_interval = flush_interval if flush_interval is not None else float(
+            os.getenv("VALIDATION_FLUSH_INTERVAL", "2.0")
+        )
+        self.batch_size = batch_size if batch_size is not None else int(
+            os.getenv("VALIDATION_BATCH_SIZE", "16")
+        )
+        # The reputation program is not deployed on every cluster, so on-chain
+        # submission is opt-in; registry updates are always applied.
+        self.submit_on_chain = submit_on_chain if submit_on_chain is not None else (
+            os.getenv("RECORD_VALIDATION_ON_CHAIN", "false").lower() in ("1", "true", "yes")
+        )
+
+        self._pending: List[Dict[str, Any]] = []
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._stopped = threading.Event()
+        self._worker: Optional[threading.Thread] = None
+        self._counter = itertools.count(1)
+        self._client = None
+
+        # validation_id -> transaction signature (bounded, most recent only)
+        self._signatures: Dict[str, str] = {}
+        self._max_signatures = 10_000
+
+    # ------------------------------------------------
+    # Producer side (request path)
+    # ------------------------------------------------
+
+    def enqueue(
+        self,
+        seller_pubkey: str,
+        success: bool,
+        buyer_keypair: "Keypair",
+        agent_id: Optional[str] = None
+    ) -> str:
+        """Buffer a validation and return its id immediately (agent_id saves resolving the seller key)"""
+        validation_id = f"Validation_{seller_pubkey[:8]}_{success}_{int(time.time())}_{next(self._counter)}"
+
+        with self._lock:
+            self._pending.append({
+                "validation_id": validation_id,
+                "seller_pubkey": seller_pubkey,
+                "success": success,
+                "buyer_keypair": buyer_keypair,
+                "agent_id": agent_id or None
+            })
+            pending_count = len(self._pending)
+
+        self._ensure_worker()
+        if pending_count >= self.batch_size:
+            self._wakeup.set()
+
+        return validation_id
+
+    def pending_count(self) -> int:
+        """Number of validations waiting to be flushed"""
+        with self._lock:
+            return len(self._pending)
+
+    def get_signature(self, validation_id: str) -> Optional[str]:
+        """Get the on-chain signature of a flushed validation, if any"""
+        return self._signatures.get(validation_id)
+
+    # ------------------------------------------------
+    # Consumer side (background flusher)
+    # ------------------------------------------------
+
+    def _ensure_worker(self):
+        """Start the background flusher on first use"""
+        if self._worker is not None and self._worker.is_alive():
+            return
+        with self._lock:
+            if self._worker is not None and self._worker.is_alive():
+                return
+            self._stopped.clear()
+            self._worker = threading.Thread(
+                target=self._run,
+                name="validation-flusher",
+                daemon=True
+            )
+            self._worker.start()
+
+    def _run(self):
+        while not self._stopped.is_set():
+            self._wakeup.wait(self.flush_interval)
+            self._wakeup.clear()
+            try:
+                self.flush()
+            except Exception as e:
+                print(f"⚠️ Validation flush failed: {e}")
+
+    def stop(self, flush: bool = True):
+        """Stop the background flusher, optionally draining the queue"""
+        self._stopped.set()
+        self._wakeup.set()
+        if self._worker is not None:
+            self._worker.join(timeout=self.flush_interval + 1)
+        if flush:
+            self.flush()
+
+    def flush(self) -> int:
+        """Drain the queue: one registry commit plus packed on-chain transactions"""
+        with self._flush_lock:
+            with self._lock:
+                batch, self._pending = self._pending, []
+
+            if not batch:
+                return 0
+
+            print(f"📝 Flushing {len(batch)} validation(s)...")
+            self._apply_registry_updates(batch)
+
+            if self.submit_on_chain:
+                self._submit_on_chain(batch)
+
+            return len(batch)
+
+    def _apply_registry_updates(self, batch: List[Dict[str, Any]]):
+        """Commit all reputation changes at once, resolving sellers queued without an agent id"""
+        # Scanning the registry by key is only needed for validations
+        # queued without their agent id
+        agent_ids_by_key = {}
+        if any(item["agent_id"] is None for item in batch):
+            for agent in agent_manager.get_all_agents():
+                for key in (agent.pubkey, agent.wallet):
+                    if key and key not in agent_ids_by_key:
+                        agent_ids_by_key[key] = agent.agent_id
+
+        updates = []
+        for item in batch:
+            agent_id = item["agent_id"] or agent_ids_by_key.get(item["seller_pubkey"])
+            if agent_id:
+                updates.append((agent_id, item["success"]))
+            else:
+                print(f"⚠️ Agent not found in registry: {item['seller_pubkey'][:8]}")
+
+        if updates:
+            agent_manager.update_agent_reputations_bulk(updates)
+
+    # ------------------------------------------------
+    # On-chain submission
+    # ------------------------------------------------
+
+    @property
+    def program_id(self):
+        if self._program_id is None:
+            from solders.pubkey import Pubkey
+            self._program_id = Pubkey.from_string(self.program_address)
+        return self._program_id
+
+    def _get_client(self):
+        if self._client is None:
+            self._client = metrics.instrument_rpc_client(get_rpc_pool(self.rpc_url).client())
+        return self._client
+
+    def _build_instruction(self, item: Dict[str, Any], validation_keypair: "Keypair") -> Optional["Instruction"]:
+        """Build one Anchor record_validation instruction"""
+        from solders.pubkey import Pubkey
+        from solders.instruction import Instruction, AccountMeta
+        from solders.system_program import ID as SYSTEM_PROGRAM_ID
+
+        try:
+            seller_owner = Pubkey.from_string(item["seller_pubkey"])
+        except Exception:
+            print(f"⚠️ Seller {item['seller_pubkey'][:8]} is not a valid pubkey, skipping on-chain record")
+            return None
+
+        seller_profile, _ = Pubkey.find_program_address(
+            [AGENT_PROFILE_SEED, bytes(seller_owner)],
+            self.program_id
+        )
+        buyer = item["buyer_keypair"].pubkey()
+
+        return Instruction(
+            self.program_id,
+            RECORD_VALIDATION_DISCRIMINATOR + bytes([1 if item["success"] else 0]),
+            [
+                AccountMeta(validation_keypair.pubkey(), is_signer=True, is_writable=True),
+                AccountMeta(seller_profile, is_signer=False, is_writable=True),
+                AccountMeta(buyer, is_signer=True, is_writable=True),
+                AccountMeta(SYSTEM_PROGRAM_ID, is_signer=False, is_writable=False),
+            ]
+        )
+
+    def _submit_on_chain(self, batch: List[Dict[str, Any]]):
+        """Send the batch as few transactions as possible, grouped by fee payer"""
+        from solders.keypair import Keypair
+
+        try:
+            client = self._get_client()
+            blockhash = client.get_latest_blockhash().value.blockhash
+        except Exception as e:
+            print(f"⚠️ Could not fetch blockhash for validations: {e}")
+            return
+
+        by_buyer: Dict[str, List[Dict[str, Any]]] = {}
+        for item in batch:
+            by_buyer.setdefault(str(item["buyer_keypair"].pubkey()), []).append(item)
+
+        for items in by_buyer.values():
+            buyer_keypair = items[0]["buyer_keypair"]
+            packed = []  # (item, instruction, validation_keypair)
+
+            for item in items:
+                validation_keypair = Keypair()
+                ix = self._build_instruction(item, validation_keypair)
+                if ix is None:
+                    continue
+
+                candidate = packed + [(item, ix, validation_keypair)]
+                if packed and self._transaction_size(candidate, buyer_keypair, blockhash) > PACKET_DATA_SIZE:
+                    self._send_packed(packed, buyer_keypair, blockhash)
+                    candidate = [(item, ix, validation_keypair)]
+                packed = candidate
+
+            if packed:
+                self._send_packed(packed, buyer_keypair, blockhash)
+
+    def _build_transaction(self, packed, buyer_keypair: "Keypair", blockhash) -> "Transaction":
+        from solders.message import Message
+        from solders.transaction import Transaction
+
+        message = Message.new_with_blockhash(
+            [ix for _, ix, _ in packed],
+            buyer_keypair.pubkey(),
+            blockhash
+        )
+        signers = [buyer_keypair] + [kp for _, _, kp in packed]
+        return Transaction(signers, message, blockhash)
+
+    def _transaction_size(self, packed, buyer_keypair: "Keypair", blockhash) -> int:
+        return len(bytes(self._build_transaction(packed, buyer_keypair, blockhash)))
+
+    def _send_packed(self, packed, buyer_keypair: "Keypair", blockhash):
+        try:
+            tx = self._build_transaction(packed, buyer_keypair, blockhash)
+            resp = self._get_client().send_raw_transaction(bytes(tx))
+            signature = str(resp.value)
+            print(f"✅ Recorded {len(packed)} validation(s) on-chain: {signature}")
+
+            if len(self._signatures) >= self._max_signatures:
+                self._signatures.clear()
+            for item, _, _ in packed:
+                self._signatures[item["validation_id"]] = signature
+        except Exception as e:
+            print(f"⚠️ On-chain validation batch failed ({len(packed)} ix): {e}")
@@ -0,0 +1,305 @@
+"""
+Orchestrator Wallet Pool
+Spreads payments over several orchestrator keypairs so concurrent subtasks
+don't share one balance and one fee payer:
+- Wallets loaded from a directory of keypair files or a keystore file
+- Least-loaded (or round-robin) assignment, one wallet per subtask
+- Per-wallet balance tracking, debited locally after each payment
+- Optional background rebalancer topping up low wallets from a treasury key
+"""
+import glob
+import itertools
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+from typing import List, Dict, Optional, TYPE_CHECKING
+
+import metrics
+from rpc_pool import get_rpc_pool
+
+# solana/solders are only needed once wallets are loaded or topped up
+if TYPE_CHECKING:
+    from solders.keypair import Keypair
+
+LAMPORTS_PER_SOL = 1_000_000_000
+TX_FEE_LAMPORTS = 5000
+
+# Transfers packed into one treasury top-up transaction
+MAX_TRANSFERS_PER_TX = 16
+
+STRATEGIES = ("least_loaded", "round_robin")
+
+
+def read_keypair_file(path: str) -> "Keypair":
+    """Read a keypair saved as {"secret_key": [...]} (wallet.json) or a plain byte array (solana-keygen)"""
+    from solders.keypair import Keypair
+
+    with open(path) as f:
+        data = json.load(f)
+    secret_key = data["secret_key"] if isinstance(data, dict) else data
+    return Keypair.from_bytes(bytes(secret_key))
+
+
+def load_keypairs(directory: Optional[str] = None, keystore: Optional[str] = None) -> List["Keypair"]:
+    """
+    Load pool keypairs from every *.json file in `directory` and/or a
+    keystore file holding {"wallets": [{"secret_key": [...]}, ...]}.
+    Duplicates are dropped.
+    """
+    from solders.keypair import Keypair
+
+    keypairs = []
+    if directory:
+        for path in sorted(glob.glob(os.path.join(directory, "*.json"))):
+            try:
+                keypairs.append(read_keypair_file(path))
+            except Exception as e:
+                print(f"⚠️ Skipping wallet file {path}: {e}")
+    if keystore:
+        with open(keystore) as f:
+            entries = json.load(f)
+        for entry in entries.get("wallets", []) if isinstance(entries, dict) else entries:
+            secret_key = entry["secret_key"] if isinstance(entry, dict) else entry
+            keypairs.append(Keypair.from_bytes(bytes(secret_key)))
+
+    unique = {}
+    for keypair in keypairs:
+        unique.setdefault(str(keypair.pubkey()), keypair)
+    return list(unique.values())
+
+
+class _Wallet:
+    __slots__ = ("keypair", "pubkey", "in_flight", "balance", "balance_at", "payments")
+
+    def __init__(self, keypair: "Keypair"):
+        self.keypair = keypair
+        self.pubkey = str(keypair.pubkey())
+        self.in_flight = 0
+        self.balance: Optional[int] = None
+        self.balance_at = 0.0
+        self.payments = 0
+
+
+class WalletPool:
+    """Thread-safe pool of payer keypairs with balance tracking"""
+
+    def __init__(
+        self,
+        keypairs: List["Keypair"],
+        strategy: str = None,
+        rpc_url: str = None,
+        treasury: Optional["Keypair"] = None,
+        balance_ttl: float = None,
+        min_balance_lamports: int = None,
+        target_balance_lamports: int = None,
+        rebalance_interval: float = None
+    ):
+        if not keypairs:
+            raise ValueError("Wallet pool needs at least one keypair")
+        self._wallets = [_Wallet(kp) for kp in keypairs]
+        self._by_pubkey = {w.pubkey: w for w in self._wallets}
+        self.strategy = strategy or os.getenv("ORCHESTRATOR_WALLET_STRATEGY", "least_loaded")
+        if self.strategy not in STRATEGIES:
+            raise ValueError(f"Unknown wallet strategy '{self.strategy}' (expected one of {STRATEGIES})")
+        self.rpc_url = rpc_url
+        self.treasury = treasury
+        self.balance_ttl = balance_ttl if balance_ttl is not None else float(
+            os.getenv("WALLET_BALANCE_TTL", "30")
+        )
+        self.min_balance_lamports = min_balance_lamports if min_balance_lamports is not None else int(
+            float(os.getenv("WALLET_MIN_BALANCE_SOL", "0.1")) * LAMPORTS_PER_SOL
+        )
+        self.target_balance_lamports = target_balance_lamports if target_balance_lamports is not None else int(
+            float(os.getenv("WALLET_TARGET_BALANCE_SOL", "0.5")) * LAMPORTS_PER_SOL
+        )
+        self.rebalance_interval = rebalance_interval if rebalance_interval is not None else float(
+            os.getenv("WALLET_REBALANCE_INTERVAL", "60")
+        )
+        self._lock = threading.Lock()
+        self._round_robin = itertools.count()
+        self._client = None
+        self._stopped = threading.Event()
+        self._rebalancer: Optional[threading.Thread] = None
+
+    @property
+    def wallets(self) -> List["Keypair"]:
+        return [w.keypair for w in self._wallets]
+
+    @property
+    def primary(self) -> "Keypair":
+        return self._wallets[0].keypair
+
+    def __len__(self) -> int:
+        return len(self._wallets)
+
+    # ------------------------------------------------
+    # Assignment
+    # ------------------------------------------------
+
+    def _can_pay(self, wallet: _Wallet, lamports: int) -> bool:
+        return wallet.balance is None or wallet.balance >= lamports + TX_FEE_LAMPORTS
+
+    def _pick(self, lamports: int) -> _Wallet:
+        funded = [w for w in self._wallets if self._can_pay(w, lamports)]
+        if not funded:
+            # Nobody is known to afford it; the richest wallet gets the attempt
+            return max(self._wallets, key=lambda w: w.balance or 0)
+        if self.strategy == "round_robin":
+            return funded[next(self._round_robin) % len(funded)]
+        return min(funded, key=lambda w: (w.in_flight, -(w.balance or 0)))
+
+    @contextmanager
+    def lease(self, lamports: int = 0):
+        """
+        Assign a wallet for one payment: `with pool.lease(lamports) as keypair: ...`
+        
+        Wallets whose tracked balance cannot cover `lamports` plus the fee
+        are skipped.
+        """
+        with self._lock:
+            wallet = self._pick(lamports)
+            wallet.in_flight += 1
+        metrics.WALLET_IN_FLIGHT.inc(wallet.pubkey)
+        try:
+            yield wallet.keypair
+        finally:
+            with self._lock:
+                wallet.in_flight -= 1
+            metrics.WALLET_IN_FLIGHT.dec(wallet.pubkey)
+
+    # ------------------------------------------------
+    # Balance tracking
+    # ------------------------------------------------
+
+    def known_balance(self, pubkey) -> Optional[int]:
+        """Tracked balance if it was observed within the TTL, else None"""
+        wallet = self._by_pubkey.get(str(pubkey))
+        if wallet is None or wallet.balance is None:
+            return None
+        if time.monotonic() - wallet.balance_at > self.balance_ttl:
+            return None
+        return wallet.balance
+
+    def record_balance(self, pubkey, lamports: int):
+        wallet = self._by_pubkey.get(str(pubkey))
+        if wallet is None:
+            return
+        with self._lock:
+            wallet.balance = lamports
+            wallet.balance_at = time.monotonic()
+        metrics.WALLET_BALANCE.set(lamports, wallet.pubkey)
+
+    def debit(self, pubkey, lamports: int):
+        """Account for a sent payment (amount plus fee) without an RPC round trip"""
+        wallet = self._by_pubkey.get(str(pubkey))
+        if wallet is None:
+            return
+        with self._lock:
+            wallet.payments += 1
+            if wallet.balance is not None:
+                wallet.balance -= lamports + TX_FEE_LAMPORTS
+            balance = wallet.balance
+        if balance is not None:
+            metrics.WALLET_BALANCE.set(balance, wallet.pubkey)
+
+    def _get_client(self):
+        if self._client is None:
+            self._client = metrics.instrument_rpc_client(get_rpc_pool(self.rpc_url).client())
+        return self._client
+
+    def refresh_balances(self) -> Dict[str, int]:
+        """Fetch every wallet's balance in batched getMultipleAccounts calls"""
+        balances = {}
+        for start in range(0, len(self._wallets), 100):
+            chunk = self._wallets[start:start + 100]
+            resp = self._get_client().get_multiple_accounts([w.keypair.pubkey() for w in chunk])
+            for wallet, account in zip(chunk, resp.value):
+                lamports = account.lamports if account is not None else 0
+                self.record_balance(wallet.pubkey, lamports)
+                balances[wallet.pubkey] = lamports
+        return balances
+
+    # ------------------------------------------------
+    # Treasury rebalancer
+    # ------------------------------------------------
+
+    def rebalance(self) -> int:
+        """Top up wallets below the minimum to the target from the treasury; returns wallets funded"""
+        if self.treasury is None:
+            return 0
+
+        balances = self.refresh_balances()
+        low = [
+            (w, self.target_balance_lamports - balances[w.pubkey])
+            for w in self._wallets
+            if balances[w.pubkey] < self.min_balance_lamports
+        ]
+        if not low:
+            return 0
+
+        funded = 0
+        for start in range(0, len(low), MAX_TRANSFERS_PER_TX):
+            batch = low[start:start + MAX_TRANSFERS_PER_TX]
+            try:
+                signature = self._send_top_up(batch)
+            except Exception as e:
+                print(f"⚠️ Wallet top-up failed ({len(batch)} wallet(s)): {e}")
+                continue
+            for wallet, amount in batch:
+                self.record_balance(wallet.pubkey, balances[wallet.pubkey] + amount)
+            funded += len(batch)
+            total_sol = sum(amount for _, amount in batch) / LAMPORTS_PER_SOL
+            print(f"🏦 Topped up {len(batch)} wallet(s) with {total_sol} SOL from treasury: {signature}")
+            metrics.WALLET_TOP_UPS.inc(amount=len(batch))
+        return funded
+
+    def _send_top_up(self, batch) -> str:
+        from solders.message import Message
+        from solders.system_program import TransferParams, transfer
+        from solders.transaction import Transaction
+
+        client = self._get_client()
+        blockhash = client.get_latest_blockhash().value.blockhash
+        instructions = [
+            transfer(TransferParams(
+                from_pubkey=self.treasury.pubkey(),
+                to_pubkey=wallet.keypair.pubkey(),
+                lamports=amount
+            ))
+            for wallet, amount in batch
+        ]
+        message = Message.new_with_blockhash(instructions, self.treasury.pubkey(), blockhash)
+        tx = Transaction([self.treasury], message, blockhash)
+        return str(client.send_raw_transaction(bytes(tx)).value)
+
+    def start_rebalancer(self):
+        """Run rebalance() every rebalance_interval on a daemon thread (needs a treasury)"""
+        if self.treasury is None or self._rebalancer is not None:
+            return
+        self._rebalancer = threading.Thread(target=self._run_rebalancer, name="wallet-rebalancer", daemon=True)
+        self._rebalancer.start()
+
+    def _run_rebalancer(self):
+        while not self._stopped.is_set():
+            try:
+                self.rebalance()
+            except Exception as e:
+                print(f"⚠️ Wallet rebalance failed: {e}")
+            self._stopped.wait(self.rebalance_interval)
+
+    def stop(self):
+        self._stopped.set()
+
+    def snapshot(self) -> List[Dict]:
+        with self._lock:
+            return [
+                {
+                    "pubkey": w.pubkey,
+                    "in_flight": w.in_flight,
+                    "balance_lamports": w.balance,
+                    "payments": w.payments
+                }
+                for w in self._wallets
+            ]
@@ -0,0 +1,128 @@
+"""
+Pre-fork Multi-Worker Serving
+Runs the API in several processes so CPU-heavy work (JSON, signing,
+response serialisation) is not bound to one GIL:
+- The parent binds the listening socket once and forks N workers
+- Each worker runs a threaded WSGI server on the inherited socket; the
+  kernel spreads incoming connections across them
+- Workers that exit unexpectedly are restarted; SIGTERM/SIGINT stop all
+
+Workers share the registry and caches through the SQLite store at
+ORCHESTRATOR_SHARED_STORE (see shared_store.py), which the parent sets up
+before forking.
+"""
+import os
+import signal
+import socket
+import sys
+import time
+from typing import Callable, Dict, Optional, Tuple
+
+WORKER_INDEX_ENV = "ORCHESTRATOR_WORKER_INDEX"
+WORKER_COUNT_ENV = "ORCHESTRATOR_WORKER_COUNT"
+
+# Minimum spacing between restarts of a crashing worker
+RESTART_BACKOFF = 1.0
+
+
+def current_worker() -> Tuple[int, int]:
+    """(index, count) of this worker process; (0, 1) when not running pre-forked"""
+    return int(os.getenv(WORKER_INDEX_ENV, "0")), int(os.getenv(WORKER_COUNT_ENV, "1"))
+
+
+def _bind(host: str, port: int, backlog: int = 1024) -> socket.socket:
+    family = socket.AF_INET6 if ":" in host else socket.AF_INET
+    sock = socket.socket(family, socket.SOCK_STREAM)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    sock.bind((host, port))
+    sock.listen(backlog)
+    sock.set_inheritable(True)
+    return sock
+
+
+def _run_worker(app, host: str, port: int, sock: socket.socket, index: int, count: int,
+                on_worker_start: Optional[Callable[[int], None]]):
+    """Body of a forked worker; never returns"""
+    import logging
+    from werkzeug.serving import make_server
+
+    os.environ[WORKER_INDEX_ENV] = str(index)
+    os.environ[WORKER_COUNT_ENV] = str(count)
+    signal.signal(signal.SIGTERM, signal.SIG_DFL)
+    signal.signal(signal.SIGINT, signal.SIG_DFL)
+    logging.getLogger("werkzeug").setLevel(logging.WARNING)
+
+    code = 0
+    try:
+        if on_worker_start is not None:
+            on_worker_start(index)
+        server = make_server(host, port, app, threaded=True, fd=sock.fileno())
+        print(f"👷 Worker {index} (pid {os.getpid()}) serving on {host}:{port}")
+        server.serve_forever()
+    except Exception as e:
+        print(f"🚨 Worker {index} crashed: {e}")
+        code = 1
+    finally:
+        sys.stdout.flush()
+        os._exit(code)
+
+
+def serve_prefork(
+    app,
+    host: str,
+    port: int,
+    workers: int,
+    on_worker_start: Optional[Callable[[int], None]] = None
+):
+    """
+    Serve `app` from `workers` forked processes until SIGTERM/SIGINT.
+
+    `on_worker_start(index)` runs in each worker right after the fork, e.g.
+    to start background threads (threads do not survive fork()).
+    """
+    sock = _bind(host, port)
+    children: Dict[int, int] = {}
+    last_started: Dict[int, float] = {}
+    stopping = False
+
+    def spawn(index: int):
+        last_started[index] = time.monotonic()
+        pid = os.fork()
+        if pid == 0:
+            _run_worker(app, host, port, sock, index, workers, on_worker_start)
+        children[pid] = index
+
+    def stop(signum, frame):
+        nonlocal stopping
+        stopping = True
+        for pid in list(children):
+            try:
+                os.kill(pid, signal.SIGTERM)
+            except ProcessLookupError:
+                pass
+
+    signal.signal(signal.SIGTERM, stop)
+    signal.signal(signal.SIGINT, stop)
+
+    print(f"🏭 Starting {workers} workers on {host}:{port} (parent pid {os.getpid()})")
+    for index in range(workers):
+        spawn(index)
+
+    while children:
+        try:
+            pid, status = os.wait()
+        except ChildProcessError:
+            break
+        except InterruptedError:
+            continue
+        index = children.pop(pid, None)
+        if index is None or stopping:
+            continue
+        print(f"⚠️ Worker {index} (pid {pid}) exited with status {status}, restarting")
+        wait = RESTART_BACKOFF - (time.monotonic() - last_started[index])
+        if wait > 0:
+            time.sleep(wait)
+        spawn(index)
+
+    sock.close()
+    print("👋 All workers stopped")
@@ -1,7 +1,12 @@
 #!/usr/bin/env python3
 """
 Quick script to register demo agents in the Professional Agent Registry
+
+With file arguments it bulk-imports agents instead (one registry commit):
+    python register_agents.py agents.jsonl
+    python register_agents.py agents.csv --report import_report.jsonl
 """
+import argparse
 import json
 import sys
 import os
@@ -70,15 +75,15 @@ def register_demo_agents():
     
     agents = [agent1, agent2, agent3, agent4]
     
-    registered_count = 0
-    for agent in agents:
-        if agent_manager.register_agent(agent):
+    report = agent_manager.register_agents_bulk(agents)
+    registered_count = report["registered"]
+    for agent, outcome in zip(agents, report["rows"]):
+        if outcome["status"] == "registered":
             print(f"✅ Registered: {agent['agent_id']}")
             print(f"   Service Type: {agent['service_type']}")
             print(f"   Reputation: {agent['reputation_score']}")
             print(f"   Successful Txs: {agent['total_successful_txs']}")
             print()
-            registered_count += 1
         else:
             print(f"⚠️  Already exists: {agent['agent_id']}")
             print()
@@ -96,10 +101,10 @@ def register_demo_agents():
     # Group by service type
     service_types = {}
     for agent in all_agents:
-        stype = agent['service_type']
+        stype = agent.service_type
         if stype not in service_types:
             service_types[stype] = []
-        service_types[stype].append(agent['agent_id'])
+        service_types[stype].append(agent.agent_id)
     
     print("\n📋 Agents by Service Type:")
     for stype, agent_ids in service_types.items():
@@ -110,8 +115,42 @@ def register_demo_agents():
     print("\n✅ You can now use the Web UI - agents will be visible!")
     print(f"   Visit: https://web-ui-cyan-omega.vercel.app")
 
+def import_agent_files(paths, fmt=None, report_path=None):
+    """Bulk-register the agents of JSONL/CSV files; returns the number of invalid rows"""
+    from agent_import import detect_format, iter_agent_rows
+    
+    failed = 0
+    for path in paths:
+        print(f"📥 Importing {path}...")
+        with open(path, newline='') as f:
+            report = agent_manager.register_agents_bulk(iter_agent_rows(f, fmt or detect_format(filename=path)))
+        
+        problems = [row for row in report["rows"] if row["status"] != "registered"]
+        for row in problems[:20]:
+            print(f"   ⚠️  Row {row['row']} ({row['agent_id']}): {row['status']}{': ' + row['error'] if 'error' in row else ''}")
+        if len(problems) > 20:
+            print(f"   ... {len(problems) - 20} more")
+        failed += report["invalid"]
+        
+        if report_path:
+            with open(report_path, 'a') as out:
+                for row in report["rows"]:
+                    out.write(json.dumps({"file": path, **row}) + "\n")
+    
+    if report_path:
+        print(f"💾 Per-row report written to {report_path}")
+    return failed
+
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Register agents in the Professional Agent Registry")
+    parser.add_argument("files", nargs="*", help="JSONL or CSV files to import (default: register the demo agents)")
+    parser.add_argument("--format", choices=["jsonl", "csv"], help="File format (default: from the file extension)")
+    parser.add_argument("--report", help="Append every row's outcome to this JSONL file")
+    args = parser.parse_args()
+    
     try:
+        if args.files:
+            sys.exit(1 if import_agent_files(args.files, args.format, args.report) else 0)
         register_demo_agents()
     except Exception as e:
         print(f"❌ Error: {e}")